@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .models.model_registry import get_model_registry
 from .routes import schemesense, finance360, fairscore, loanguard, clearclause, rag
 
 
@@ -26,6 +27,11 @@ def create_app() -> FastAPI:
     app.include_router(clearclause.router, prefix="/api/clearclause", tags=["ClearClause"])
     app.include_router(rag.router, tags=["RAG"])
 
+    @app.on_event("startup")
+    def start_model_registry():
+        # Starts the watcher, which loads the served FairScore model off the request path
+        get_model_registry()
+
     @app.get("/health", tags=["Utility"])
     async def health_check():
         return {"status": "healthy", "version": "1.0.0"}
@@ -33,7 +39,9 @@ def create_app() -> FastAPI:
     @app.get("/privacy", tags=["Utility"])
     async def privacy_note():
         return {
-            "message": "All uploads and SMS data are processed in-memory for demo purposes and not persisted."
+            "message": "All uploads and SMS data are processed in-memory for demo purposes and not persisted, "
+            "except /api/finance360/sms_sync, which keeps per-user totals and hashed transaction fingerprints "
+            "(never raw SMS) in a local SQLite file until DELETE /api/finance360/sms_sync/{user_id}."
         }
 
     return app
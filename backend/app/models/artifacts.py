@@ -0,0 +1,223 @@
+"""
+Versioned FairScore model artifacts (no pickle).
+
+One directory per version under ARTIFACT_ROOT:
+
+    artifacts/
+        LATEST                  # Name of the current version, replaced atomically
+        20261016-201700/
+            manifest.json       # Format, feature order, engine metadata, sha256 per file
+            booster.json        # XGBoost native JSON (xgb.XGBRegressor().load_model(...))
+            scaler.npz          # StandardScaler mean_ / scale_
+            engine/*.npy        # TreeEngine arrays, scaler folded in; memory-mapped on load
+
+Serving loads manifest.json and the engine arrays with NumPy only; booster.json
+and scaler.npz keep the model reproducible for tooling that wants xgboost.
+A version directory is written under a temporary name and renamed into place,
+so readers never see a half-written artifact.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .tree_engine import TreeEngine
+
+ARTIFACT_ROOT = Path(os.getenv("FAIRSCORE_ARTIFACT_DIR", Path(__file__).parent / "artifacts"))
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+BOOSTER_FILE = "booster.json"
+SCALER_FILE = "scaler.npz"
+ENGINE_DIR = "engine"
+
+
+@dataclass(frozen=True)
+class Artifact:
+    version: str
+    path: Path
+    manifest: Dict[str, Any]
+    engine: TreeEngine
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _checksum(files: Dict[str, str]) -> str:
+    """Artifact-level checksum over the per-file hashes (order independent)."""
+    return hashlib.sha256("".join(f"{name}:{files[name]}\n" for name in sorted(files)).encode()).hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _free_version(root: Path, base: str) -> str:
+    """base, or base-2, base-3, ... if taken; suffixed names still sort after base and before the next second."""
+    version, suffix = base, 1
+    while (root / version).exists() or (root / f".{version}.tmp").exists():
+        suffix += 1
+        version = f"{base}-{suffix}"
+    return version
+
+
+def export_artifact(
+    model,
+    scaler,
+    feature_order: Sequence[str],
+    root: Path = ARTIFACT_ROOT,
+    version: Optional[str] = None,
+    metrics: Optional[Dict[str, float]] = None,
+    make_latest: bool = True,
+) -> Path:
+    """
+    Write a fitted XGBRegressor + StandardScaler as a new version; returns its directory.
+
+    The default version is the UTC time to the second, with a -2, -3, ...
+    suffix when that name is taken; an explicit version that exists raises
+    FileExistsError.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    if version is None:
+        version = _free_version(root, datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S"))
+    final = root / version
+    if final.exists():
+        raise FileExistsError(f"Artifact version {version} already exists at {final}")
+    tmp = root / f".{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    try:
+        model.get_booster().save_model(str(tmp / BOOSTER_FILE))
+        np.savez(tmp / SCALER_FILE, mean=np.asarray(scaler.mean_, dtype=np.float64),
+                 scale=np.asarray(scaler.scale_, dtype=np.float64))
+        engine_meta = TreeEngine.from_xgboost(model, scaler).save(tmp / ENGINE_DIR)
+
+        files = {
+            path.relative_to(tmp).as_posix(): _sha256(path)
+            for path in sorted(tmp.rglob("*")) if path.is_file()
+        }
+        manifest = {
+            "format": FORMAT_VERSION,
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "feature_order": list(feature_order),
+            "objective": json.loads(model.get_booster().save_config())["learner"]["objective"]["name"],
+            "engine": engine_meta,
+            "metrics": metrics or {},
+            "files": files,
+            "checksum": _checksum(files),
+        }
+        (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        os.rename(tmp, final)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    if make_latest:
+        set_latest(version, root)
+    return final
+
+
+def set_latest(version: str, root: Path = ARTIFACT_ROOT) -> None:
+    root = Path(root)
+    if not (root / version / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"No artifact version {version} in {root}")
+    _write_atomic(root / LATEST_FILE, version + "\n")
+
+
+def latest_version(root: Path = ARTIFACT_ROOT) -> Optional[str]:
+    try:
+        return (Path(root) / LATEST_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(root: Path = ARTIFACT_ROOT) -> List[str]:
+    """Names of the complete version directories under root (those with a manifest), sorted."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(path.name for path in root.iterdir()
+                  if not path.name.startswith(".") and (path / MANIFEST_FILE).is_file())
+
+
+def read_manifest(path: Path) -> Dict[str, Any]:
+    manifest = json.loads((Path(path) / MANIFEST_FILE).read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format')!r} in {path}")
+    return manifest
+
+
+def verify_artifact(path: Path, manifest: Dict[str, Any]) -> None:
+    """Raise ValueError if any file is missing or does not match its manifest hash."""
+    path = Path(path)
+    files = manifest["files"]
+    if _checksum(files) != manifest["checksum"]:
+        raise ValueError(f"Manifest checksum mismatch in {path}")
+    for name, expected in files.items():
+        file = path / name
+        if not file.is_file() or _sha256(file) != expected:
+            raise ValueError(f"Artifact file {name} is missing or corrupt in {path}")
+
+
+def load_artifact(
+    version: Optional[str] = None,
+    root: Path = ARTIFACT_ROOT,
+    feature_order: Optional[Sequence[str]] = None,
+    verify: bool = True,
+    mmap: bool = True,
+) -> Artifact:
+    """
+    Load a version (default: LATEST) for serving.
+
+    Raises FileNotFoundError if there is no such version and ValueError if the
+    artifact is corrupt or was trained on a different feature order.
+    """
+    root = Path(root)
+    version = version or latest_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No {LATEST_FILE} artifact in {root}")
+    path = root / version
+    manifest = read_manifest(path)
+    if verify:
+        verify_artifact(path, manifest)
+    if feature_order is not None and manifest["feature_order"] != list(feature_order):
+        raise ValueError(f"Artifact {version} feature order {manifest['feature_order']} != {list(feature_order)}")
+    engine = TreeEngine.load(path / ENGINE_DIR, manifest["engine"], mmap=mmap)
+    return Artifact(version=version, path=path, manifest=manifest, engine=engine)
+
+
+def load_xgboost(version: Optional[str] = None, root: Path = ARTIFACT_ROOT):
+    """(XGBRegressor, StandardScaler) rebuilt from booster.json + scaler.npz, for tooling."""
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+
+    root = Path(root)
+    version = version or latest_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No {LATEST_FILE} artifact in {root}")
+    path = root / version
+    model = xgb.XGBRegressor()
+    model.load_model(str(path / BOOSTER_FILE))
+    with np.load(path / SCALER_FILE) as data:
+        scaler = StandardScaler()
+        scaler.mean_, scaler.scale_ = data["mean"], data["scale"]
+        scaler.var_ = scaler.scale_ ** 2
+        scaler.n_features_in_ = len(scaler.mean_)
+    return model, scaler
@@ -1,16 +1,27 @@
 """
 FairScore model loader and predictor.
 
-Loads trained XGBoost model if available, otherwise uses placeholder.
+Serves the LATEST versioned artifact (see artifacts.py) through the NumPy tree
+engine, falling back to legacy pickles, otherwise uses placeholder. Nothing
+is read from disk until the first prediction, and reload() swaps in a new
+version without a restart. Small requests go through a ScoreCache that is
+cleared on every swap.
 """
 
 import pickle
+import threading
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 import numpy as np
 
+from .artifacts import ARTIFACT_ROOT, load_artifact
+from .feature_schema import FeatureSchema
+from .score_cache import CACHE_MAX_ROWS, ScoreCache
+from .tree_engine import TreeEngine
+
 MODEL_DIR = Path(__file__).parent
+# Legacy pickles, loaded only when no artifact has been exported
 MODEL_PATH = MODEL_DIR / "fairscore_model.pkl"
 SCALER_PATH = MODEL_DIR / "fairscore_scaler.pkl"
 
@@ -24,6 +35,26 @@ FEATURE_ORDER = [
     "emi_count",
 ]
 
+# Frontend names -> FEATURE_ORDER names
+FEATURE_ALIASES = {
+    "avg_monthly_inflow": "avg_inflow",
+    "avg_monthly_outflow": "avg_outflow",
+}
+
+
+SCHEMA = FeatureSchema(tuple(FEATURE_ORDER), FEATURE_ALIASES)
+FEATURE_INDEX = SCHEMA.index  # Input name (FEATURE_ORDER or alias) -> column index
+
+
+def normalize_features(features: Dict[str, float]) -> Dict[str, float]:
+    """Map frontend feature names (avg_monthly_inflow/outflow) to FEATURE_ORDER names."""
+    return SCHEMA.normalize(features)
+
+
+def feature_matrix(features_list: Sequence[Dict[str, float]]) -> np.ndarray:
+    """N x 7 float matrix in FEATURE_ORDER; missing features are 0."""
+    return SCHEMA.matrix(features_list)
+
 
 @dataclass
 class FairScoreResult:
@@ -38,26 +69,93 @@ class FairScoreModel:
     Uses trained XGBoost if available, otherwise placeholder.
     """
 
-    def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.use_ml = False
-        
-        # Try to load trained model
-        if MODEL_PATH.exists() and SCALER_PATH.exists():
+    def __init__(
+        self, model=None, scaler=None, artifact_root: Path = ARTIFACT_ROOT, cache: Optional[ScoreCache] = None
+    ):
+        """
+        Use an already-fitted model + scaler pair if given; otherwise the
+        artifact (or legacy pickles) is loaded lazily on first prediction.
+        cache defaults to a ScoreCache sized from the FAIRSCORE_CACHE_* settings.
+        """
+        self.model = model
+        self.scaler = scaler
+        self.artifact_root = Path(artifact_root)
+        self.engine: Optional[TreeEngine] = None
+        self.version: Optional[str] = None
+        self.manifest: Dict[str, Any] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.cache = cache if cache is not None else ScoreCache()
+        self._init_placeholder()
+
+        if model is not None and scaler is not None:
+            self._swap(TreeEngine.from_xgboost(model, scaler), "in-memory", {})
+
+    @property
+    def use_ml(self) -> bool:
+        self._ensure_loaded()
+        return self.engine is not None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
             try:
-                with open(MODEL_PATH, "rb") as f:
-                    self.model = pickle.load(f)
-                with open(SCALER_PATH, "rb") as f:
-                    self.scaler = pickle.load(f)
-                self.use_ml = True
-                print("Loaded trained XGBoost model")
+                self.reload()
+            except FileNotFoundError:
+                self._load_legacy_pickles()
             except Exception as e:
-                print(f"Failed to load model: {e}. Using placeholder.")
-                self._init_placeholder()
-        else:
+                print(f"Failed to load model artifact: {e}. Using placeholder.")
+            self._loaded = True
+
+    def _load_legacy_pickles(self):
+        if not (MODEL_PATH.exists() and SCALER_PATH.exists()):
             print("No trained model found. Using placeholder.")
-            self._init_placeholder()
+            return
+        try:
+            with open(MODEL_PATH, "rb") as f:
+                self.model = pickle.load(f)
+            with open(SCALER_PATH, "rb") as f:
+                self.scaler = pickle.load(f)
+            self._swap(TreeEngine.from_xgboost(self.model, self.scaler), "legacy-pickle", {})
+            print("Loaded legacy pickled XGBoost model; re-run train_fairscore.py to export an artifact")
+        except Exception as e:
+            print(f"Failed to load model: {e}. Using placeholder.")
+
+    def _swap(self, engine: TreeEngine, version: str, manifest: Dict[str, Any]):
+        # Readers take self.engine once per call, so the swap is a single reference assignment
+        self.engine, self.version, self.manifest = engine, version, manifest
+        self.cache.clear()  # After the assignment: results from the old engine are rejected
+        self._loaded = True
+
+    def reload(self, version: Optional[str] = None) -> str:
+        """
+        Load an artifact version (default: the LATEST pointer) and swap it in.
+
+        In-flight predictions finish on the previous engine. Raises
+        FileNotFoundError / ValueError (missing, corrupt or incompatible
+        artifact) and keeps serving the current model in that case.
+        """
+        artifact = load_artifact(version, self.artifact_root, feature_order=FEATURE_ORDER)
+        self._swap(artifact.engine, artifact.version, artifact.manifest)
+        print(f"Loaded FairScore model artifact {artifact.version}")
+        return artifact.version
+
+    def info(self) -> Dict[str, Any]:
+        """Currently served model: version, feature order and training metrics."""
+        self._ensure_loaded()
+        engine = self.engine
+        return {
+            "model": "xgboost-tree-engine" if engine is not None else "placeholder",
+            "version": self.version,
+            "feature_order": FEATURE_ORDER,
+            "n_trees": engine.n_trees if engine is not None else 0,
+            "created_at": self.manifest.get("created_at"),
+            "metrics": self.manifest.get("metrics", {}),
+            "cache": self.cache.stats(),
+        }
 
     def _init_placeholder(self):
         """Initialize placeholder weights."""
@@ -70,6 +168,10 @@ class FairScoreModel:
             "academic_score": 5,
             "emi_count": -2,
         }
+        # Compiled once: score = base + matrix @ weights; explanations keep the dict's names and order
+        self._placeholder_names = list(self.feature_weights)
+        self._placeholder_columns = SCHEMA.columns(self._placeholder_names)
+        self._placeholder_weights = SCHEMA.weight_vector(self.feature_weights)
 
     def predict(self, features: Dict[str, float]) -> FairScoreResult:
         """
@@ -81,91 +183,101 @@ class FairScoreModel:
         Returns:
             FairScoreResult with score, explanations, suggestions
         """
-        # Normalize feature names (handle both avg_monthly_inflow and avg_inflow)
-        normalized = {}
-        for key, value in features.items():
-            # Map frontend names to backend names
-            if key == "avg_monthly_inflow":
-                normalized["avg_inflow"] = value
-                normalized["avg_monthly_inflow"] = value  # Keep both for placeholder
-            elif key == "avg_monthly_outflow":
-                normalized["avg_outflow"] = value
-                normalized["avg_monthly_outflow"] = value  # Keep both for placeholder
-            else:
-                normalized[key] = value
-        
-        if self.use_ml and self.model and self.scaler:
-            return self._predict_ml(normalized)
+        return self.predict_batch([features])[0]
+
+    def predict_batch(self, features_list: Sequence[Dict[str, float]], explain: bool = True) -> List[FairScoreResult]:
+        """
+        Predict FairScore for many users at once.
+
+        Builds one N x 7 matrix, so the ML path runs a single vectorized
+        tree-engine pass for the scores. With explain=False the
+        explanations and suggestions are left empty.
+        """
+        return self.predict_matrix(feature_matrix(features_list), explain=explain)
+
+    def predict_matrix(self, matrix: np.ndarray, explain: bool = True) -> List[FairScoreResult]:
+        """
+        Predict from an N x 7 float matrix with columns in FEATURE_ORDER.
+
+        Requests of up to CACHE_MAX_ROWS rows are answered from the score cache
+        where possible. The QUANTUM-snapped row is only the cache key; misses
+        are scored on the row as given, as larger batches are.
+        """
+        self._ensure_loaded()
+        cache = self.cache
+        generation = cache.generation  # Before the engine: see ScoreCache.put_many
+        engine, version = self.engine, self.version  # One engine per call, even if reload() swaps concurrently
+        if not cache.enabled or len(matrix) > CACHE_MAX_ROWS:
+            return self._score_matrix(engine, matrix, explain)
+
+        keys, results = cache.lookup(version, explain, matrix)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fresh = self._score_matrix(engine, matrix[missing], explain)
+            for i, result in zip(missing, fresh):
+                results[i] = result
+            cache.put_many([keys[i] for i in missing], fresh, generation)
+        return results
+
+    def _score_matrix(self, engine: Optional[TreeEngine], matrix: np.ndarray, explain: bool) -> List[FairScoreResult]:
+        if engine is not None:
+            scores, names, contributions, eligible = self._predict_ml(engine, matrix, explain)
         else:
-            return self._predict_placeholder(normalized)
+            scores, names, contributions, eligible = self._predict_placeholder(matrix, explain)
 
-    def _predict_ml(self, features: Dict[str, float]) -> FairScoreResult:
-        """Predict using trained XGBoost model."""
-        # Build feature vector in correct order
-        feature_vec = np.array([[features.get(f, 0) for f in FEATURE_ORDER]])
-        
-        # Scale
-        feature_vec_scaled = self.scaler.transform(feature_vec)
-        
-        # Predict
-        score = self.model.predict(feature_vec_scaled)[0]
-        score = max(0, min(100, int(score)))
-        
-        # Get SHAP-like feature contributions (using feature importance approximation)
-        # For MVP, use simple difference-based contributions
-        contributions = []
-        base_features = np.zeros((1, len(FEATURE_ORDER)))
-        base_pred = self.model.predict(self.scaler.transform(base_features))[0]
-        
-        for i, feat_name in enumerate(FEATURE_ORDER):
-            feat_value = features.get(feat_name, 0)
-            if feat_value != 0:
-                # Approximate contribution by setting feature to 0
-                test_features = feature_vec_scaled.copy()
-                test_features[0, i] = 0
-                pred_without = self.model.predict(test_features)[0]
-                contribution = score - pred_without
-                contributions.append({
-                    "feature": feat_name,
-                    "contribution": round(contribution, 2),
-                })
-        
-        # Sort by absolute contribution
-        contributions.sort(key=lambda x: abs(x["contribution"]), reverse=True)
-        top3 = contributions[:3]
-        
-        suggestions = self._generate_suggestions(features, top3)
-        
-        return FairScoreResult(score=score, explanations=top3, suggestions=suggestions)
+        if not explain:
+            return [FairScoreResult(score=score, explanations=[], suggestions=[]) for score in scores.tolist()]
 
-    def _predict_placeholder(self, features: Dict[str, float]) -> FairScoreResult:
-        """Predict using placeholder weighted sum."""
-        base = 50
-        contributions = []
-        score = base
-        
-        # Map to placeholder feature names
-        mapped_features = {
-            "avg_monthly_inflow": features.get("avg_inflow", features.get("avg_monthly_inflow", 0)),
-            "avg_monthly_outflow": features.get("avg_outflow", features.get("avg_monthly_outflow", 0)),
-            "savings_rate": features.get("savings_rate", 0),
-            "volatility": features.get("volatility", 0),
-            "part_time_income": features.get("part_time_income", 0),
-            "academic_score": features.get("academic_score", 0),
-            "emi_count": features.get("emi_count", 0),
-        }
-        
-        for feat, weight in self.feature_weights.items():
-            value = mapped_features.get(feat, 0)
-            contribution = value * weight
-            contributions.append({"feature": feat, "contribution": round(contribution, 2)})
-            score += contribution
-        
-        bounded_score = max(0, min(100, int(score)))
-        sorted_contribs = sorted(contributions, key=lambda c: abs(c["contribution"]), reverse=True)[:3]
-        suggestions = self._generate_suggestions(mapped_features, sorted_contribs)
-        
-        return FairScoreResult(score=bounded_score, explanations=sorted_contribs, suggestions=suggestions)
+        # Top 3 eligible features per user by absolute (rounded) contribution, ties in feature order
+        key = np.where(eligible, np.abs(np.round(contributions, 2)), -1.0)
+        top = np.argsort(-key, axis=1, kind="stable")[:, :3]
+        top_values = np.take_along_axis(contributions, top, axis=1).tolist()
+        top_eligible = np.take_along_axis(eligible, top, axis=1).tolist()
+
+        suggestion_cache: Dict[tuple, List[str]] = {}  # Suggestions depend only on feature + sign
+        results = []
+        for score, order, values, ok in zip(scores.tolist(), top.tolist(), top_values, top_eligible):
+            top3 = [
+                {"feature": names[i], "contribution": round(value, 2)}
+                for i, value, keep in zip(order, values, ok)
+                if keep
+            ]
+            signature = tuple((item["feature"], item["contribution"] < 0) for item in top3)
+            suggestions = suggestion_cache.get(signature)
+            if suggestions is None:
+                suggestions = suggestion_cache[signature] = self._generate_suggestions({}, top3)
+            results.append(FairScoreResult(score=score, explanations=top3, suggestions=list(suggestions)))
+        return results
+
+    def _predict_ml(self, engine: TreeEngine, matrix: np.ndarray, explain: bool):
+        """Scores and exact TreeSHAP contributions from the trained model's tree engine."""
+        raw = engine.predict(matrix)
+        scores = np.clip(np.trunc(raw), 0, 100).astype(int)
+
+        contributions = np.zeros(matrix.shape)
+        if explain:
+            contributions = engine.contributions(matrix)[:, :-1]
+        return scores, FEATURE_ORDER, contributions, np.ones(contributions.shape, dtype=bool)
+
+    def shap_values(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        TreeSHAP contributions for raw (unscaled) N x 7 feature rows.
+
+        Returns an N x 8 array: one column per FEATURE_ORDER feature plus the
+        bias (expected score, engine.expected_value) last; each row sums to the
+        model's prediction.
+        """
+        self._ensure_loaded()
+        return self.engine.contributions(matrix)
+
+    def _predict_placeholder(self, matrix: np.ndarray, explain: bool):
+        """Scores from the placeholder linear model: one matrix-vector product."""
+        raw = np.nan_to_num(50.0 + matrix @ self._placeholder_weights, nan=50.0)  # 50 = base score; NaN as missing
+        scores = np.clip(np.trunc(raw), 0, 100).astype(int)
+        contributions = np.zeros((len(matrix), len(self._placeholder_names)))
+        if explain:
+            contributions = matrix[:, self._placeholder_columns] * self._placeholder_weights[self._placeholder_columns]
+        return scores, self._placeholder_names, contributions, np.ones(contributions.shape, dtype=bool)
 
     def _generate_suggestions(self, features: Dict[str, float], top_contribs: List[Dict]) -> List[str]:
         """Generate improvement suggestions based on top contributions."""
@@ -191,7 +303,3 @@ class FairScoreModel:
             ]
         
         return suggestions[:3]
-
-
-# Global model instance
-model = FairScoreModel()
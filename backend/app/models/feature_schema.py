@@ -0,0 +1,80 @@
+"""
+FairScore feature schema.
+
+One place that knows the model's column order and the frontend aliases
+(avg_monthly_inflow -> avg_inflow). Aliases are resolved into a name -> column
+table once; feature dicts, batches and uploaded tables all become the same dense
+N x F float64 matrix, which the tree engine and the placeholder linear scorer
+both consume. float64 (not float32) because the engine reproduces XGBoost's
+float32 cast of the *scaled* value; rounding raw inputs to float32 first
+could move a row across a split.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class FeatureSchema:
+    order: Tuple[str, ...]
+    aliases: Dict[str, str] = field(default_factory=dict)  # Input name -> name in order
+    index: Dict[str, int] = field(init=False, repr=False)  # Input name (canonical or alias) -> column
+
+    def __post_init__(self):
+        index = {name: i for i, name in enumerate(self.order)}
+        index.update({alias: index[name] for alias, name in self.aliases.items()})
+        object.__setattr__(self, "index", index)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.order)
+
+    def normalize(self, features: Dict[str, float]) -> Dict[str, float]:
+        """Map aliased names to canonical ones; unknown keys are kept as given."""
+        return {self.aliases.get(key, key): value for key, value in features.items()}
+
+    def matrix(self, features_list: Sequence[Dict[str, float]]) -> np.ndarray:
+        """
+        N x F float64 matrix in schema order; missing features are 0 and when
+        a dict has both a name and its alias, the later key wins. Non-numeric
+        values raise TypeError / ValueError; null, NaN and +-inf raise ValueError.
+        """
+        index, width = self.index, len(self.order)
+        rows = []
+        for features in features_list:
+            row = [0] * width
+            for key, value in features.items():
+                i = index.get(key)
+                if i is not None:
+                    row[i] = value
+            rows.append(row)
+        return self._check_finite(np.array(rows, dtype=np.float64).reshape(-1, width))
+
+    def frame_matrix(self, frame) -> np.ndarray:
+        """
+        N x F matrix from a pandas DataFrame; missing columns and empty cells
+        are 0, +-inf raises ValueError.
+        """
+        renames = {alias: name for alias, name in self.aliases.items() if name not in frame.columns}
+        frame = frame.rename(columns=renames).reindex(columns=list(self.order), fill_value=0)
+        return self._check_finite(frame.astype(np.float64).fillna(0).to_numpy())
+
+    def _check_finite(self, matrix: np.ndarray) -> np.ndarray:
+        finite = np.isfinite(matrix)
+        if not finite.all():
+            row, column = np.argwhere(~finite)[0]
+            raise ValueError(f"{self.order[column]} must be a finite number, got {matrix[row, column]} (row {row})")
+        return matrix
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Per-feature weights (canonical or aliased names) as a dense vector in schema order."""
+        vector = np.zeros(len(self.order))
+        for name, weight in weights.items():
+            vector[self.index[name]] = weight
+        return vector
+
+    def columns(self, names: Sequence[str]) -> List[int]:
+        return [self.index[name] for name in names]
+
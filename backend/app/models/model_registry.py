@@ -0,0 +1,290 @@
+"""
+FairScore model registry: hot reload and weighted A/B routing.
+
+Each served artifact version is its own FairScoreModel. A daemon thread makes
+the first load at startup and then polls the artifact directory's LATEST
+pointer; a new version is loaded (manifest verified) on that thread, then the
+routing table is replaced with a single reference assignment. /score requests
+never trigger a load once the first one is done, and in-flight requests finish
+on the version they were routed to. TreeSHAP state is built lazily by each
+engine on its first explanation (see tree_engine.SHAP_TABLE_BUDGET).
+
+By default all traffic follows LATEST. set_weights() pins a split such as
+{"20261001-090000": 0.9, "20261016-202047": 0.1}; requests with a routing key
+(user_id) are assigned by hash, so a user sees one version consistently.
+Per-version request counts, latency percentiles and score histograms are kept
+for comparing versions.
+"""
+
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .artifacts import ARTIFACT_ROOT, latest_version, list_versions
+from .fairscore_model import FairScoreModel, FairScoreResult, feature_matrix
+
+POLL_SECONDS = 5.0
+LATENCY_WINDOW = 2048  # Most recent requests per version used for percentiles
+SCORE_BUCKETS = 10  # 0-9, 10-19, ..., 90-100
+DEFAULT_VERSION = "default"  # Legacy pickles or placeholder, when no artifact exists
+
+
+@dataclass
+class VersionStats:
+    """Request, latency and score-distribution counters for one model version."""
+
+    requests: int = 0
+    rows: int = 0
+    score_sum: int = 0
+    score_histogram: List[int] = field(default_factory=lambda: [0] * SCORE_BUCKETS)
+    latencies_us: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, latency_s: float, scores: Sequence[int]) -> None:
+        scores = np.clip(np.asarray(scores, dtype=np.int64), 0, 100)  # Histogram buckets need 0..100
+        self.requests += 1
+        self.rows += len(scores)
+        self.score_sum += int(scores.sum())
+        buckets = np.bincount(np.minimum(scores // SCORE_BUCKETS, SCORE_BUCKETS - 1), minlength=SCORE_BUCKETS)
+        for i, count in enumerate(buckets.tolist()):
+            self.score_histogram[i] += count
+        self.latencies_us.append(latency_s * 1e6)
+
+    def snapshot(self) -> Dict:
+        latencies = np.array(self.latencies_us) if self.latencies_us else None
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "mean_score": round(self.score_sum / self.rows, 2) if self.rows else None,
+            "score_histogram": {
+                f"{i * SCORE_BUCKETS}-{i * SCORE_BUCKETS + SCORE_BUCKETS - 1}": count
+                for i, count in enumerate(self.score_histogram)
+            },
+            "latency_us": {
+                f"p{q}": round(float(np.percentile(latencies, q)), 1) for q in (50, 95, 99)
+            } if latencies is not None else {},
+        }
+
+
+@dataclass(frozen=True)
+class _Routes:
+    """Immutable routing table; replaced as a whole on every change."""
+
+    versions: Tuple[str, ...]
+    cumulative: Tuple[float, ...]  # Cumulative normalized weights, last == 1.0
+    models: Dict[str, FairScoreModel]
+    follow_latest: bool
+
+    def pick(self, key: Optional[str]) -> str:
+        if len(self.versions) == 1:
+            return self.versions[0]
+        point = (zlib.crc32(key.encode("utf-8")) / 2 ** 32) if key is not None else random.random()
+        for version, edge in zip(self.versions, self.cumulative):
+            if point < edge:
+                return version
+        return self.versions[-1]
+
+
+class ModelRegistry:
+    """Serves one or more FairScore artifact versions with weighted routing."""
+
+    def __init__(self, root: Path = ARTIFACT_ROOT, poll_seconds: float = POLL_SECONDS):
+        self.root = Path(root)
+        self.poll_seconds = poll_seconds
+        self._routes: Optional[_Routes] = None
+        self._stats: Dict[str, VersionStats] = {}
+        self._load_lock = threading.Lock()  # One load / routing change at a time
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def route(self, key: Optional[str] = None) -> Tuple[str, FairScoreModel]:
+        """(version, model) for one request; key (e.g. user_id) makes the choice sticky."""
+        routes = self._routes or self._initial_routes()
+        version = routes.pick(key)
+        return version, routes.models[version]
+
+    def predict_matrix(
+        self, matrix: np.ndarray, explain: bool = True, key: Optional[str] = None
+    ) -> Tuple[str, List[FairScoreResult]]:
+        """Route, score and record per-version stats. A batch is routed as one unit."""
+        version, model = self.route(key)
+        start = time.perf_counter()
+        results = model.predict_matrix(matrix, explain=explain)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats.setdefault(version, VersionStats()).record(elapsed, [r.score for r in results])
+        return version, results
+
+    def predict_batch(
+        self, features_list: Sequence[Dict[str, float]], explain: bool = True, key: Optional[str] = None
+    ) -> Tuple[str, List[FairScoreResult]]:
+        return self.predict_matrix(feature_matrix(features_list), explain=explain, key=key)
+
+    # ------------------------------------------------------------------
+    # Loading and routing changes
+    # ------------------------------------------------------------------
+
+    def _check_versions(self, versions) -> None:
+        """ValueError unless every version is a version directory under the artifact root."""
+        known = set(list_versions(self.root))
+        unknown = sorted(str(version) for version in versions if version not in known)
+        if unknown:
+            raise ValueError(f"Unknown artifact version(s) {unknown}; available: {sorted(known)}")
+
+    def _load(self, version: str, routes: Optional[_Routes]) -> FairScoreModel:
+        """Reuse an already-served model, else load the artifact (blocking)."""
+        if routes is not None and version in routes.models:
+            return routes.models[version]
+        self._check_versions([version])  # Never a path outside the artifact root (e.g. "../x")
+        model = FairScoreModel(artifact_root=self.root)
+        model.reload(version)
+        return model
+
+    def _initial_routes(self) -> _Routes:
+        with self._load_lock:
+            if self._routes is None:
+                version = latest_version(self.root)
+                try:
+                    if version is not None:
+                        self._routes = _Routes((version,), (1.0,), {version: self._load(version, None)}, True)
+                except Exception as e:  # Corrupt artifact: serve the fallback, let the watcher retry
+                    print(f"FairScore registry: failed to load {version}: {e}")
+                    self.last_error = str(e)
+                if self._routes is None:
+                    fallback = FairScoreModel()
+                    fallback._ensure_loaded()  # Legacy pickles load here, not on the first request
+                    self._routes = _Routes((DEFAULT_VERSION,), (1.0,), {DEFAULT_VERSION: fallback}, True)
+            return self._routes
+
+    def set_weights(self, weights: Dict[str, float]) -> None:
+        """
+        Split traffic between versions, e.g. {"v1": 0.9, "v2": 0.1}.
+
+        Missing versions are loaded first (ValueError for a version that is
+        not a directory under the artifact root or cannot be loaded); the
+        split then stays pinned until follow_latest().
+        """
+        weights = {version: float(w) for version, w in weights.items() if w > 0}
+        if not weights:
+            raise ValueError("At least one version needs a positive weight")
+        self._check_versions(weights)
+        with self._load_lock:
+            current = self._routes
+            models = {version: self._load(version, current) for version in sorted(weights)}
+            total = sum(weights.values())
+            cumulative = tuple(np.cumsum([weights[v] / total for v in sorted(weights)]).tolist()[:-1]) + (1.0,)
+            self._routes = _Routes(tuple(sorted(weights)), cumulative, models, False)
+
+    def follow_latest(self) -> Optional[str]:
+        """Route all traffic to LATEST again (loading it now if needed); returns the version."""
+        with self._load_lock:
+            version = latest_version(self.root)
+            if version is None:
+                raise FileNotFoundError(f"No LATEST artifact in {self.root}")
+            self._routes = _Routes((version,), (1.0,), {version: self._load(version, self._routes)}, True)
+            return version
+
+    def refresh(self) -> bool:
+        """One watcher step: swap to a new LATEST when following it. True if swapped."""
+        routes = self._routes
+        if routes is None or not routes.follow_latest:
+            return False
+        version = latest_version(self.root)
+        if version is None or routes.versions == (version,):
+            return False
+        with self._load_lock:
+            if self._routes is not routes:  # Changed while we were checking
+                return False
+            model = self._load(version, routes)
+            self._routes = _Routes((version,), (1.0,), {version: model}, True)
+        print(f"FairScore registry: now serving {version}")
+        return True
+
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background directory watcher (idempotent)."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="fairscore-registry", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _watch(self) -> None:
+        try:
+            self._initial_routes()  # First load here rather than on the first request
+        except Exception as e:
+            print(f"FairScore registry: initial load failed: {e}")
+            self.last_error = str(e)
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:  # Bad artifact: keep serving the current version
+                if str(e) != self.last_error:
+                    print(f"FairScore registry: failed to load new version: {e}")
+                self.last_error = str(e)
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def info(self) -> Dict:
+        """Routing table and the served versions' metadata."""
+        routes = self._routes or self._initial_routes()
+        previous = 0.0
+        versions = {}
+        for version, edge in zip(routes.versions, routes.cumulative):
+            versions[version] = {"weight": round(edge - previous, 6), **routes.models[version].info()}
+            previous = edge
+        return {
+            "follow_latest": routes.follow_latest,
+            "latest": latest_version(self.root),
+            "versions": versions,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            "last_error": self.last_error,
+        }
+
+    def stats(self) -> Dict:
+        """Per-version counters, including versions no longer served; served versions add cache stats."""
+        models = self._routes.models if self._routes is not None else {}
+        with self._stats_lock:
+            stats = {version: stats.snapshot() for version, stats in self._stats.items()}
+        for version, model in models.items():
+            stats.setdefault(version, VersionStats().snapshot())["cache"] = model.cache.stats()
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the process-wide registry and start its watcher."""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+        _registry.start()
+    return _registry
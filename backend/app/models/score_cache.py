@@ -0,0 +1,144 @@
+"""
+FairScore result cache.
+
+The Finance360 -> FairScore flow re-sends identical or near-identical feature
+dicts (retries, frontend re-renders). ScoreCache is an LRU + TTL map from
+
+    (model version, explain flag, quantized FEATURE_ORDER row)
+
+to the FairScoreResult. Rows are quantized to QUANTUM per feature (1 paisa,
+1e-6 for rates, ...) for the key only: the model always scores the row as
+given, so a request scores the same with or without the cache and whatever
+the batch size. Rows in one quantization cell share the result of the first
+one scored; the steps are finer than any split the trained trees make in
+practice. The cache is bounded by entry count and approximate bytes, and
+FairScoreModel clears it whenever a new artifact is swapped in.
+
+Sizing comes from FAIRSCORE_CACHE_SIZE (entries, 0 disables),
+FAIRSCORE_CACHE_TTL (seconds) and FAIRSCORE_CACHE_MB.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CACHE_SIZE = int(os.getenv("FAIRSCORE_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("FAIRSCORE_CACHE_TTL", "300"))
+CACHE_MB = float(os.getenv("FAIRSCORE_CACHE_MB", "16"))
+CACHE_MAX_ROWS = 32  # Larger batches (cohorts, uploads) bypass the cache
+
+# Quantization step per FEATURE_ORDER column: inflow, outflow, savings_rate,
+# volatility, academic_score, part_time_income, emi_count
+QUANTUM = np.array([0.01, 0.01, 1e-6, 1e-6, 1e-3, 0.01, 1.0])
+
+_ENTRY_OVERHEAD = 400  # OrderedDict slot, tuple, timestamp, result object
+
+
+def _result_size(key: bytes, result) -> int:
+    """Approximate bytes held by one entry."""
+    size = _ENTRY_OVERHEAD + sys.getsizeof(key)
+    size += sum(sys.getsizeof(item) + sys.getsizeof(item["feature"]) for item in result.explanations)
+    size += sum(sys.getsizeof(text) for text in result.suggestions)
+    return size
+
+
+class ScoreCache:
+    """Thread-safe LRU + TTL cache of FairScoreResults, bounded by entries and bytes."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL, max_bytes: int = int(CACHE_MB * 2 ** 20)):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, Tuple[float, int, object]]" = OrderedDict()  # key -> (expires, size, result)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by clear(); read before the engine a result is computed with
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def lookup(
+        self, version: Optional[str], explain: bool, matrix: np.ndarray
+    ) -> Tuple[List[Optional[bytes]], List[Optional[object]]]:
+        """(key per row, cached result or None per row); rows containing NaN / inf get no key."""
+        with np.errstate(invalid="ignore"):
+            grid = np.round(matrix / QUANTUM)
+        finite = np.isfinite(grid).all(axis=1)
+        prefix = f"{version}|{int(explain)}|".encode("utf-8")
+        keys = [
+            prefix + row.astype(np.int64).tobytes() if ok else None
+            for row, ok in zip(grid, finite.tolist())
+        ]
+
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key) if key is not None else None
+                if entry is not None and entry[0] <= now:
+                    self._drop(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += key is not None
+                    found.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found.append(entry[2])
+        return keys, found
+
+    def put_many(self, keys: Sequence[Optional[bytes]], results: Sequence[object], generation: int) -> None:
+        """Store results computed while generation was current; dropped if clear() ran since."""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self.generation:
+                return
+            for key, result in zip(keys, results):
+                if key is None:
+                    continue
+                if key in self._entries:
+                    self._drop(key)
+                size = _result_size(key, result)
+                self._entries[key] = (expires, size, result)
+                self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: bytes) -> None:
+        self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        """Drop every entry (model reload) and reject results still being computed."""
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -4,23 +4,53 @@ Train XGBoost model for FairScore prediction.
 This script:
 1. Loads realistic_fairscore_dataset.csv (with income distribution-based data)
 2. Trains an XGBoost regressor
-3. Saves model + feature scaler to disk
+3. Exports model + feature scaler as a new versioned artifact (booster JSON,
+   scaler .npz, NumPy tree engine, manifest) and points LATEST at it; running
+   servers pick it up via FairScoreModel.reload()
+
+Usage (from backend/):
+    python app/models/train_fairscore.py              # Fixed parameters (train [--data PATH])
+    python app/models/train_fairscore.py search [--trials 27] [--folds 5] [--workers 4]
+
+search runs a randomized hyperparameter search with successive halving: every
+config is scored by k-fold CV on a row subsample, the best 1/eta advance to a
+rung with eta x more rows, until the survivors see the full dataset. Trials
+run in a process pool (each xgboost fit uses --threads-per-trial threads) with
+early stopping on a slice of each training fold. The winner is refit on an
+80/20 split of all rows and exported like train, with its CV metrics.
 """
 
+import argparse
+import json
+import math
+import multiprocessing
 import os
-import pickle
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, train_test_split
 from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 
+if __package__:
+    from .artifacts import ARTIFACT_ROOT, export_artifact
+    from .tree_engine import TreeEngine
+else:  # Run as a script: python app/models/train_fairscore.py
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+    from app.models.artifacts import ARTIFACT_ROOT, export_artifact
+    from app.models.tree_engine import TreeEngine
+
 # Paths
 DATA_DIR = Path(__file__).parent.parent.parent.parent / "data"
 DATASET_PATH = DATA_DIR / "realistic_fairscore_dataset.csv"
 MODEL_DIR = Path(__file__).parent
-MODEL_PATH = MODEL_DIR / "fairscore_model.pkl"
-SCALER_PATH = MODEL_DIR / "fairscore_scaler.pkl"
 
 FEATURE_COLS = [
     "avg_inflow",
@@ -33,25 +63,58 @@ FEATURE_COLS = [
 ]
 TARGET_COL = "label_score"
 
+CSV_CHUNK_ROWS = 500_000  # Rows per pandas chunk when pyarrow is not installed
+EARLY_STOPPING_ROUNDS = 20
+EARLY_STOPPING_FRACTION = 0.1  # Of each training fold, held out to decide when to stop
+MIN_RUNG_ROWS = 2_000
+
+
+def load_dataset(path: Path, chunk_rows: int = CSV_CHUNK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    float32 feature matrix (FEATURE_COLS order) and target from a CSV or Parquet file.
+
+    Uses pyarrow's multithreaded reader when installed; otherwise pandas in
+    chunks, so peak memory is the float32 arrays plus one chunk rather than a
+    whole float64 DataFrame. Parquet always needs pyarrow.
+    """
+    columns = FEATURE_COLS + [TARGET_COL]
+    if Path(path).suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
 
-def train_model():
+        table = pq.read_table(path, columns=columns)
+        X = np.column_stack([table[c].to_numpy().astype(np.float32) for c in FEATURE_COLS])
+        return X, table[TARGET_COL].to_numpy().astype(np.float32)
+    try:
+        import pyarrow.csv as pacsv
+
+        table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(include_columns=columns))
+        X = np.column_stack([table[c].to_numpy().astype(np.float32) for c in FEATURE_COLS])
+        return X, table[TARGET_COL].to_numpy().astype(np.float32)
+    except ImportError:
+        pass
+
+    features, targets = [], []
+    for chunk in pd.read_csv(path, usecols=columns, dtype=np.float32, chunksize=chunk_rows):
+        features.append(chunk[FEATURE_COLS].to_numpy())
+        targets.append(chunk[TARGET_COL].to_numpy())
+    return np.concatenate(features), np.concatenate(targets)
+
+
+def train_model(data_path: Path = DATASET_PATH):
     """Train XGBoost model and save artifacts."""
-    print(f"Loading dataset from {DATASET_PATH}")
+    print(f"Loading dataset from {data_path}")
     
-    if not DATASET_PATH.exists():
-        print(f"ERROR: Dataset not found at {DATASET_PATH}")
+    if not data_path.exists():
+        print(f"ERROR: Dataset not found at {data_path}")
         print("Please run: python data/generate_fairscore_dataset.py")
         return
     
-    df = pd.read_csv(DATASET_PATH)
-    print(f"Loaded {len(df)} rows")
-    
-    X = df[FEATURE_COLS]
-    y = df[TARGET_COL]
+    X, y = load_dataset(data_path)
+    print(f"Loaded {len(X):,} rows")
     
-    # Split data
+    # Split data (float64 so the export check sees serving inputs)
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+        X.astype(np.float64), y, test_size=0.2, random_state=42
     )
     
     # Scale features
@@ -76,16 +139,196 @@ def train_model():
     print(f"Test R²: {test_score:.3f}")
     
     # Save model and scaler
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump(model, f)
-    print(f"Model saved to {MODEL_PATH}")
-    
-    with open(SCALER_PATH, "wb") as f:
-        pickle.dump(scaler, f)
-    print(f"Scaler saved to {SCALER_PATH}")
+    export_model(model, scaler, X_test, X_test_scaled,
+                 {"train_r2": round(train_score, 4), "test_r2": round(test_score, 4)})
     
     print("Training complete!")
 
 
+def export_model(model, scaler, X_test: np.ndarray, X_test_scaled: np.ndarray, metrics: Dict) -> Optional[Path]:
+    """Export as the new LATEST artifact, if the served engine reproduces XGBoost."""
+    engine = TreeEngine.from_xgboost(model, scaler)
+    engine_error = np.abs(engine.predict(X_test) - model.predict(X_test_scaled)).max()
+    if engine_error > 1e-5:
+        print(f"ERROR: tree engine differs from XGBoost by {engine_error:.2e}; not exporting")
+        return None
+    path = export_artifact(model, scaler, FEATURE_COLS, root=ARTIFACT_ROOT, metrics=metrics)
+    print(f"Model artifact saved to {path} (now LATEST)")
+    return path
+
+
+# ----------------------------------------------------------------------
+# Hyperparameter search
+# ----------------------------------------------------------------------
+
+def sample_params(rng: random.Random, max_estimators: int) -> Dict:
+    """One random config; n_estimators is a cap, early stopping picks the count."""
+    return {
+        "n_estimators": max_estimators,
+        "max_depth": rng.randint(3, 8),
+        "learning_rate": round(10 ** rng.uniform(-1.7, -0.5), 4),  # ~0.02 - 0.32
+        "subsample": round(rng.uniform(0.6, 1.0), 2),
+        "colsample_bytree": round(rng.uniform(0.6, 1.0), 2),
+        "min_child_weight": rng.choice([1, 2, 4, 8]),
+        "reg_lambda": round(10 ** rng.uniform(-1, 1), 3),
+    }
+
+
+def halving_schedule(n_rows: int, trials: int, eta: int, min_rows: int) -> List[int]:
+    """Rows per rung: eta x more each rung, ending at the full dataset."""
+    rungs = max(1, int(math.log(trials, eta)) + 1) if trials > 1 else 1
+    rows = [min(n_rows, max(min_rows, n_rows // eta ** (rungs - 1 - r))) for r in range(rungs)]
+    return sorted(set(rows))
+
+
+_worker_data: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(x_path: str, y_path: str):
+    """Pool initializer: memory-map the dataset once per worker process."""
+    _worker_data["X"] = np.load(x_path, mmap_mode="r")
+    _worker_data["y"] = np.load(y_path, mmap_mode="r")
+
+
+def _run_trial(trial: int, params: Dict, rows: int, folds: int, seed: int, threads: int) -> Dict:
+    """k-fold CV R² of one config on the first `rows` rows of a seeded shuffle."""
+    start = time.perf_counter()
+    X_all, y_all = _worker_data["X"], _worker_data["y"]
+    subset = np.sort(np.random.default_rng(seed).permutation(len(X_all))[:rows])
+    X, y = np.asarray(X_all[subset]), np.asarray(y_all[subset])
+
+    scores, trees = [], []
+    for train_idx, val_idx in KFold(n_splits=folds, shuffle=True, random_state=seed).split(X):
+        # Early stopping on a slice of the training fold; the validation fold stays unseen.
+        # No scaler here: tree splits are invariant to per-feature affine scaling.
+        n_stop = max(1, int(len(train_idx) * EARLY_STOPPING_FRACTION))
+        fit_idx, stop_idx = train_idx[n_stop:], train_idx[:n_stop]
+        model = xgb.XGBRegressor(
+            **params, tree_method="hist", n_jobs=threads, random_state=seed,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        )
+        model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
+        scores.append(r2_score(y[val_idx], model.predict(X[val_idx])))
+        trees.append(model.best_iteration + 1)
+
+    return {
+        "trial": trial,
+        "rows": rows,
+        "params": params,
+        "cv_r2": float(np.mean(scores)),
+        "cv_r2_std": float(np.std(scores)),
+        "trees": int(round(np.mean(trees))),
+        "wall_s": round(time.perf_counter() - start, 2),
+    }
+
+
+def search(
+    data_path: Path = DATASET_PATH,
+    trials: int = 27,
+    folds: int = 5,
+    eta: int = 3,
+    workers: Optional[int] = None,
+    threads_per_trial: int = 1,
+    max_estimators: int = 1000,
+    min_rows: int = MIN_RUNG_ROWS,
+    seed: int = 42,
+    log_path: Optional[Path] = None,
+) -> Optional[Path]:
+    """Successive-halving random search; exports the refit winner and returns its artifact path."""
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+    start = time.perf_counter()
+    X, y = load_dataset(data_path)
+    print(f"Loaded {len(X):,} rows from {data_path} in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(seed)
+    configs = {trial: sample_params(rng, max_estimators) for trial in range(trials)}
+    schedule = halving_schedule(len(X), trials, eta, max(min_rows, folds * 20))
+    print(f"{trials} configs, {folds}-fold CV, rungs of {', '.join(f'{r:,}' for r in schedule)} rows, "
+          f"{workers} workers x {threads_per_trial} threads")
+
+    log = open(log_path, "w", encoding="utf-8") if log_path else None
+    results: Dict[int, Dict] = {}
+    alive = list(configs)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            x_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+            np.save(x_path, X)
+            np.save(y_path, y)
+            # spawn: xgboost's OpenMP runtime is not fork-safe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(x_path, y_path)) as pool:
+                for rung, rows in enumerate(schedule):
+                    futures = [pool.submit(_run_trial, t, configs[t], rows, folds, seed, threads_per_trial)
+                               for t in alive]
+                    for future in as_completed(futures):
+                        result = {"rung": rung, **future.result()}
+                        results[result["trial"]] = result
+                        print(f"[rung {rung}] trial {result['trial']:3d}  rows {rows:>10,}  "
+                              f"R² {result['cv_r2']:.4f} ± {result['cv_r2_std']:.4f}  "
+                              f"trees {result['trees']:4d}  {result['wall_s']:7.1f}s  {result['params']}")
+                        if log:
+                            log.write(json.dumps(result) + "\n")
+                            log.flush()
+                    alive.sort(key=lambda t: results[t]["cv_r2"], reverse=True)
+                    if rung < len(schedule) - 1:
+                        alive = alive[:max(1, len(alive) // eta)]
+    finally:
+        if log:
+            log.close()
+
+    best = results[alive[0]]
+    print(f"Best trial {best['trial']}: CV R² {best['cv_r2']:.4f} ± {best['cv_r2_std']:.4f} "
+          f"with {best['trees']} trees, {best['params']} (search {time.perf_counter() - start:.0f}s)")
+
+    # Refit on all rows (80/20 like train_model), float64 so the export check sees serving inputs
+    X_train, X_test, y_train, y_test = train_test_split(
+        X.astype(np.float64), y, test_size=0.2, random_state=seed
+    )
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    model = xgb.XGBRegressor(**{**best["params"], "n_estimators": best["trees"]}, tree_method="hist",
+                             n_jobs=workers * threads_per_trial, random_state=seed)
+    model.fit(X_train_scaled, y_train)
+    train_score = model.score(X_train_scaled, y_train)
+    test_score = model.score(X_test_scaled, y_test)
+    print(f"Refit: Train R² {train_score:.3f}, Test R² {test_score:.3f}")
+    return export_model(model, scaler, X_test, X_test_scaled, {
+        "train_r2": round(train_score, 4),
+        "test_r2": round(test_score, 4),
+        "cv_r2": round(best["cv_r2"], 4),
+        "cv_r2_std": round(best["cv_r2_std"], 4),
+        "cv_folds": folds,
+        "search_trials": trials,
+        "params": {**best["params"], "n_estimators": best["trees"]},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the FairScore XGBoost model")
+    commands = parser.add_subparsers(dest="command")
+    train_parser = commands.add_parser("train", help="Fixed parameters on one 80/20 split (default)")
+    train_parser.add_argument("--data", type=Path, default=DATASET_PATH)
+    search_parser = commands.add_parser("search", help="Cross-validated successive-halving search")
+    search_parser.add_argument("--data", type=Path, default=DATASET_PATH)
+    search_parser.add_argument("--trials", type=int, default=27, help="Random configs in the first rung")
+    search_parser.add_argument("--folds", type=int, default=5)
+    search_parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta per rung, eta x more rows")
+    search_parser.add_argument("--workers", type=int, help="Trial processes (default: CPUs / threads)")
+    search_parser.add_argument("--threads-per-trial", type=int, default=1, help="xgboost n_jobs per trial")
+    search_parser.add_argument("--max-estimators", type=int, default=1000, help="Cap; early stopping decides")
+    search_parser.add_argument("--min-rows", type=int, default=MIN_RUNG_ROWS, help="Rows in the first rung")
+    search_parser.add_argument("--seed", type=int, default=42)
+    search_parser.add_argument("--log", type=Path, help="Write one JSON line per trial")
+    args = parser.parse_args()
+
+    if args.command == "search":
+        search(args.data, args.trials, args.folds, args.eta, args.workers, args.threads_per_trial,
+               args.max_estimators, args.min_rows, args.seed, args.log)
+    else:
+        train_model(getattr(args, "data", DATASET_PATH))  # No subcommand: defaults
+
+
 if __name__ == "__main__":
-    train_model()
+    main()
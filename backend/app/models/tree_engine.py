@@ -0,0 +1,419 @@
+"""
+Flat-array inference engine for the FairScore tree ensemble.
+
+Exports a trained XGBoost regressor (plus its StandardScaler) to plain NumPy
+arrays and evaluates it without xgboost:
+
+- Nodes of all trees are concatenated into flat arrays (feature, threshold,
+  left/right child, default direction); leaves point to themselves, so a
+  fixed number of vectorized steps walks every tree for every row at once.
+- The scaler is folded into the thresholds: XGBoost's float32 test
+  ``scaled < t`` becomes ``raw < t'`` on the unscaled features.
+- Exact TreeSHAP: every root-to-leaf path is reduced to at most ``depth``
+  unique features, each with a raw-space interval and the fraction of
+  training cover that follows it. Because a row either satisfies an interval
+  or not, the SHAP weight of every (leaf, satisfied-pattern) pair is
+  precomputed once, and explaining a row is a table lookup per leaf. The
+  table has leaves x 2^depth x features entries, so above
+  ``SHAP_TABLE_BUDGET`` the weights are computed per path for each row instead.
+  Nothing is built until the first explanation is requested.
+
+Only xgboost's JSON model dump is needed to build an engine; ``save``/``load``
+use one .npy file per array (memory-mapped on load), so serving needs NumPy only.
+"""
+
+import json
+from dataclasses import dataclass, field
+from math import factorial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = {"reg:squarederror", "reg:linear"}  # Identity link: output = margin
+SHAP_TABLE_BUDGET = 1 << 23  # Max float64 pattern-table entries (64 MB) before falling back to per-path TreeSHAP
+SHAP_PATH_CHUNK = 1 << 20  # Max rows x leaves x slots evaluated at once by per-path TreeSHAP
+
+
+def _float32_split(thresholds: np.ndarray) -> np.ndarray:
+    """
+    Float64 bounds m with ``float32(v) < t  <=>  v < m``.
+
+    XGBoost casts inputs to float32 before comparing, so the boundary is the
+    midpoint between t and the next float32 below it.
+    """
+    t = thresholds.astype(np.float32)
+    below = np.nextafter(t, np.float32(-np.inf))
+    return (t.astype(np.float64) + below.astype(np.float64)) / 2
+
+
+@dataclass
+class TreeEngine:
+    """Tree ensemble as flat node arrays in raw (unscaled) feature space."""
+
+    feature: np.ndarray  # intp per node; 0 for leaves
+    threshold: np.ndarray  # float64 per node: go left if x < threshold
+    left: np.ndarray  # intp per node; leaves point to themselves
+    right: np.ndarray
+    default_left: np.ndarray  # bool per node: direction for missing (NaN) values
+    value: np.ndarray  # float64 per node: leaf value (0 for internal nodes)
+    cover: np.ndarray  # float64 per node: training hessian sum
+    roots: np.ndarray  # intp index of each tree's root
+    base_score: float
+    n_features: int
+    depth: int
+    _shap: Optional[Dict[str, np.ndarray]] = field(default=None, repr=False, compare=False)
+    _shap_table: Optional[Dict[str, np.ndarray]] = field(default=None, repr=False, compare=False)
+    _expected_value: Optional[float] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Index arrays for the traversal: intp avoids a cast on every take()
+        self._roots = self.roots.astype(np.intp, copy=False)
+        self._feature = self.feature.astype(np.intp, copy=False)
+        self._children = np.stack([self.left, self.right], axis=1).ravel().astype(np.intp)
+        self._value32 = self.value.astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_xgboost_json(
+        cls,
+        model_json: Union[str, bytes, dict],
+        mean: Optional[Sequence[float]] = None,
+        scale: Optional[Sequence[float]] = None,
+        n_trees: Optional[int] = None,
+    ) -> "TreeEngine":
+        """
+        Build from ``booster.save_raw("json")`` output.
+
+        mean/scale are the StandardScaler's ``mean_``/``scale_`` and are folded
+        into the thresholds; n_trees keeps only the first trees (best_iteration).
+        """
+        raw = json.loads(model_json) if isinstance(model_json, (str, bytes, bytearray)) else model_json
+        learner = raw["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective {objective!r}; expected one of {sorted(SUPPORTED_OBJECTIVES)}")
+        n_features = int(learner["learner_model_param"]["num_feature"])
+        trees = learner["gradient_booster"]["model"]["trees"]
+        if n_trees is None and "best_iteration" in learner.get("attributes", {}):
+            n_trees = int(learner["attributes"]["best_iteration"]) + 1
+        trees = trees[:n_trees] if n_trees is not None else trees
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        parts: Dict[str, List[np.ndarray]] = {k: [] for k in ("feature", "threshold", "left", "right",
+                                                               "default_left", "value", "cover")}
+        roots, offset, depth = [], 0, 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float64)
+            feature = np.asarray(tree["split_indices"], dtype=np.int64)
+            is_leaf = left == -1
+            node = np.arange(len(left))
+
+            threshold = _float32_split(conditions) * scale[feature] + mean[feature]
+            parts["feature"].append(np.where(is_leaf, 0, feature))
+            parts["threshold"].append(np.where(is_leaf, np.inf, threshold))
+            parts["left"].append(np.where(is_leaf, node, left) + offset)
+            parts["right"].append(np.where(is_leaf, node, right) + offset)
+            parts["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+            parts["value"].append(np.where(is_leaf, conditions, 0.0))
+            parts["cover"].append(np.asarray(tree["sum_hessian"], dtype=np.float64))
+            roots.append(offset)
+            offset += len(left)
+            depth = max(depth, _tree_depth(left, right))
+
+        arrays = {k: np.concatenate(v) for k, v in parts.items()}
+        return cls(
+            feature=arrays["feature"].astype(np.intp),
+            threshold=arrays["threshold"],
+            left=arrays["left"].astype(np.intp),
+            right=arrays["right"].astype(np.intp),
+            default_left=arrays["default_left"],
+            value=arrays["value"],
+            cover=arrays["cover"],
+            roots=np.asarray(roots, dtype=np.intp),
+            base_score=float(learner["learner_model_param"]["base_score"]),
+            n_features=n_features,
+            depth=depth,
+        )
+
+    @classmethod
+    def from_xgboost(cls, model, scaler=None) -> "TreeEngine":
+        """Build from a fitted XGBRegressor (or Booster) and optional StandardScaler."""
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        best_iteration = getattr(model, "best_iteration", None)
+        return cls.from_xgboost_json(
+            booster.save_raw("json"),
+            mean=getattr(scaler, "mean_", None),
+            scale=getattr(scaler, "scale_", None),
+            n_trees=best_iteration + 1 if best_iteration is not None else None,
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "cover", "roots")
+
+    def save(self, directory: Union[str, Path]) -> Dict[str, Any]:
+        """Write one <name>.npy per array; returns the scalar metadata load() needs."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        return {"base_score": self.base_score, "n_features": self.n_features, "depth": self.depth}
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], meta: Dict[str, Any], mmap: bool = True) -> "TreeEngine":
+        """Load arrays written by save(); with mmap they are paged in from disk on use."""
+        directory = Path(directory)
+        arrays = {}
+        for name in cls.ARRAYS:
+            array = np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+            arrays[name] = array.view(np.ndarray)  # Plain ndarray view: memmap subclass overhead on every op
+        return cls(
+            base_score=float(meta["base_score"]),
+            n_features=int(meta["n_features"]),
+            depth=int(meta["depth"]),
+            **arrays,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+
+    def leaves(self, matrix: np.ndarray) -> np.ndarray:
+        """N x n_trees node indices of the leaf each row reaches in each tree."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float64).reshape(-1, self.n_features)
+        flat = matrix.ravel()
+        row_offset = (np.arange(len(matrix)) * self.n_features)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+        node = np.broadcast_to(self._roots, (len(matrix), self.n_trees))
+        for _ in range(self.depth):
+            x = flat.take(row_offset + self._feature.take(node))
+            go_right = x >= self.threshold.take(node)
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(node), go_right)
+            node = self._children.take(2 * node + go_right)
+        return node
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Raw-feature predictions (the scaler is already folded in).
+
+        Leaf values are accumulated in float32 in tree order after the base
+        score, as xgboost does, so results are bit-identical to model.predict.
+        """
+        leaf_values = self._value32.take(self.leaves(matrix))
+        total = np.empty((len(leaf_values), self.n_trees + 1), dtype=np.float32)
+        total[:, 0] = self.base_score
+        total[:, 1:] = leaf_values
+        return total.cumsum(axis=1, dtype=np.float32)[:, -1]
+
+    @property
+    def expected_value(self) -> float:
+        """Cover-weighted mean prediction: the TreeSHAP bias term."""
+        if self._expected_value is None:
+            node = np.arange(len(self.left))
+            tree = np.searchsorted(self.roots, node, side="right") - 1
+            leaf_share = self.value * self.cover / self.cover.take(self.roots).take(tree)
+            self._expected_value = float(self.base_score + leaf_share[self.left == node].sum())
+        return self._expected_value
+
+    @property
+    def tabulates_shap(self) -> bool:
+        """Whether contributions() uses the precomputed pattern table (within SHAP_TABLE_BUDGET)."""
+        paths = self._shap_paths()
+        n_leaves, slots = paths["slot_feature"].shape
+        return n_leaves * (1 << slots) * self.n_features <= SHAP_TABLE_BUDGET
+
+    def contributions(self, matrix: np.ndarray, chunk_rows: int = 64) -> np.ndarray:
+        """
+        Exact TreeSHAP values: N x (n_features + 1), bias last.
+
+        Same definition as xgboost's ``pred_contribs``; each row sums to predict().
+        """
+        paths = self._shap_paths()
+        tables = self._shap_tables()
+        if tables is None:
+            chunk_rows = max(1, min(chunk_rows, SHAP_PATH_CHUNK // paths["slot_feature"].size))
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, self.n_features)
+        out = np.empty((len(matrix), self.n_features + 1))
+        out[:, -1] = self.expected_value
+        for start in range(0, len(matrix), chunk_rows):
+            x = matrix[start:start + chunk_rows].take(paths["slot_feature"], axis=1)  # rows x leaves x slots
+            inside = (x >= paths["slot_lo"]) & (x < paths["slot_hi"])
+            missing = np.isnan(x)
+            if missing.any():
+                inside = np.where(missing, paths["slot_missing_ok"], inside)
+            if tables is None:
+                out[start:start + chunk_rows, :-1] = _path_contributions(paths, inside, self.n_features)
+                continue
+            pattern = (inside @ tables["slot_bits"]).astype(np.intp)  # rows x leaves
+            rows = tables["pattern_values"].take(tables["pattern_offset"] + pattern, axis=0)
+            out[start:start + chunk_rows, :-1] = tables["leaf_ones"] @ rows
+        return out
+
+    def _shap_paths(self) -> Dict[str, np.ndarray]:
+        if self._shap is None:
+            self._shap = _build_shap_paths(self)
+        return self._shap
+
+    def _shap_tables(self) -> Optional[Dict[str, np.ndarray]]:
+        """Pattern table, or None when it would exceed SHAP_TABLE_BUDGET."""
+        if self._shap_table is None and self.tabulates_shap:
+            self._shap_table = _build_shap_tables(self._shap_paths(), self.n_features)
+        return self._shap_table
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth, level = 0, [0]
+    while True:
+        level = [c for n in level if left[n] != -1 for c in (left[n], right[n])]
+        if not level:
+            return depth
+        depth += 1
+
+
+def _leaf_paths(engine: TreeEngine):
+    """
+    One record per leaf: (value, cover fraction, {feature: [lo, hi, zero_fraction, missing_ok]}).
+
+    Repeated features on a path are merged: intervals intersect, zero
+    fractions multiply, and missing values must follow every default branch.
+    """
+    stack = [(int(root), float(engine.cover[root]), {}) for root in engine.roots]
+    while stack:
+        node, root_cover, path = stack.pop()
+        left, right = int(engine.left[node]), int(engine.right[node])
+        if left == node:
+            yield float(engine.value[node]), float(engine.cover[node]) / root_cover, path
+            continue
+        f, t = int(engine.feature[node]), float(engine.threshold[node])
+        for child, is_left in ((left, True), (right, False)):
+            lo, hi, zero, missing_ok = path.get(f, (-np.inf, np.inf, 1.0, True))
+            child_path = dict(path)
+            child_path[f] = (
+                lo if is_left else max(lo, t),
+                min(hi, t) if is_left else hi,
+                zero * float(engine.cover[child]) / float(engine.cover[node]),
+                missing_ok and bool(engine.default_left[node]) == is_left,
+            )
+            stack.append((child, root_cover, child_path))
+
+
+def _build_shap_paths(engine: TreeEngine) -> Dict[str, np.ndarray]:
+    """
+    Per-leaf slot arrays: one slot per unique path feature with its raw-space
+    interval, zero fraction and missing-value direction, plus the leaf value
+    and the Shapley weights s!(d-s-1)!/d! for the path's depth d.
+    """
+    paths = list(_leaf_paths(engine))
+    slots = max([len(p) for _, _, p in paths] + [1])
+    n_leaves = len(paths)
+
+    slot_feature = np.zeros((n_leaves, slots), dtype=np.int32)
+    slot_lo = np.full((n_leaves, slots), np.inf)  # Inactive slots never match, so their bit stays 0
+    slot_hi = np.full((n_leaves, slots), -np.inf)
+    slot_zero = np.ones((n_leaves, slots))
+    slot_missing_ok = np.zeros((n_leaves, slots), dtype=bool)
+    slot_active = np.zeros((n_leaves, slots), dtype=bool)
+    values = np.zeros(n_leaves)
+    for leaf, (value, _, path) in enumerate(paths):
+        values[leaf] = value
+        for slot, (f, (lo, hi, zero, missing_ok)) in enumerate(sorted(path.items())):
+            slot_feature[leaf, slot] = f
+            slot_lo[leaf, slot], slot_hi[leaf, slot] = lo, hi
+            slot_zero[leaf, slot] = zero
+            slot_missing_ok[leaf, slot] = missing_ok
+            slot_active[leaf, slot] = True
+
+    depth = slot_active.sum(axis=1)
+    weights = np.zeros((n_leaves, slots))  # s!(d-s-1)!/d!, 0 beyond d - 1
+    for d in range(1, slots + 1):
+        for s in range(d):
+            weights[depth == d, s] = factorial(s) * factorial(d - s - 1) / factorial(d)
+
+    return {
+        "slot_feature": slot_feature.astype(np.intp),
+        "slot_lo": slot_lo,
+        "slot_hi": slot_hi,
+        "slot_missing_ok": slot_missing_ok,
+        # Inactive slots must not affect the product: (z + o t) = 1 for them
+        "slot_zero": np.where(slot_active, slot_zero, 1.0),
+        "slot_active": slot_active,
+        "values": values,
+        "weights": weights,
+    }
+
+
+def _slot_phi(paths: Dict[str, np.ndarray], one: np.ndarray) -> np.ndarray:
+    """
+    SHAP contribution of every (leaf, slot) given which slots a row satisfies.
+
+    For a leaf with value v and d unique path features with zero fractions z
+    and one fractions o (0/1), feature i receives
+        v * (o_i - z_i) * sum_s s!(d-s-1)!/d! * [t^s] prod_{j != i} (z_j + o_j t)
+    which is the quantity Lundberg et al.'s TreeSHAP accumulates; the product
+    over j != i is recovered from the full product by unwinding factor i.
+    ``one`` is ... x leaves x slots; the result has the same shape.
+    """
+    # Slot and coefficient axes first so every update below is a contiguous leaves-length (or rows x leaves) op
+    slots = paths["slot_active"].shape[1]
+    shape = (slots,) + (1,) * (one.ndim - 2) + (-1,)  # slots x 1... x leaves, broadcasting over rows
+    active, z, weights = (paths[k].T.reshape(shape) for k in ("slot_active", "slot_zero", "weights"))
+    values = paths["values"]
+    o = np.where(active, np.moveaxis(one, -1, 0), 0.0)
+    total = np.zeros((slots + 1,) + o.shape[1:])  # prod_j (z_j + o_j t)
+    total[0] = 1.0
+    for j in range(slots):
+        total[1:] = total[1:] * z[j] + total[:-1] * o[j]
+        total[0] *= z[j]
+    phi = np.empty(o.shape)
+    quotient = np.empty(o.shape)
+    for i in range(slots):  # Unwind factor i: divide by (z_i + t) when o_i = 1, by z_i when o_i = 0
+        carry = total[slots]
+        for k in range(slots - 1, -1, -1):
+            quotient[k] = carry
+            carry = total[k] - z[i] * carry
+        quotient = np.where(o[i] > 0, quotient, total[:slots] / z[i])
+        phi[i] = values * (o[i] - z[i]) * (quotient * weights).sum(axis=0)
+    return np.moveaxis(np.where(active, phi, 0.0), 0, -1)
+
+
+def _path_contributions(paths: Dict[str, np.ndarray], inside: np.ndarray, n_features: int) -> np.ndarray:
+    """Rows x n_features TreeSHAP values from rows x leaves x slots satisfied-slot masks."""
+    phi = _slot_phi(paths, inside.astype(np.float64))
+    rows = len(inside)
+    index = (np.arange(rows)[:, None, None] * n_features + paths["slot_feature"]).ravel()
+    return np.bincount(index, weights=phi.ravel(), minlength=rows * n_features).reshape(rows, n_features)
+
+
+def _build_shap_tables(paths: Dict[str, np.ndarray], n_features: int) -> Dict[str, np.ndarray]:
+    """For every leaf and every subset of satisfied slots, that leaf's SHAP contribution to each feature."""
+    n_leaves, slots = paths["slot_feature"].shape
+    n_patterns = 1 << slots
+    pattern_values = np.zeros((n_leaves, n_patterns, n_features))
+    leaf_ids = np.arange(n_leaves)
+    for pattern in range(n_patterns):
+        one = np.array([(pattern >> j) & 1 for j in range(slots)], dtype=np.float64)
+        phi = _slot_phi(paths, np.broadcast_to(one, (n_leaves, slots)))
+        np.add.at(pattern_values[:, pattern], (leaf_ids[:, None], paths["slot_feature"]), phi)
+
+    return {
+        "slot_bits": (1 << np.arange(slots)).astype(np.float32),  # Pattern via BLAS matmul
+        "pattern_offset": leaf_ids * n_patterns,  # Row of (leaf, 0) in the flat pattern table
+        "pattern_values": pattern_values.reshape(-1, n_features),
+        "leaf_ones": np.ones(n_leaves),  # Sum over leaves as a matmul
+    }
@@ -1,29 +1,163 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+import io
+from typing import Optional
 
-from ..models.fairscore_model import model
+import pandas as pd
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from pydantic import BaseModel, Field
+
+from ..models.fairscore_model import SCHEMA, feature_matrix
+from ..models.model_registry import get_model_registry
 from ..explainers import shap_viz
 
 router = APIRouter()
 
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
 
 class FairScoreRequest(BaseModel):
     user_features: dict
+    user_id: Optional[str] = Field(None, description="Routing key: keeps a user on one model version in A/B splits")
 
 
 class FairScoreResponse(BaseModel):
     fairscore: int
     explanations: list[dict]
     improvement_suggestions: list[str]
+    model_version: Optional[str] = None
+
+
+class FairScoreBatchRequest(BaseModel):
+    users: list[dict] = Field(..., min_length=1, description="One user_features dict per user")
+    explain: bool = Field(True, description="Include explanations and suggestions")
+
+
+class FairScoreBatchResult(BaseModel):
+    fairscore: int
+    explanations: list[dict]
+    improvement_suggestions: list[str]
+    user_id: Optional[str] = None
+
+
+class FairScoreBatchResponse(BaseModel):
+    count: int
+    model_version: Optional[str] = None
+    results: list[FairScoreBatchResult]
+
+
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = Field(None, description="Artifact version; defaults to following the LATEST pointer")
+
+
+class ModelRoutingRequest(BaseModel):
+    weights: dict[str, float] = Field(..., min_length=1, description="Version -> traffic weight")
+
+
+def _batch_response(version, results, user_ids=None) -> FairScoreBatchResponse:
+    user_ids = user_ids if user_ids is not None else [None] * len(results)
+    return FairScoreBatchResponse(
+        count=len(results),
+        model_version=version,
+        results=[
+            FairScoreBatchResult(
+                user_id=user_id,
+                fairscore=result.score,
+                explanations=shap_viz.summarize_explanations(result.explanations)["explanations"],
+                improvement_suggestions=result.suggestions,
+            )
+            for user_id, result in zip(user_ids, results)
+        ],
+    )
 
 
 @router.post("/score", response_model=FairScoreResponse)
-async def score_user(req: FairScoreRequest) -> FairScoreResponse:
-    result = model.predict(req.user_features)
+def score_user(req: FairScoreRequest) -> FairScoreResponse:
+    """Score one user; a sync handler, so it runs in the threadpool rather than on the event loop."""
+    try:
+        matrix = feature_matrix([req.user_features])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid feature value: {e}")
+    version, (result,) = get_model_registry().predict_matrix(matrix, key=req.user_id)
     explanation_payload = shap_viz.summarize_explanations(result.explanations)["explanations"]
     return FairScoreResponse(
         fairscore=result.score,
         explanations=explanation_payload,
         improvement_suggestions=result.suggestions,
+        model_version=version,
     )
 
+
+@router.post("/score_batch", response_model=FairScoreBatchResponse)
+def score_batch(req: FairScoreBatchRequest) -> FairScoreBatchResponse:
+    """Score a cohort in one vectorized pass on one model version; results are in input order."""
+    try:
+        matrix = feature_matrix(req.users)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid feature value: {e}")
+    return _batch_response(*get_model_registry().predict_matrix(matrix, explain=req.explain))
+
+
+@router.post("/score_batch_file", response_model=FairScoreBatchResponse)
+def score_batch_file(file: UploadFile = File(...), explain: bool = True) -> FairScoreBatchResponse:
+    """
+    Score a CSV (or Arrow IPC/Feather, if pyarrow is installed) upload with one
+    row per user and feature columns; an optional user_id column is echoed back.
+    """
+    data = file.file.read()
+    try:
+        if (file.filename or "").lower().endswith(ARROW_SUFFIXES):
+            frame = pd.read_feather(io.BytesIO(data))
+        else:
+            frame = pd.read_csv(io.BytesIO(data))
+    except ImportError:
+        raise HTTPException(status_code=400, detail="Arrow uploads require pyarrow; upload CSV instead")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {e}")
+    if frame.empty:
+        raise HTTPException(status_code=400, detail="Upload contains no rows")
+
+    try:
+        matrix = SCHEMA.frame_matrix(frame)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid feature value: {e}")
+    user_ids = frame["user_id"].astype(str).tolist() if "user_id" in frame.columns else None
+    return _batch_response(*get_model_registry().predict_matrix(matrix, explain=explain), user_ids)
+
+
+@router.get("/model")
+def model_info() -> dict:
+    """Routing table plus version, feature order and training metrics of each served model."""
+    return get_model_registry().info()
+
+
+@router.get("/model/stats")
+def model_stats() -> dict:
+    """Per-version request counts, latency percentiles (us) and score histograms."""
+    return get_model_registry().stats()
+
+
+@router.post("/model/reload")
+def reload_model(req: ModelReloadRequest = ModelReloadRequest()) -> dict:
+    """Hot-swap without restarting: pin one version, or follow LATEST again."""
+    registry = get_model_registry()
+    try:
+        if req.version:
+            registry.set_weights({req.version: 1.0})
+        else:
+            registry.follow_latest()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Artifact rejected, routing unchanged: {e}")
+    return registry.info()
+
+
+@router.post("/model/routing")
+def set_model_routing(req: ModelRoutingRequest) -> dict:
+    """Weighted traffic split between artifact versions (A/B); pinned until /model/reload."""
+    try:
+        get_model_registry().set_weights(req.weights)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Routing unchanged: {e}")
+    return get_model_registry().info()
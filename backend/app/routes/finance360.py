@@ -1,13 +1,39 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
-from ..utils import sms_parser, feature_builder
+from ..utils import sms_parser, sms_stream, sms_templates, feature_builder, feature_store, transaction_store
 
 router = APIRouter()
 
 
 class SMSParseRequest(BaseModel):
     sms_text: str = Field(..., min_length=10)
+    window_months: int = Field(feature_builder.DEFAULT_WINDOW_MONTHS, ge=2, description="Trailing months for volatility/savings rate")
+
+
+class SMSBatchParseRequest(BaseModel):
+    users: dict[str, str] = Field(..., min_length=1, description="User id -> SMS text")
+
+
+class SMSBatchParseResponse(BaseModel):
+    results: dict[str, dict]
+
+
+class SMSSyncRequest(BaseModel):
+    user_id: str = Field(..., min_length=1)
+    sms_text: str = Field(..., min_length=10)
+    window_months: int = Field(feature_builder.DEFAULT_WINDOW_MONTHS, ge=2)
+
+
+class SMSSyncResponse(BaseModel):
+    user_id: str
+    new_transactions: int
+    duplicate_transactions: int
+    transaction_count: int
+    monthly_summary: dict
+    financial_health_score: int
+    unparsed_transactions: list[str]
+    derived_features: dict
 
 
 class Finance360Response(BaseModel):
@@ -17,19 +43,79 @@ class Finance360Response(BaseModel):
     nudges: list[str]
     unparsed_transactions: list[str]
     derived_features: dict
+    spend_summary: dict = Field(default_factory=dict)
 
 
 @router.post("/sms_parse", response_model=Finance360Response)
 async def parse_sms(request: SMSParseRequest) -> Finance360Response:
-    transactions, unparsed = sms_parser.parse_sms_block(request.sms_text)
-    metrics = sms_parser.compute_financial_metrics(transactions)
-    derived_features = feature_builder.transactions_to_features(transactions)
+    columns, unparsed = transaction_store.parse_sms_columns(request.sms_text)
+    inflow, outflow = columns.totals()
+    flows = columns.monthly_flows()
+    metrics = sms_parser.metrics_from_totals(inflow, outflow, flows.volatility(request.window_months))
+    derived_features = feature_builder.features_from_flows(inflow, outflow, flows, request.window_months)
     return Finance360Response(
-        transactions=transactions,
+        transactions=columns.to_records(),
         monthly_summary=metrics["monthly_summary"],
         financial_health_score=metrics["financial_health_score"],
         nudges=metrics["nudges"],
         unparsed_transactions=unparsed,
         derived_features=derived_features,
+        spend_summary=columns.spend_summary(),
     )
 
+
+@router.post("/sms_parse_stream", response_model=Finance360Response)
+async def parse_sms_stream(
+    request: Request,
+    include_transactions: bool = False,
+    window_months: int = Query(feature_builder.DEFAULT_WINDOW_MONTHS, ge=2),
+) -> Finance360Response:
+    """
+    Streaming variant of /sms_parse for large exports.
+
+    The request body is the raw SMS dump (text/plain, one SMS per line) or NDJSON
+    (application/x-ndjson, one JSON string or {"sms": ...} object per line), sent
+    chunked if needed. Lines are parsed as they arrive into running totals, so
+    transactions are only returned when include_transactions=true.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    aggregator = sms_stream.StreamingSMSAggregator(
+        ndjson=ndjson, keep_transactions=include_transactions, window_months=window_months
+    )
+    try:
+        async for chunk in request.stream():
+            aggregator.feed(chunk)
+        aggregator.close()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Finance360Response(**aggregator.result())
+
+
+@router.post("/sms_sync", response_model=SMSSyncResponse)
+def sync_sms(request: SMSSyncRequest) -> SMSSyncResponse:
+    """Incremental sync: only transactions not seen before for this user update the stored aggregates."""
+    transactions, unparsed = sms_parser.parse_sms_block(request.sms_text)
+    result = feature_store.get_feature_store().sync(request.user_id, transactions, request.window_months)
+    return SMSSyncResponse(user_id=request.user_id, unparsed_transactions=unparsed, **vars(result))
+
+
+@router.delete("/sms_sync/{user_id}")
+def reset_sms_sync(user_id: str) -> dict:
+    feature_store.get_feature_store().reset_user(user_id)
+    return {"status": "deleted", "user_id": user_id}
+
+
+@router.get("/sms_templates/stats")
+async def sms_template_stats() -> dict:
+    """Hit/miss counters of the bank SMS templates in this process (batch worker processes keep their own)."""
+    return sms_templates.get_template_registry().stats()
+
+
+@router.post("/sms_parse_batch", response_model=SMSBatchParseResponse)
+def parse_sms_batch(request: SMSBatchParseRequest) -> SMSBatchParseResponse:
+    # Imported lazily: sms_batch doubles as a CLI module (python -m app.utils.sms_batch).
+    # Sync handler, so FastAPI runs it in the threadpool while worker processes parse.
+    from ..utils import sms_batch
+
+    results = sms_batch.parse_sms_blocks(request.users)
+    return SMSBatchParseResponse(results=results)
@@ -17,7 +17,7 @@ Requirements:
 
 import os
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 import boto3
@@ -65,6 +65,9 @@ except Exception as e:
 class RAGQueryRequest(BaseModel):
     """What the frontend sends us"""
     query: str = Field(..., min_length=1, description="User's question about contracts")
+    retriever: Optional[Literal["tfidf", "bm25"]] = Field(
+        None, description="Local RAG ranking: TF-IDF cosine or BM25 (default: RAG_RETRIEVER, else tfidf)"
+    )
 
 
 class Citation(BaseModel):
@@ -117,7 +120,7 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
             rag_instance = get_simple_rag()
             if rag_instance is None:
                 raise HTTPException(status_code=503, detail="Local RAG unavailable (memory or import error). Please retry or configure AWS RAG.")
-            result = rag_instance.query(request.query)
+            result = rag_instance.query(request.query, retriever=request.retriever)
 
             # Map local citations to unified Citation model
             citations: List[Citation] = []
@@ -134,7 +137,11 @@ async def rag_query(request: RAGQueryRequest) -> RAGQueryResponse:
                 answer=result.get("answer", "No answer produced."),
                 reasoning=result.get("reasoning", "Local TF-IDF retrieval"),
                 citations=citations,
-                raw_response={"source": "local_free", "chunks_considered": len(result.get("citations", []))}
+                raw_response={
+                    "source": "local_free",
+                    "retriever": result.get("retriever"),
+                    "chunks_considered": len(result.get("citations", []))
+                }
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Local RAG error: {e}")
@@ -298,30 +305,36 @@ async def rag_health():
 
 
 @router.post("/rag-ingest-local")
-async def rag_ingest_local():
+async def rag_ingest_local(compact: bool = False):
     """
-    Trigger local ingestion of PDFs from data/contracts into ChromaDB.
-    DISABLED: PyTorch DLL issues on Windows.
+    Incrementally index PDFs/DOCX from data/contracts into the local TF-IDF/BM25 index.
+
+    Only new and changed files (by mtime/size, then content hash) are extracted;
+    deleted files are tombstoned. ?compact=true also merges all segments and
+    refits the TF-IDF vocabulary on the whole corpus.
     """
     try:
-        print("[RAG] Building FREE local index...")
+        print("[RAG] Updating FREE local index...")
         rag_instance = get_simple_rag()
         if rag_instance is None:
             raise HTTPException(status_code=503, detail="Local RAG unavailable (memory or import error). Cannot ingest.")
-        rag_instance.load_documents()
-        if rag_instance.chunks:
-            rag_instance.build_index()
-            rag_instance.save_index()
+        stats = rag_instance.update_index(compact=compact)
+        if stats["files"]:
             return {
                 "status": "success",
-                "message": f"Indexed {len(rag_instance.chunks)} chunks from contracts directory",
-                "chunks_count": len(rag_instance.chunks)
+                "message": f"Indexed {stats['indexed_files']} new or changed files "
+                           f"({stats['chunks']} chunks from {stats['files']} files in the index)",
+                "chunks_count": stats["chunks"],
+                **stats
             }
         else:
             return {
                 "status": "warning",
-                "message": "No PDF or DOCX files found in data/contracts directory"
+                "message": "No PDF or DOCX files found in data/contracts directory",
+                **stats
             }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[RAG] Ingestion error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,250 @@
+"""
+BM25 inverted index for the local RAG.
+
+The TF-IDF retriever's vectorizer keeps only the 5000 most frequent terms
+(and bigrams), so rare legal terms ("dishonour", "garnishee", section numbers)
+are dropped from both chunks and queries. BM25Index keeps every term:
+
+- vocabulary: term -> id, no cap (same tokens and stop words as TF-IDF)
+- postings as NumPy arrays, CSR-style: for term t, docs[indptr[t]:indptr[t+1]]
+  are the chunk ids (uint32, ascending) and tfs[...] the term frequencies
+  (uint16); weights[...] hold each posting's precomputed BM25 score (float32)
+- upper_bound[t] = max weight in t's postings, for MaxScore
+
+Scoring is Okapi BM25 with Lucene's non-negative idf:
+
+    idf(t)       = ln(1 + (N - df + 0.5) / (df + 0.5))
+    weight(t, d) = idf(t) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(d) / avg_len))
+    score(q, d)  = sum over query terms t of qtf(t) * weight(t, d)
+
+Query evaluation is MaxScore, vectorized per term rather than per document.
+Each term's postings are also kept in impact order (heaviest first), so
+upper_bound[t] is the first weight and "postings with weight >= w" a prefix.
+Terms are taken in decreasing upper-bound order; remaining[i] is the sum of
+the upper bounds of terms i..., and theta a lower bound on the final k-th best
+score, seeded from the exact scores of each term's k heaviest postings and
+raised to the k-th best candidate score as terms are added. Scores accumulate
+in a dense per-thread array, so a chunk is new to the candidates while its
+score is still 0.
+
+- While an unseen chunk could still reach theta (an "essential" term), the
+  prefix of the term's postings that could get there joins the candidates;
+  candidates outside that prefix are looked up in the rest (binary search
+  over the chunk-ordered postings).
+- After that, the remaining (typically common, long) postings lists are never
+  scanned: only the candidates whose score + remaining[i] can still reach
+  theta are looked up in them.
+
+A chunk dropped along the way cannot reach theta, which never decreases, so
+the top k (ties at the k-th score included) are exact.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from .sparse_retrieval import top_k
+
+K1 = 1.2
+B = 0.75
+
+
+def make_analyzer():
+    """Lowercased word tokens without English stop words, as in SimpleFreeRAG's TfidfVectorizer."""
+    return CountVectorizer(stop_words="english").build_analyzer()
+
+
+def term_counts(texts: Sequence[str], vocabulary: Dict[str, int], analyzer=None) -> sparse.csr_matrix:
+    """
+    len(texts) x len(vocabulary) term-frequency matrix; terms not yet in the
+    vocabulary are added to it (ids continue from len(vocabulary)).
+    """
+    analyzer = analyzer or make_analyzer()
+    indices: List[int] = []
+    indptr = [0]
+    for text in texts:
+        for token in analyzer(text):
+            term = vocabulary.get(token)
+            if term is None:
+                term = vocabulary[token] = len(vocabulary)
+            indices.append(term)
+        indptr.append(len(indices))
+    counts = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def _kth(scores: np.ndarray, k: int) -> float:
+    """k-th largest score, lowered by a float32 rounding margin so that chunks tied with it are kept."""
+    return float(np.partition(scores, len(scores) - k)[len(scores) - k]) * (1 - 1e-6)
+
+
+class BM25Index:
+    """Uncapped-vocabulary BM25 over chunks with MaxScore top-k search."""
+
+    def __init__(self, vocabulary: Dict[str, int], counts, k1: float = K1, b: float = B):
+        """counts: chunks x terms term-frequency matrix, columns numbered by vocabulary."""
+        counts = sparse.csr_matrix(counts)
+        self.vocabulary = vocabulary
+        self.k1, self.b = k1, b
+        self.n_docs, self.n_terms = counts.shape
+        self.doc_lengths = np.asarray(counts.sum(axis=1), dtype=np.float32).ravel()
+        self.avg_length = float(self.doc_lengths.mean()) if self.n_docs else 0.0
+
+        postings = counts.T.tocsr()  # terms x chunks
+        postings.sort_indices()
+        self.indptr = postings.indptr.astype(np.int64)
+        self.docs = postings.indices.astype(np.uint32)
+        self.tfs = np.minimum(postings.data, np.iinfo(np.uint16).max).astype(np.uint16)
+
+        df = np.diff(self.indptr)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.weights = self._posting_weights()
+        self._impact_order()
+        self._analyzer = make_analyzer()
+        self._local = threading.local()
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = K1, b: float = B) -> "BM25Index":
+        vectorizer = CountVectorizer(stop_words="english", dtype=np.int32)
+        counts = vectorizer.fit_transform(texts)
+        return cls(vectorizer.vocabulary_, counts, k1=k1, b=b)
+
+    def _posting_weights(self) -> np.ndarray:
+        tf = self.tfs.astype(np.float32)
+        idf = np.repeat(self.idf, np.diff(self.indptr))
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[self.docs] / max(self.avg_length, 1e-9))
+        return (idf * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _impact_order(self) -> None:
+        """Each term's postings again, sorted by weight descending, and the per-term upper bounds."""
+        term_of = np.repeat(np.arange(self.n_terms), np.diff(self.indptr))
+        order = np.lexsort((-self.weights, term_of))  # Within each term: heaviest first
+        self.impact_docs = self.docs[order]
+        self.impact_weights = self.weights[order]
+        self.upper_bound = np.zeros(self.n_terms, dtype=np.float32)
+        nonempty = np.diff(self.indptr) > 0
+        self.upper_bound[nonempty] = self.impact_weights[self.indptr[:-1][nonempty]]
+
+    def _scratch(self) -> np.ndarray:
+        """This thread's zeroed n_docs score array (allocated once per thread)."""
+        acc = getattr(self._local, "acc", None)
+        if acc is None or len(acc) != self.n_docs:
+            acc = self._local.acc = np.zeros(self.n_docs, dtype=np.float32)
+        return acc
+
+    def _lookup(self, term: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(mask of ids in term's postings, their weights)."""
+        start, end = self.indptr[term], self.indptr[term + 1]
+        postings = self.docs[start:end]
+        positions = np.minimum(np.searchsorted(postings, ids), len(postings) - 1)
+        found = postings[positions] == ids
+        return found, self.weights[start + positions[found]]
+
+    def query_terms(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(term ids, query term frequencies) of the query's in-vocabulary terms."""
+        counts: Dict[int, int] = {}
+        for token in self._analyzer(query):
+            term = self.vocabulary.get(token)
+            if term is not None:
+                counts[term] = counts.get(term, 0) + 1
+        return np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)), \
+            np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, BM25 scores) of the k best chunks, best first."""
+        return self.search_terms(*self.query_terms(query), k)
+
+    def search_batch(self, queries: Sequence[str], k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return [self.search(query, k) for query in queries]
+
+    def search_terms(
+        self, terms: np.ndarray, qtf: Optional[np.ndarray], k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """MaxScore top-k for term ids with query frequencies (None: 1 each)."""
+        empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32))
+        terms = np.asarray(terms, dtype=np.int64)
+        qtf = np.ones(len(terms), dtype=np.float32) if qtf is None else np.asarray(qtf, dtype=np.float32)
+        bounds = self.upper_bound[terms] * qtf
+        live = bounds > 0
+        if k <= 0 or not live.any():
+            return empty
+        order = np.argsort(-bounds[live], kind="stable")
+        terms, qtf, bounds = terms[live][order], qtf[live][order], bounds[live][order]
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0.0]])  # remaining[i] = sum(bounds[i:])
+
+        # Seed theta with the exact scores of each term's k heaviest postings: the
+        # final k-th best score can only be higher
+        theta = 0.0
+        seeds = np.unique(np.concatenate([
+            self.impact_docs[self.indptr[term]:min(self.indptr[term] + k, self.indptr[term + 1])] for term in terms
+        ]))
+        if len(seeds) >= k:
+            seed_scores = np.zeros(len(seeds), dtype=np.float32)
+            for term, weight in zip(terms.tolist(), qtf.tolist()):
+                found, weights = self._lookup(term, seeds)
+                seed_scores[found] += weights * weight
+            theta = _kth(seed_scores, k)
+
+        acc = self._scratch()  # Dense per-chunk scores, all zero between queries
+        candidates = []  # Chunks with a non-zero score, each listed once
+        try:
+            ids = np.empty(0, dtype=np.uint32)
+            partial = []  # Essential terms whose postings were only partly taken
+            slack = 0.0  # Bound on what those terms' untaken postings add to an unseen chunk
+            i = 0
+            # Essential terms: chunks from the heavy end of the postings that could still
+            # reach theta join the candidates. A chunk is new while its score is 0
+            # (weights are > 0), so no sort or union is needed. Where postings are only
+            # partly taken, existing candidates are looked up in the rest, and later new
+            # chunks in turn in those terms.
+            while i < len(terms) and remaining[i] + slack >= theta:
+                term, weight = int(terms[i]), float(qtf[i])
+                start, end = self.indptr[term], self.indptr[term + 1]
+                count = int(np.searchsorted(-self.impact_weights[start:end],
+                                            -(theta - remaining[i + 1] - slack) / weight, side="right"))
+                docs, weights = self.impact_docs[start:start + count], self.impact_weights[start:start + count]
+                new = acc[docs] == 0
+                if count < end - start:
+                    ids = ids[acc[ids] + remaining[i] >= theta]
+                    found, found_weights = self._lookup(term, ids)
+                    acc[ids[found]] += found_weights * weight
+                else:
+                    acc[docs[~new]] += weights[~new] * weight
+                docs, weights = docs[new], weights[new] * weight
+                for earlier, earlier_weight in partial:
+                    found, found_weights = self._lookup(earlier, docs)
+                    weights[found] += found_weights * earlier_weight
+                acc[docs] += weights
+                if count < end - start:
+                    partial.append((term, weight))
+                    slack += float(self.impact_weights[start + count]) * weight
+                candidates.append(docs)
+                ids = np.concatenate([ids, docs])
+                i += 1
+                if len(ids) >= k:
+                    theta = max(theta, _kth(acc[ids], k))
+
+            # Non-essential terms: no unseen chunk can reach theta any more; only the
+            # candidates that still can are looked up in these (long) lists
+            for j in range(i, len(terms)):
+                ids = ids[acc[ids] + remaining[j] >= theta]
+                if not len(ids):
+                    break
+                found, weights = self._lookup(int(terms[j]), ids)
+                acc[ids[found]] += weights * float(qtf[j])
+                if len(ids) >= k:
+                    theta = max(theta, _kth(acc[ids], k))
+
+            scores = acc[ids]
+        finally:
+            if candidates:
+                acc[np.concatenate(candidates)] = 0
+        best = top_k(scores, k)
+        return ids[best].astype(np.intp), scores[best]
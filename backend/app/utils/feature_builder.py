@@ -1,17 +1,154 @@
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence
 
+import numpy as np
 
-def transactions_to_features(transactions: List[Dict]) -> Dict[str, float]:
+if TYPE_CHECKING:
+    from .transaction_store import TransactionColumns
+
+DEFAULT_WINDOW_MONTHS = 6  # Trailing months used for volatility and savings rate
+DEFAULT_VOLATILITY = 0.25  # Used until there are at least two months of dated history
+MAX_VOLATILITY = 1.0
+
+
+@dataclass
+class MonthlyFlows:
+    """
+    Credit/debit sums per calendar month over a contiguous range of months.
+
+    Months without transactions inside the range are present with zero flows.
+    Transactions without a parsed date are not bucketed.
+    """
+
+    start: Optional[np.datetime64]  # First month (datetime64[M]); None if nothing is dated
+    inflow: np.ndarray  # float64, one entry per month from start
+    outflow: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, dates: np.ndarray, amounts: np.ndarray, is_credit: np.ndarray) -> "MonthlyFlows":
+        """Bucket transactions by month with one vectorized pass (no Python loop)."""
+        dated = ~np.isnat(dates)
+        if not dated.any():
+            return cls(start=None, inflow=np.zeros(0), outflow=np.zeros(0))
+        months = dates[dated].astype("datetime64[M]").astype(np.int64)
+        first = months.min()
+        index = months - first
+        size = int(index.max()) + 1
+        amounts = amounts[dated]
+        credit = is_credit[dated]
+        return cls(
+            start=np.datetime64(int(first), "M"),
+            inflow=np.bincount(index, weights=np.where(credit, amounts, 0.0), minlength=size),
+            outflow=np.bincount(index, weights=np.where(credit, 0.0, amounts), minlength=size),
+        )
+
+    @classmethod
+    def from_month_sums(cls, sums: Mapping[int, Sequence[float]]) -> "MonthlyFlows":
+        """Build from {month ordinal: (inflow, outflow)}, ordinal = months since 1970-01."""
+        if not sums:
+            return cls(start=None, inflow=np.zeros(0), outflow=np.zeros(0))
+        months = np.fromiter(sums.keys(), dtype=np.int64, count=len(sums))
+        flows = np.array(list(sums.values()), dtype=np.float64).reshape(-1, 2)
+        first = months.min()
+        index = months - first
+        size = int(index.max()) + 1
+        return cls(
+            start=np.datetime64(int(first), "M"),
+            inflow=np.bincount(index, weights=flows[:, 0], minlength=size),
+            outflow=np.bincount(index, weights=flows[:, 1], minlength=size),
+        )
+
+    @property
+    def n_months(self) -> int:
+        """Months spanned by the dated history (at least 1)."""
+        return max(1, len(self.inflow))
+
+    def rolling_volatility(self, window: int = DEFAULT_WINDOW_MONTHS) -> np.ndarray:
+        """
+        Volatility for every trailing window of ``window`` months.
+
+        Volatility is the standard deviation of monthly net flow divided by the
+        window's mean monthly inflow, clipped to [0, MAX_VOLATILITY]. Dividing by
+        inflow rather than mean net flow keeps it finite when savings are ~0.
+        Empty when fewer than two months are available.
+        """
+        window = min(window, len(self.inflow))
+        if window < 2:
+            return np.zeros(0)
+        net = self.inflow - self.outflow
+        net_sum = _window_sums(net, window)
+        net_sq_sum = _window_sums(net * net, window)
+        inflow_mean = _window_sums(self.inflow, window) / window
+        mean = net_sum / window
+        std = np.sqrt(np.maximum(net_sq_sum / window - mean * mean, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volatility = np.where(inflow_mean > 0, std / inflow_mean, MAX_VOLATILITY)
+        return np.clip(volatility, 0.0, MAX_VOLATILITY)
+
+    def volatility(self, window: int = DEFAULT_WINDOW_MONTHS) -> Optional[float]:
+        """Volatility of the most recent window, or None with under two months of history."""
+        rolling = self.rolling_volatility(window)
+        return float(rolling[-1]) if len(rolling) else None
+
+    def savings_rate(self, window: int = DEFAULT_WINDOW_MONTHS) -> Optional[float]:
+        """(inflow - outflow) / inflow over the most recent window, or None if nothing is dated."""
+        if not len(self.inflow):
+            return None
+        inflow = float(self.inflow[-window:].sum())
+        outflow = float(self.outflow[-window:].sum())
+        return (inflow - outflow) / inflow if inflow else 0
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sums of every contiguous run of ``window`` values via a cumulative sum."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[window:] - cumulative[:-window]
+
+
+def record_flows(transactions: List[Dict]) -> MonthlyFlows:
+    """MonthlyFlows for parse_sms_block-style dicts."""
+    dates = np.array([t["date"] if t["date"] != "Unknown" else "NaT" for t in transactions], dtype="datetime64[D]")
+    amounts = np.array([t["amount"] for t in transactions], dtype=np.float64)
+    is_credit = np.array([t["direction"] == "credit" for t in transactions], dtype=bool)
+    return MonthlyFlows.from_arrays(dates, amounts, is_credit)
+
+
+def transactions_to_features(transactions: List[Dict], window_months: int = DEFAULT_WINDOW_MONTHS) -> Dict[str, float]:
     inflow = sum(t["amount"] for t in transactions if t["direction"] == "credit")
     outflow = sum(t["amount"] for t in transactions if t["direction"] == "debit")
-    avg_inflow = inflow / max(1, len(transactions))
-    avg_outflow = outflow / max(1, len(transactions))
-    savings_rate = (inflow - outflow) / inflow if inflow else 0
-    volatility = 0.25
+    return features_from_flows(inflow, outflow, record_flows(transactions), window_months)
+
+
+def columns_to_features(columns: "TransactionColumns", window_months: int = DEFAULT_WINDOW_MONTHS) -> Dict[str, float]:
+    """Vectorized transactions_to_features over a columnar store."""
+    inflow, outflow = columns.totals()
+    return features_from_flows(inflow, outflow, columns.monthly_flows(), window_months)
+
+
+def features_from_flows(
+    inflow: float,
+    outflow: float,
+    flows: MonthlyFlows,
+    window_months: int = DEFAULT_WINDOW_MONTHS,
+) -> Dict[str, float]:
+    """
+    FairScore features from credit/debit totals and their monthly buckets.
+
+    Averages divide the totals by the number of calendar months spanned (undated
+    transactions are assumed to fall inside that span). Savings rate and
+    volatility use the trailing ``window_months``.
+    """
+    avg_inflow = inflow / flows.n_months
+    avg_outflow = outflow / flows.n_months
+    savings_rate = flows.savings_rate(window_months)
+    if savings_rate is None:
+        savings_rate = (inflow - outflow) / inflow if inflow else 0
+    volatility = flows.volatility(window_months)
+    if volatility is None:
+        volatility = DEFAULT_VOLATILITY
     return {
         "avg_monthly_inflow": round(avg_inflow, 2),
         "avg_monthly_outflow": round(avg_outflow, 2),
         "savings_rate": round(savings_rate, 2),
         "volatility": round(volatility, 2),
     }
-
@@ -0,0 +1,195 @@
+"""
+Incremental per-user Finance360 feature state.
+
+Users who sync a few new SMS a day should not have their whole history
+re-parsed. FeatureStore keeps, per user, a fingerprint of every transaction
+already counted plus running totals and per-month inflow/outflow sums in a
+local SQLite file. sync() folds only unseen transactions into those sums and
+rebuilds derived features from the monthly rows, so the cost is proportional
+to the delta (plus the number of months of history).
+
+Only fingerprints and aggregates are stored, never the raw SMS text.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .feature_builder import DEFAULT_WINDOW_MONTHS, MonthlyFlows, features_from_flows
+from .sms_parser import metrics_from_totals
+
+STORE_PATH = Path(os.getenv(
+    "FINANCE360_STORE_PATH",
+    Path(__file__).parent.parent.parent.parent / "data" / "finance360_state.db",
+))
+
+SQL_BATCH = 500  # Keys per IN (...) lookup, below SQLite's host-parameter limit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_transactions (
+    user_id TEXT NOT NULL,
+    fingerprint BLOB NOT NULL,
+    PRIMARY KEY (user_id, fingerprint)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS monthly_flows (
+    user_id TEXT NOT NULL,
+    month INTEGER NOT NULL,  -- months since 1970-01
+    inflow REAL NOT NULL DEFAULT 0,
+    outflow REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_totals (
+    user_id TEXT PRIMARY KEY,
+    inflow REAL NOT NULL DEFAULT 0,
+    outflow REAL NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class SyncResult:
+    new_transactions: int
+    duplicate_transactions: int
+    transaction_count: int
+    monthly_summary: Dict
+    financial_health_score: int
+    derived_features: Dict[str, float]
+
+
+def transaction_fingerprint(transaction: Dict) -> bytes:
+    """
+    Stable dedupe key for a parsed transaction.
+
+    Bank reference numbers identify a transaction across re-sends, but the
+    REFERENCE pattern also captures words like "No"/"ID", so a ref is only
+    trusted when it looks like an id (has a digit, 6+ chars). Otherwise the
+    whitespace-normalized raw SMS is hashed.
+    """
+    ref = transaction["ref"]
+    if len(ref) >= 6 and any(c.isdigit() for c in ref):
+        key = f"ref|{ref}|{transaction['direction']}|{transaction['amount']}"
+    else:
+        key = "raw|" + " ".join(transaction["raw"].split())
+    return hashlib.sha1(key.encode("utf-8")).digest()
+
+
+def _month_ordinal(date: str) -> Optional[int]:
+    if date == "Unknown":
+        return None
+    return (int(date[:4]) - 1970) * 12 + int(date[5:7]) - 1
+
+
+class FeatureStore:
+    """SQLite-backed running aggregates keyed by user id."""
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _unseen(self, user_id: str, fingerprints: List[bytes]) -> set:
+        seen = set()
+        for start in range(0, len(fingerprints), SQL_BATCH):
+            batch = fingerprints[start:start + SQL_BATCH]
+            rows = self._conn.execute(
+                "SELECT fingerprint FROM seen_transactions WHERE user_id = ? AND fingerprint IN "
+                f"({','.join('?' * len(batch))})",
+                [user_id, *batch],
+            )
+            seen.update(row[0] for row in rows)
+        return set(fingerprints) - seen
+
+    def sync(self, user_id: str, transactions: Iterable[Dict],
+             window_months: int = DEFAULT_WINDOW_MONTHS) -> SyncResult:
+        """Fold transactions not seen before into the user's aggregates and return updated features."""
+        transactions = list(transactions)
+        fingerprints = [transaction_fingerprint(t) for t in transactions]
+
+        with self._lock, self._conn:
+            unseen = self._unseen(user_id, fingerprints)
+            new_fingerprints = []
+            month_delta: Dict[int, List[float]] = {}
+            inflow_delta = outflow_delta = 0.0
+
+            for transaction, fingerprint in zip(transactions, fingerprints):
+                if fingerprint not in unseen:
+                    continue
+                unseen.discard(fingerprint)  # Same SMS twice in one payload counts once
+                new_fingerprints.append(fingerprint)
+                column = 0 if transaction["direction"] == "credit" else 1
+                if column == 0:
+                    inflow_delta += transaction["amount"]
+                else:
+                    outflow_delta += transaction["amount"]
+                month = _month_ordinal(transaction["date"])
+                if month is not None:
+                    month_delta.setdefault(month, [0.0, 0.0])[column] += transaction["amount"]
+
+            self._conn.executemany(
+                "INSERT INTO seen_transactions (user_id, fingerprint) VALUES (?, ?)",
+                [(user_id, fingerprint) for fingerprint in new_fingerprints],
+            )
+            self._conn.executemany(
+                "INSERT INTO monthly_flows (user_id, month, inflow, outflow) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, month) DO UPDATE SET "
+                "inflow = inflow + excluded.inflow, outflow = outflow + excluded.outflow",
+                [(user_id, month, sums[0], sums[1]) for month, sums in month_delta.items()],
+            )
+            self._conn.execute(
+                "INSERT INTO user_totals (user_id, inflow, outflow, transaction_count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET inflow = inflow + excluded.inflow, "
+                "outflow = outflow + excluded.outflow, "
+                "transaction_count = transaction_count + excluded.transaction_count",
+                (user_id, inflow_delta, outflow_delta, len(new_fingerprints)),
+            )
+            inflow, outflow, count, flows = self._state(user_id)
+
+        metrics = metrics_from_totals(inflow, outflow, flows.volatility(window_months))
+        return SyncResult(
+            new_transactions=len(new_fingerprints),
+            duplicate_transactions=len(transactions) - len(new_fingerprints),
+            transaction_count=count,
+            monthly_summary=metrics["monthly_summary"],
+            financial_health_score=metrics["financial_health_score"],
+            derived_features=features_from_flows(inflow, outflow, flows, window_months),
+        )
+
+    def _state(self, user_id: str):
+        row = self._conn.execute(
+            "SELECT inflow, outflow, transaction_count FROM user_totals WHERE user_id = ?", (user_id,)
+        ).fetchone() or (0.0, 0.0, 0)
+        months = self._conn.execute(
+            "SELECT month, inflow, outflow FROM monthly_flows WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        flows = MonthlyFlows.from_month_sums({month: (inflow, outflow) for month, inflow, outflow in months})
+        return row[0], row[1], row[2], flows
+
+    def reset_user(self, user_id: str) -> None:
+        """Forget everything stored for a user."""
+        with self._lock, self._conn:
+            for table in ("seen_transactions", "monthly_flows", "user_totals"):
+                self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+
+
+_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    """Get or create the process-wide store."""
+    global _store
+    if _store is None:
+        _store = FeatureStore()
+    return _store
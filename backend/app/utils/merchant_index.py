@@ -0,0 +1,209 @@
+"""
+Merchant name canonicalization.
+
+MERCHANT_AT/MERCHANT_TO/MERCHANT_VIA capture free text such as
+"SWIGGY BANGALORE", "Swiggy" or "AMAZON SELLER S". MerchantIndex maps those
+strings to a stable integer merchant id and a spend category so downstream
+aggregation can group on small integer keys:
+
+1. Normalize: lowercase, alphanumerics only, drop location/corporate noise words
+2. Token trie: longest known alias found in the token sequence
+3. Fuzzy fallback: padded character-trigram Dice similarity against aliases
+4. Unknown merchants get a CRC32-derived id, stable across processes
+
+Resolutions are memoized in an LRU cache.
+"""
+
+import re
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+NO_MERCHANT = "N/A"
+NO_MERCHANT_ID = 0
+UNKNOWN_ID_BASE = 1 << 32  # Ids for merchants outside the dictionary: base + crc32(key)
+UNCATEGORIZED = "other"
+
+CACHE_SIZE = 8192
+FUZZY_THRESHOLD = 0.75  # Minimum trigram Dice similarity for a fuzzy match
+
+# (canonical name, category, aliases). Ids are assigned by position (1-based),
+# so append new merchants at the end to keep existing ids stable.
+MERCHANTS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("Swiggy", "food", ("swiggy", "swiggy instamart", "bundl technologies")),
+    ("Zomato", "food", ("zomato", "zomato order")),
+    ("Domino's", "food", ("dominos", "domino s", "jubilant foodworks")),
+    ("McDonald's", "food", ("mcdonalds", "mcdonald s")),
+    ("Starbucks", "food", ("starbucks", "tata starbucks")),
+    ("Amazon", "shopping", ("amazon", "amazon seller", "amazon in", "amzn", "amazon pay")),
+    ("Flipkart", "shopping", ("flipkart", "fkrt")),
+    ("Myntra", "shopping", ("myntra",)),
+    ("Ajio", "shopping", ("ajio",)),
+    ("Meesho", "shopping", ("meesho",)),
+    ("Decathlon", "shopping", ("decathlon",)),
+    ("Apple Store", "electronics", ("apple store", "apple")),
+    ("Croma", "electronics", ("croma",)),
+    ("BigBasket", "groceries", ("bigbasket", "big basket", "supermarket grocery supplies")),
+    ("Blinkit", "groceries", ("blinkit", "grofers")),
+    ("Zepto", "groceries", ("zepto",)),
+    ("DMart", "groceries", ("dmart", "d mart", "avenue supermarts")),
+    ("Reliance Fresh", "groceries", ("reliance fresh", "reliance smart", "reliance retail")),
+    ("Uber", "transport", ("uber", "uber india")),
+    ("Ola", "transport", ("ola", "ola cabs", "ani technologies")),
+    ("Rapido", "transport", ("rapido",)),
+    ("IRCTC", "travel", ("irctc",)),
+    ("MakeMyTrip", "travel", ("makemytrip", "make my trip", "mmt")),
+    ("IndiGo", "travel", ("indigo", "interglobe aviation")),
+    ("BookMyShow", "entertainment", ("bookmyshow", "book my show", "bigtree entertainment")),
+    ("Netflix", "entertainment", ("netflix",)),
+    ("Spotify", "entertainment", ("spotify",)),
+    ("Disney+ Hotstar", "entertainment", ("hotstar", "disney hotstar", "novi digital")),
+    ("Airtel", "utilities", ("airtel", "bharti airtel")),
+    ("Jio", "utilities", ("jio", "reliance jio")),
+    ("Vi", "utilities", ("vodafone idea", "vodafone", "vi")),
+    ("BESCOM", "utilities", ("bescom",)),
+    ("Indian Oil", "fuel", ("indian oil", "iocl")),
+    ("HP Petrol", "fuel", ("hpcl", "hp petrol", "hindustan petroleum")),
+    ("Bharat Petroleum", "fuel", ("bpcl", "bharat petroleum")),
+    ("Apollo Pharmacy", "health", ("apollo pharmacy", "apollo")),
+    ("PharmEasy", "health", ("pharmeasy",)),
+    ("Rent", "housing", ("rent", "house rent")),
+    ("EMI", "loan", ("emi", "loan emi")),
+    ("ECS", "loan", ("ecs", "ecs pay", "nach")),
+    ("Salary", "income", ("salary", "sal")),
+    ("OTT Subscription", "entertainment", ("ott subscription",)),
+]
+
+# Tokens that vary between SMS for the same merchant
+NOISE_TOKENS = {
+    "bangalore", "bengaluru", "mumbai", "delhi", "new", "chennai", "hyderabad", "pune", "kolkata",
+    "gurgaon", "gurugram", "noida", "india", "ind", "in", "pvt", "ltd", "private", "limited",
+    "co", "com", "www", "llp", "inc", "the",
+}
+
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+_END = ""  # Trie key marking a complete alias (tokens are never empty)
+
+
+@dataclass(frozen=True)
+class MerchantMatch:
+    merchant_id: int
+    name: str
+    category: str
+
+
+def normalize_merchant(name: str) -> str:
+    """Lowercase alphanumeric tokens with noise words removed."""
+    tokens = [token for token in NON_ALNUM.split(name.lower()) if token and token not in NOISE_TOKENS]
+    return " ".join(tokens)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MerchantIndex:
+    """Token trie + trigram index over the MERCHANTS dictionary."""
+
+    def __init__(self, merchants: List[Tuple[str, str, Tuple[str, ...]]] = MERCHANTS):
+        self.merchants: Dict[int, MerchantMatch] = {NO_MERCHANT_ID: MerchantMatch(NO_MERCHANT_ID, NO_MERCHANT, UNCATEGORIZED)}
+        self._trie: Dict = {}
+        self._alias_trigrams: List[Tuple[Set[str], int]] = []
+        self._trigram_postings: Dict[str, List[int]] = {}
+
+        for merchant_id, (name, category, aliases) in enumerate(merchants, start=1):
+            self.merchants[merchant_id] = MerchantMatch(merchant_id, name, category)
+            for alias in (name, *aliases):
+                key = normalize_merchant(alias)
+                if not key:
+                    continue
+                node = self._trie
+                for token in key.split():
+                    node = node.setdefault(token, {})
+                node[_END] = merchant_id
+                # Fuzzy matching only for aliases long enough to be distinctive
+                if len(key) >= 4:
+                    grams = _trigrams(key)
+                    position = len(self._alias_trigrams)
+                    self._alias_trigrams.append((grams, merchant_id))
+                    for gram in grams:
+                        self._trigram_postings.setdefault(gram, []).append(position)
+
+        self.resolve = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
+
+    def _trie_lookup(self, tokens: List[str]) -> Optional[int]:
+        """Longest alias occurring as a contiguous token run (earliest start wins ties)."""
+        best_id, best_length = None, 0
+        for start in range(len(tokens)):
+            node = self._trie
+            for offset, token in enumerate(tokens[start:]):
+                node = node.get(token)
+                if node is None:
+                    break
+                if _END in node and offset + 1 > best_length:
+                    best_id, best_length = node[_END], offset + 1
+        return best_id
+
+    def _fuzzy_lookup(self, key: str) -> Optional[int]:
+        grams = _trigrams(key)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self._trigram_postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        best_id, best_score = None, FUZZY_THRESHOLD
+        for position, count in shared.items():
+            alias_grams, merchant_id = self._alias_trigrams[position]
+            score = 2 * count / (len(grams) + len(alias_grams))
+            if score >= best_score:
+                best_id, best_score = merchant_id, score
+        return best_id
+
+    def _resolve(self, name: str) -> MerchantMatch:
+        if not name or name == NO_MERCHANT:
+            return self.merchants[NO_MERCHANT_ID]
+        key = normalize_merchant(name)
+        if not key:
+            return self.merchants[NO_MERCHANT_ID]
+        merchant_id = self._trie_lookup(key.split())
+        if merchant_id is None and len(key) >= 4:
+            merchant_id = self._fuzzy_lookup(key)
+        if merchant_id is not None:
+            return self.merchants[merchant_id]
+        return MerchantMatch(UNKNOWN_ID_BASE + zlib.crc32(key.encode("utf-8")), name, UNCATEGORIZED)
+
+
+_index: Optional[MerchantIndex] = None
+
+
+def get_merchant_index() -> MerchantIndex:
+    """Get or create the process-wide index."""
+    global _index
+    if _index is None:
+        _index = MerchantIndex()
+    return _index
+
+
+def resolve_merchant(name: str) -> MerchantMatch:
+    return get_merchant_index().resolve(name)
+
+
+def spend_summary(
+    by_category: Dict[str, float],
+    by_merchant: Iterable[Tuple[int, str, str, float, int]],
+    top_n: int = 5,
+) -> Dict:
+    """
+    Debit spend summary from per-category totals and per-merchant
+    (merchant_id, name, category, spend, count) rows.
+    """
+    top = sorted(by_merchant, key=lambda row: row[3], reverse=True)[:top_n]
+    return {
+        "by_category": {category: round(spend, 2) for category, spend in sorted(by_category.items(), key=lambda kv: -kv[1])},
+        "top_merchants": [
+            {"merchant_id": merchant_id, "merchant": name, "category": category, "spend": round(spend, 2), "count": count}
+            for merchant_id, name, category, spend, count in top
+        ],
+    }
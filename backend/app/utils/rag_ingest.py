@@ -3,10 +3,12 @@ Local RAG Ingestion Script - Load PDFs into ChromaDB
 
 What this does:
 1. Scans data/contracts/ folder for PDF files
-2. Extracts text from each PDF (page by page)
-3. Splits text into chunks (1000 chars with 200 overlap for context)
-4. Creates embeddings using FREE sentence-transformers model (all-MiniLM-L6-v2)
-5. Stores in ChromaDB (local vector database at data/chroma_db/)
+2. Extracts text from each PDF (page by page) and splits it into chunks
+   (1000 chars with 200 overlap for context) on a process pool
+   (rag_pipeline.py); chunks stream back as each file finishes
+3. Creates embeddings using FREE sentence-transformers model (all-MiniLM-L6-v2),
+   one batch per file
+4. Stores in ChromaDB (local vector database at data/chroma_db/)
 
 Why 1000 chars chunk size:
 - Legal documents need context (clauses often span multiple paragraphs)
@@ -30,12 +32,15 @@ import os
 os.environ['TRANSFORMERS_NO_TF'] = '1'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from pypdf import PdfReader
+from typing import List, Optional
+
+# chromadb and sentence_transformers (torch) are imported where they are used:
+# spawned extraction workers re-import this script as __mp_main__ and only need rag_pipeline
+
+# Run as a script, so the sibling module is imported by name
+from rag_pipeline import ChunkRecord, PipelineStats, chunk_characters, extract_chunks
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
@@ -47,75 +52,52 @@ CHUNK_SIZE = 1000  # Characters per chunk (chosen for best legal doc context)
 CHUNK_OVERLAP = 200  # Characters overlap between chunks
 COLLECTION_NAME = "legal_contracts"  # ChromaDB collection name
 
-# Initialize embedding model (FREE, local)
-print("Loading embedding model (all-MiniLM-L6-v2)...")
-print("   First time: will download ~80MB model")
-print("   Subsequent runs: uses cached model")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Model loaded!")
+# Lazy initialization (only load when needed, not on import)
+_embedding_model = None
 
 
-def extract_text_from_pdf(pdf_path: Path) -> List[Dict[str, Any]]:
-    """
-    Extract text from PDF, page by page.
-    
-    Returns list of dicts: [{"page": 1, "text": "..."}, ...]
-    
-    Why page by page: We want citations to include page numbers
-    """
-    print(f"   Reading {pdf_path.name}...")
-    reader = PdfReader(pdf_path)
-    pages = []
-    
-    for page_num, page in enumerate(reader.pages, start=1):
-        text = page.extract_text()
-        if text.strip():  # Skip empty pages
-            pages.append({
-                "page": page_num,
-                "text": text,
-                "filename": pdf_path.name
-            })
-    
-    print(f"      Extracted {len(pages)} pages")
-    return pages
+def get_embedding_model():
+    """Lazy load the embedding model (FREE, local) on first use"""
+    global _embedding_model
+    if _embedding_model is None:
+        from sentence_transformers import SentenceTransformer
 
+        print("Loading embedding model (all-MiniLM-L6-v2)...")
+        print("   First time: will download ~80MB model")
+        print("   Subsequent runs: uses cached model")
+        _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        print("Model loaded!")
+    return _embedding_model
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
-    """
-    Split text into overlapping chunks.
-    
-    Example with chunk_size=20, overlap=5:
-    Text: "This is a sample legal document text"
-    Chunks:
-    1. "This is a sample le" (chars 0-19)
-    2. "ple legal document " (chars 15-34, starts 5 chars before previous end)
-    3. "ent text" (chars 30-end)
-    """
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        
-        if chunk.strip():  # Skip whitespace-only chunks
-            chunks.append(chunk)
-        
-        start += (chunk_size - overlap)  # Move forward, but overlap
-    
-    return chunks
+
+def store_chunks(collection, records: List[ChunkRecord]) -> None:
+    """Embed one file's chunks in a batch and add them with their metadata"""
+    if not records:
+        return
+    embeddings = get_embedding_model().encode([record.text for record in records]).tolist()
+    collection.add(
+        ids=[f"{Path(record.path).name}_p{record.page}_c{record.chunk}" for record in records],
+        embeddings=embeddings,
+        documents=[record.text for record in records],
+        metadatas=[{
+            "filename": Path(record.path).name,
+            "page": record.page,
+            "chunk_index": record.chunk,
+            "source": str(Path(record.path).absolute())
+        } for record in records]
+    )
 
 
-def ingest_pdfs():
+def ingest_pdfs(workers: Optional[int] = None):
     """
     Main ingestion function.
     
     Steps:
     1. Find all PDFs in data/contracts/
-    2. Extract text page by page
-    3. Chunk each page
-    4. Create embeddings (using FREE model)
-    5. Store in ChromaDB with metadata (filename, page, chunk index)
+    2. Extract text page by page and chunk each page (workers processes,
+       default: CPU count)
+    3. Create embeddings (using FREE model), one batch per file
+    4. Store in ChromaDB with metadata (filename, page, chunk index)
     """
     
     # Step 1: Find PDFs
@@ -132,6 +114,9 @@ def ingest_pdfs():
         print(f"   - {pdf.name}")
     
     # Step 2: Initialize ChromaDB
+    import chromadb
+    from chromadb.config import Settings
+
     print(f"\nInitializing ChromaDB at {CHROMA_DB_DIR}...")
     CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
     
@@ -153,54 +138,32 @@ def ingest_pdfs():
         metadata={"description": "Legal contract embeddings"}
     )
     print(f"   Created collection '{COLLECTION_NAME}'")
+    get_embedding_model()  # Before extraction starts, so its progress is not interleaved
     
-    # Step 3: Process each PDF
+    # Step 3: Extract, chunk and embed each PDF as it finishes
     total_chunks = 0
-    
-    for pdf_path in pdf_files:
-        print(f"\nProcessing {pdf_path.name}...")
-        
-        # Extract pages
-        pages = extract_text_from_pdf(pdf_path)
-        
-        # Chunk and embed each page
-        for page_data in pages:
-            page_num = page_data["page"]
-            page_text = page_data["text"]
-            filename = page_data["filename"]
-            
-            # Split into chunks
-            chunks = chunk_text(page_text, CHUNK_SIZE, CHUNK_OVERLAP)
-            print(f"      Page {page_num}: {len(chunks)} chunk(s)")
-            
-            # Prepare data for ChromaDB
-            for chunk_idx, chunk in enumerate(chunks):
-                # Create unique ID
-                chunk_id = f"{filename}_p{page_num}_c{chunk_idx}"
-                
-                # Create embedding (this is where the FREE model works!)
-                embedding = embedding_model.encode(chunk).tolist()
-                
-                # Store in ChromaDB
-                collection.add(
-                    ids=[chunk_id],
-                    embeddings=[embedding],
-                    documents=[chunk],
-                    metadatas=[{
-                        "filename": filename,
-                        "page": page_num,
-                        "chunk_index": chunk_idx,
-                        "source": str(pdf_path.absolute())
-                    }]
-                )
-                
-                total_chunks += 1
+    stats = PipelineStats()
+    chunker = partial(chunk_characters, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    records: List[ChunkRecord] = []
+    
+    for item in extract_chunks(pdf_files, chunker=chunker, workers=workers, stats=stats):
+        if isinstance(item, ChunkRecord):
+            records.append(item)
+            continue
+        if item.error:
+            print(f"\nERROR: Could not read {Path(item.path).name}: {item.error}")
+            continue
+        print(f"\nProcessed {Path(item.path).name}: {item.pages} pages, {item.chunks} chunk(s)")
+        store_chunks(collection, records)
+        total_chunks += len(records)
+        records = []
     
     # Step 4: Summary
     print(f"\n{'='*60}")
     print(f"Ingestion Complete!")
     print(f"{'='*60}")
     print(f"   Total chunks stored: {total_chunks}")
+    print(f"   Pipeline: {stats.summary()}")
     print(f"   Collection name: {COLLECTION_NAME}")
     print(f"   Database location: {CHROMA_DB_DIR.absolute()}")
     print(f"\nNext step: Run queries using rag_query.py")
@@ -0,0 +1,286 @@
+"""
+Parallel document extraction and chunking for RAG ingestion.
+
+PdfReader text extraction is pure Python and dominates ingestion time, so
+extract_chunks() fans the files out over a process pool: each worker reads
+one file and chunks its pages, and the results stream to the caller (the
+indexer) through a bounded queue:
+
+    paths -> process pool (read pages, chunk) -> feeder thread -> queue -> indexer (caller)
+
+The caller iterates over ChunkRecord(path, page, chunk, text) records, each
+file's records followed by one FileDone. A file's records are contiguous and
+in page order; files arrive in completion order.
+
+Memory is bounded by the files in flight (at most workers + PREFETCH_FILES;
+a worker returns a file's records in one result) plus QUEUE_SIZE records.
+When the indexer falls behind, the queue fills, the feeder stops collecting
+results and no more files are submitted.
+
+PipelineStats reports each stage: extraction (files, pages, chunks, worker
+seconds), the queue (peak depth, seconds it was full, i.e. indexer-bound, and
+empty, i.e. extraction-bound) and indexing (the caller's time per record).
+
+Kept free of package-relative imports: rag_ingest.py runs as a script.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pypdf import PdfReader
+from docx import Document
+
+CHUNK_WORDS = 200
+MIN_CHUNK_CHARS = 50
+QUEUE_SIZE = 1000  # Records between the feeder and the indexer
+PREFETCH_FILES = 2  # Files submitted beyond one per worker
+
+Chunker = Callable[[str], List[str]]
+
+
+@dataclass
+class ChunkRecord:
+    path: str
+    page: int  # 1-based; DOCX files are page 1
+    chunk: int  # Index within the page
+    text: str
+
+
+@dataclass
+class FileDone:
+    """End of one file's records."""
+    path: str
+    pages: int = 0  # Non-empty pages
+    chunks: int = 0
+    seconds: float = 0.0  # Worker time for reading + chunking
+    error: Optional[str] = None
+
+
+@dataclass
+class PipelineStats:
+    workers: int = 0
+    files: int = 0
+    failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    extract_seconds: float = 0.0  # Summed over workers
+    queue_size: int = QUEUE_SIZE
+    max_queue_depth: int = 0
+    queue_full_seconds: float = 0.0  # Feeder blocked: the indexer is the bottleneck
+    queue_empty_seconds: float = 0.0  # Indexer waiting: extraction is the bottleneck
+    index_seconds: float = 0.0  # Caller's time between records
+    wall_seconds: float = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        """Per-stage counts, seconds and throughput."""
+        wall = max(self.wall_seconds, 1e-9)
+        return {
+            'extract': {
+                'workers': self.workers,
+                'files': self.files,
+                'failed_files': self.failed,
+                'pages': self.pages,
+                'chunks': self.chunks,
+                'worker_seconds': round(self.extract_seconds, 3),
+                'pages_per_second': round(self.pages / wall, 1),
+                'worker_utilization': round(self.extract_seconds / (wall * max(self.workers, 1)), 3),
+            },
+            'queue': {
+                'size': self.queue_size,
+                'max_depth': self.max_queue_depth,
+                'full_seconds': round(self.queue_full_seconds, 3),
+                'empty_seconds': round(self.queue_empty_seconds, 3),
+            },
+            'index': {
+                'chunks': self.chunks,
+                'seconds': round(self.index_seconds, 3),
+                'chunks_per_second': round(self.chunks / max(self.index_seconds, 1e-9), 1),
+            },
+            'wall_seconds': round(self.wall_seconds, 3),
+        }
+
+    def summary(self) -> str:
+        report = self.report()
+        extract, queued, index = report['extract'], report['queue'], report['index']
+        return (f"{self.files} files ({self.failed} failed), {self.pages} pages, {self.chunks} chunks "
+                f"in {self.wall_seconds:.1f}s | extract {extract['pages_per_second']} pages/s on "
+                f"{self.workers} workers ({extract['worker_utilization']:.0%} busy) | queue peak "
+                f"{self.max_queue_depth}/{self.queue_size}, full {queued['full_seconds']}s, "
+                f"empty {queued['empty_seconds']}s | index {index['chunks_per_second']} chunks/s")
+
+
+# -- Extraction (runs in the workers) -------------------------------------------
+
+def chunk_words(text: str, words: int = CHUNK_WORDS, min_chars: int = MIN_CHUNK_CHARS) -> List[str]:
+    """Chunks of `words` words (~1000 chars), skipping ones of min_chars or fewer"""
+    tokens = text.split()
+    chunks = (" ".join(tokens[i:i + words]) for i in range(0, len(tokens), words))
+    return [chunk for chunk in chunks if len(chunk.strip()) > min_chars]
+
+
+def chunk_characters(text: str, size: int, overlap: int) -> List[str]:
+    """
+    Overlapping chunks of `size` characters, skipping whitespace-only ones.
+
+    Example with size=20, overlap=5:
+    Text: "This is a sample legal document text"
+    Chunks:
+    1. "This is a sample le" (chars 0-19)
+    2. "ple legal document " (chars 15-34, starts 5 chars before previous end)
+    3. "ent text" (chars 30-end)
+    """
+    chunks = (text[start:start + size] for start in range(0, len(text), size - overlap))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def read_pages(path: Path) -> Iterator[Tuple[int, str]]:
+    """(page number, text) of each non-empty page of a PDF; a DOCX is one page"""
+    if path.suffix.lower() == '.pdf':
+        for page_num, page in enumerate(PdfReader(str(path)).pages, start=1):
+            text = page.extract_text()
+            if text.strip():
+                yield page_num, text
+    elif path.suffix.lower() == '.docx':
+        text = "".join(para.text + "\n" for para in Document(str(path)).paragraphs)
+        if text.strip():
+            yield 1, text
+
+
+def extract_file(path: str, chunker: Chunker = chunk_words) -> Tuple[List[ChunkRecord], FileDone]:
+    """One file's records, or none and FileDone.error if it cannot be read."""
+    start = time.perf_counter()
+    records: List[ChunkRecord] = []
+    pages = 0
+    try:
+        for page, text in read_pages(Path(path)):
+            pages += 1
+            records.extend(ChunkRecord(path, page, i, chunk) for i, chunk in enumerate(chunker(text)))
+    except Exception as e:
+        return [], FileDone(path, seconds=time.perf_counter() - start, error=str(e) or type(e).__name__)
+    return records, FileDone(path, pages, len(records), time.perf_counter() - start)
+
+
+# -- Pipeline ---------------------------------------------------------------------
+
+class _Stopped(Exception):
+    """The consumer went away while the feeder was blocked on the queue."""
+
+
+_END = object()
+
+
+def _feed(paths: List[str], chunker: Chunker, workers: int, records: queue.Queue,
+          stop: threading.Event, stats: PipelineStats) -> None:
+    def put(item) -> None:
+        start = time.perf_counter()
+        while True:
+            try:
+                records.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if stop.is_set():
+                    raise _Stopped
+        stats.queue_full_seconds += time.perf_counter() - start
+        stats.max_queue_depth = max(stats.max_queue_depth, records.qsize())
+
+    def deliver(result: Tuple[List[ChunkRecord], FileDone]) -> None:
+        file_records, done = result
+        for record in file_records:
+            put(record)
+        put(done)
+
+    try:
+        if workers == 1:
+            for path in paths:
+                deliver(extract_file(path, chunker))
+        else:
+            # spawn: this runs on a thread of the server process, and a forked child could
+            # inherit a lock another thread holds (registry watcher, threadpool workers)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                remaining = iter(paths)
+                pending = set()
+                while True:
+                    while len(pending) < workers + PREFETCH_FILES and not stop.is_set():
+                        path = next(remaining, None)
+                        if path is None:
+                            break
+                        pending.add(executor.submit(extract_file, path, chunker))
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        deliver(future.result())
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        put(_END)
+    except _Stopped:
+        pass
+    except BaseException as e:  # E.g. BrokenProcessPool: re-raised in the consumer
+        try:
+            put(e)
+        except _Stopped:
+            pass
+
+
+def extract_chunks(
+    paths: Iterable[Union[str, Path]],
+    chunker: Chunker = chunk_words,
+    workers: Optional[int] = None,
+    queue_size: int = QUEUE_SIZE,
+    stats: Optional[PipelineStats] = None,
+) -> Iterator[Union[ChunkRecord, FileDone]]:
+    """
+    Extract and chunk files in parallel; yields each file's ChunkRecords, then its FileDone.
+
+    Args:
+        paths: PDF and DOCX files
+        chunker: text -> chunks; must be picklable (a module-level function or a
+            functools.partial of one) to run in the workers
+        workers: Worker processes (default: CPU count). 1 extracts in a thread, no pool.
+        queue_size: Records buffered between extraction and the caller
+        stats: Filled in as the pipeline runs
+    """
+    paths = [str(path) for path in paths]
+    stats = stats if stats is not None else PipelineStats()
+    stats.workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    stats.queue_size = queue_size
+    start = time.perf_counter()
+    records: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    feeder = threading.Thread(target=_feed, args=(paths, chunker, stats.workers, records, stop, stats),
+                              name="rag-extract-feeder", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            waited = time.perf_counter()
+            item = records.get()
+            resumed = time.perf_counter()
+            stats.queue_empty_seconds += resumed - waited
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            if isinstance(item, FileDone):
+                stats.files += 1
+                stats.failed += item.error is not None
+                stats.pages += item.pages
+                stats.chunks += item.chunks
+                stats.extract_seconds += item.seconds
+            yield item
+            stats.index_seconds += time.perf_counter() - resumed
+    finally:
+        stop.set()
+        while feeder.is_alive():  # Unblock the feeder so it can shut the pool down
+            try:
+                records.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        stats.wall_seconds = time.perf_counter() - start
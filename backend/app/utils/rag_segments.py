@@ -0,0 +1,425 @@
+"""
+Segmented local RAG index with incremental updates.
+
+Re-ingesting data/contracts used to re-read every file and refit the TF-IDF
+vectorizer from scratch. SegmentedIndex keeps the index in pieces, the way
+Lucene does:
+
+- a manifest: path -> (mtime, size, sha256, segment) of every indexed file.
+  scan() compares it with the directory: same mtime and size means unchanged
+  without reading the file; otherwise the content hash decides, so a touched
+  but unedited file is not re-indexed
+- segments: append-only batches of chunks with their metadata, TF-IDF
+  postings (term-major, searched in place) and BM25 term counts. New and
+  changed files go into a new segment; the old chunks of changed and deleted
+  files are tombstoned (a per-segment deleted mask) rather than rewritten
+- one TF-IDF fit, frozen between refits. New segments are encoded with it
+  (TfidfEncoder: the fitted vocabulary and idf, no estimator object), so until
+  the next refit their rows only use terms it already knows; BM25 counts use a
+  vocabulary that grows with every segment, so new terms are searchable
+  through BM25 right away
+
+search_tfidf() searches every segment's postings and merges the per-segment
+top k; chunk ids are global row numbers (segment base + row), tombstoned rows
+never match. rag_store.py keeps the same structures on disk as memory-mapped
+arrays.
+
+maybe_compact() merges the MERGE_FACTOR smallest segments (dropping tombstoned
+rows) when there are more than MAX_SEGMENTS, and refits the vectorizer over
+all live chunks (leaving one segment) once chunks added since the last fit
+exceed REFIT_RATIO of the corpus or tombstones exceed DELETED_RATIO of all
+rows. A refit costs a full fit, but only after the corpus changed by a
+constant fraction, so adding a file costs its own extraction plus a rebuild of
+the in-memory search structures, not a re-ingest.
+"""
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .bm25_index import make_analyzer, term_counts
+from .sparse_retrieval import SparseRetriever, top_k
+
+MAX_SEGMENTS = 10
+MERGE_FACTOR = 4
+REFIT_RATIO = 0.25
+DELETED_RATIO = 0.25
+HASH_BLOCK = 1 << 20
+
+
+def make_vectorizer() -> TfidfVectorizer:
+    return TfidfVectorizer(max_features=5000, stop_words='english', ngram_range=(1, 2))
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class FileEntry:
+    path: str
+    mtime_ns: Optional[int]  # None: unknown (migrated index), verify by hash on the next scan
+    size: Optional[int]
+    sha256: Optional[str]
+    segment: int = -1
+    chunks: int = 0
+
+    @classmethod
+    def stat(cls, path: Path) -> "FileEntry":
+        st = path.stat()
+        return cls(str(path), st.st_mtime_ns, st.st_size, None)
+
+
+@dataclass
+class ScanResult:
+    changed: List[FileEntry]  # New or modified files (with their new hash), to extract
+    removed: List[str]  # Indexed paths no longer in the directory
+    touched: int  # Stat changed, content did not (manifest updated only)
+    unchanged: int
+
+
+class TfidfEncoder:
+    """
+    TfidfVectorizer.transform from the fitted vocabulary (term -> column) and
+    idf alone: raw counts of make_vectorizer()'s analyzer tokens, times idf,
+    rows L2-normalized. vocabulary may be any mapping with .get().
+    """
+
+    def __init__(self, vocabulary, idf: np.ndarray):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self._analyzer = make_vectorizer().build_analyzer()
+
+    @classmethod
+    def fit(cls, texts: Sequence[str]) -> Tuple["TfidfEncoder", sparse.csr_matrix]:
+        """(encoder, TF-IDF rows of texts) from a fresh make_vectorizer() fit."""
+        vectorizer = make_vectorizer()
+        rows = vectorizer.fit_transform(texts)
+        return cls(vectorizer.vocabulary_, vectorizer.idf_), sparse.csr_matrix(rows)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.idf)
+
+    def transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        get = self.vocabulary.get
+        indices: List[int] = []
+        indptr = [0]
+        for text in texts:
+            for token in self._analyzer(text):
+                column = get(token)
+                if column is not None:
+                    indices.append(column)
+            indptr.append(len(indices))
+        rows = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(texts), self.n_features),
+        )
+        rows.sum_duplicates()
+        rows.data *= self.idf[rows.indices]
+        return normalize(rows, copy=False)
+
+
+@dataclass
+class Segment:
+    id: int
+    chunks: Sequence[str]
+    metadata: Sequence[Dict]
+    files: Dict[str, Tuple[int, int]]  # Live files: path -> [start, end) rows
+    postings: sparse.csr_matrix  # TF-IDF, terms x rows
+    counts: sparse.csr_matrix  # BM25 term counts, rows x (BM25 vocabulary when the segment was written)
+    deleted: np.ndarray  # bool per row
+    fit: int  # TF-IDF fit that encoded the rows
+    _retriever: Optional[SparseRetriever] = None
+
+    @property
+    def rows(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def live(self) -> int:
+        return self.rows - int(self.deleted.sum())
+
+    @property
+    def retriever(self) -> SparseRetriever:
+        if self._retriever is None:
+            self._retriever = SparseRetriever.from_postings(self.postings)
+        return self._retriever
+
+    def tfidf_rows(self) -> sparse.csr_matrix:
+        return self.postings.T.tocsr()
+
+
+def _postings(rows: sparse.csr_matrix) -> sparse.csr_matrix:
+    postings = sparse.csr_matrix(rows).T.tocsr()
+    postings.sort_indices()
+    return postings
+
+
+def _widen(counts: sparse.csr_matrix, width: int) -> sparse.csr_matrix:
+    """The same counts with width columns (BM25 ids only ever get appended)."""
+    return sparse.csr_matrix((counts.data, counts.indices, counts.indptr), shape=(counts.shape[0], width))
+
+
+class SegmentedIndex:
+    """Manifest + segments + frozen TF-IDF encoder; see the module docstring."""
+
+    def __init__(self, uid: Optional[str] = None):
+        self.uid = uid or uuid.uuid4().hex  # Segment ids and fits are only unique within one index
+        self.manifest: Dict[str, FileEntry] = {}
+        self.segments: List[Segment] = []
+        self.encoder: Optional[TfidfEncoder] = None
+        self.fit = 0
+        self.added_since_fit = 0
+        self.vocabulary: Dict[str, int] = {}  # BM25 terms, uncapped (any mapping with .get())
+        self.next_segment = 0
+        self.bases = np.zeros(1, dtype=np.int64)  # Global id of each segment's first row; last = total rows
+        self._analyzer = make_analyzer()
+
+    @classmethod
+    def from_legacy(cls, chunks: List[str], metadata: List[Dict], vectorizer, tfidf_matrix) -> "SegmentedIndex":
+        """
+        Wrap a pre-segment index (one fitted vectorizer + matrix) as a single
+        segment. Its files' mtime, size and hash are unknown, so the next scan
+        re-extracts each of them once.
+        """
+        index = cls()
+        index.encoder, index.fit = TfidfEncoder(vectorizer.vocabulary_, vectorizer.idf_), 1
+        documents: Dict[str, Tuple[FileEntry, List[int]]] = {}
+        for row, meta in enumerate(metadata):
+            path = meta.get('path', meta.get('filename', ''))
+            documents.setdefault(path, (FileEntry(path, None, None, None), []))[1].append(row)
+        order = [row for _, rows in documents.values() for row in rows]
+        index._write_segment(
+            [(entry, [chunks[row] for row in rows], [metadata[row] for row in rows])
+             for entry, rows in documents.values()],
+            tfidf=sparse.csr_matrix(tfidf_matrix)[order],
+        )
+        index.added_since_fit = 0
+        return index
+
+    # -- Change detection ---------------------------------------------------
+
+    def scan(self, paths: Iterable[Path]) -> ScanResult:
+        changed, touched, unchanged, seen = [], 0, 0, set()
+        for path in paths:
+            entry = FileEntry.stat(path)
+            seen.add(entry.path)
+            old = self.manifest.get(entry.path)
+            if old is not None and (old.mtime_ns, old.size) == (entry.mtime_ns, entry.size):
+                unchanged += 1
+                continue
+            entry.sha256 = sha256_file(path)
+            if old is not None and old.sha256 == entry.sha256:
+                old.mtime_ns, old.size = entry.mtime_ns, entry.size
+                touched += 1
+                continue
+            changed.append(entry)
+        removed = [path for path in self.manifest if path not in seen]
+        return ScanResult(changed, removed, touched, unchanged)
+
+    # -- Updates ---------------------------------------------------------------
+
+    def update(self, documents: Sequence[Tuple[FileEntry, List[str], List[Dict]]], removed: Iterable[str] = ()) -> int:
+        """
+        Tombstone the previous chunks of every document's path and of removed
+        paths, then write the documents (entry, chunks, metadata) as one new
+        segment. Returns the number of chunks added.
+        """
+        for path in list(removed) + [entry.path for entry, _, _ in documents]:
+            self._tombstone(path)
+        for entry, chunks, _ in documents:
+            if not chunks:  # Nothing extractable: remember the file, no segment rows
+                self.manifest[entry.path] = entry
+        documents = [document for document in documents if document[1]]
+        if not documents:
+            return 0
+        if self.encoder is None:
+            self.encoder, tfidf = TfidfEncoder.fit([chunk for _, chunks, _ in documents for chunk in chunks])
+            self.fit += 1
+            segment = self._write_segment(documents, tfidf=tfidf)
+            self.added_since_fit = 0
+        else:
+            segment = self._write_segment(documents)
+        return segment.rows
+
+    def _writable(self) -> None:
+        """Vocabularies loaded from disk are read-only sorted arrays; updates need dicts."""
+        if not isinstance(self.vocabulary, dict):
+            self.vocabulary = dict(self.vocabulary.items())
+        if self.encoder is not None and not isinstance(self.encoder.vocabulary, dict):
+            self.encoder.vocabulary = dict(self.encoder.vocabulary.items())
+
+    def _tombstone(self, path: str) -> None:
+        entry = self.manifest.pop(path, None)
+        if entry is None:
+            return
+        for segment in self.segments:
+            if segment.id == entry.segment and path in segment.files:
+                start, end = segment.files.pop(path)
+                if not segment.deleted.flags.writeable:
+                    segment.deleted = np.array(segment.deleted)
+                segment.deleted[start:end] = True
+
+    def _write_segment(self, documents, tfidf=None) -> Segment:
+        self._writable()
+        chunks, metadata, files = [], [], {}
+        for entry, doc_chunks, doc_metadata in documents:
+            files[entry.path] = (len(chunks), len(chunks) + len(doc_chunks))
+            chunks.extend(doc_chunks)
+            metadata.extend(doc_metadata)
+        if tfidf is None:
+            tfidf = self.encoder.transform(chunks)
+        segment = Segment(
+            id=self.next_segment, chunks=chunks, metadata=metadata, files=files,
+            postings=_postings(tfidf), counts=term_counts(chunks, self.vocabulary, self._analyzer),
+            deleted=np.zeros(len(chunks), dtype=bool), fit=self.fit,
+        )
+        self.next_segment += 1
+        for entry, doc_chunks, _ in documents:
+            entry.segment, entry.chunks = segment.id, len(doc_chunks)
+            self.manifest[entry.path] = entry
+        self.segments.append(segment)
+        self.added_since_fit += len(chunks)
+        self.refresh()
+        return segment
+
+    # -- Compaction ------------------------------------------------------------
+
+    @property
+    def live_chunks(self) -> int:
+        return sum(segment.live for segment in self.segments)
+
+    def maybe_compact(self) -> Optional[str]:
+        """Refit or merge per the module's policy; returns "refit", "merge" or None."""
+        live = self.live_chunks
+        rows = sum(segment.rows for segment in self.segments)
+        if live and (self.added_since_fit > REFIT_RATIO * live or rows - live > DELETED_RATIO * rows):
+            self.compact(refit=True)
+            return "refit"
+        if len(self.segments) > MAX_SEGMENTS:
+            self.compact(refit=False)
+            return "merge"
+        return None
+
+    def compact(self, refit: bool = True) -> None:
+        """
+        refit: merge every segment into one and refit TF-IDF on all live chunks.
+        Otherwise merge the MERGE_FACTOR smallest segments (by live rows).
+        """
+        self._writable()
+        if refit:
+            merging = list(self.segments)
+        else:
+            merging = sorted(self.segments, key=lambda segment: segment.live)[:MERGE_FACTOR]
+        merged = self._merge(merging, refit)
+        merged_ids = {segment.id for segment in merging}
+        self.segments = [segment for segment in self.segments if segment.id not in merged_ids]
+        if merged.rows:
+            self.segments.append(merged)
+        for entry in self.manifest.values():
+            if entry.segment in merged_ids:
+                entry.segment = merged.id
+        self.refresh()
+
+    def _merge(self, segments: List[Segment], refit: bool) -> Segment:
+        chunks, metadata, files, tfidf, counts = [], [], {}, [], []
+        width = len(self.vocabulary)
+        for segment in segments:
+            segment_counts = _widen(segment.counts, width)
+            segment_rows = None if refit else segment.tfidf_rows()
+            for path, (start, end) in segment.files.items():
+                offset = len(chunks) - start
+                files[path] = (start + offset, end + offset)
+                chunks.extend(segment.chunks[start:end])
+                metadata.extend(segment.metadata[start:end])
+                counts.append(segment_counts[start:end])
+                if segment_rows is not None:
+                    tfidf.append(segment_rows[start:end])
+        if refit and chunks:
+            self.encoder, merged_tfidf = TfidfEncoder.fit(chunks)
+            self.fit += 1
+            self.added_since_fit = 0
+        elif tfidf:
+            merged_tfidf = sparse.vstack(tfidf, format='csr')
+        else:
+            merged_tfidf = sparse.csr_matrix((0, self.encoder.n_features if self.encoder else 0))
+        merged = Segment(
+            id=self.next_segment, chunks=chunks, metadata=metadata, files=files,
+            postings=_postings(merged_tfidf),
+            counts=sparse.vstack(counts, format='csr') if counts else sparse.csr_matrix((0, width), dtype=np.int32),
+            deleted=np.zeros(len(chunks), dtype=bool), fit=self.fit,
+        )
+        self.next_segment += 1
+        return merged
+
+    # -- Search ----------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Recompute segment bases after segments were added or merged."""
+        self.bases = np.cumsum([0] + [segment.rows for segment in self.segments]).astype(np.int64)
+
+    def _locate(self, chunk_id: int) -> Tuple[Segment, int]:
+        position = int(np.searchsorted(self.bases, chunk_id, side='right')) - 1
+        return self.segments[position], chunk_id - int(self.bases[position])
+
+    def chunk(self, chunk_id: int) -> str:
+        segment, row = self._locate(chunk_id)
+        return segment.chunks[row]
+
+    def chunk_metadata(self, chunk_id: int) -> Dict:
+        segment, row = self._locate(chunk_id)
+        return segment.metadata[row]
+
+    def search_tfidf(self, queries: Sequence[str], k: int, min_score: float = 0.0) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(global chunk ids, cosine scores) of the k best live chunks per query, best first."""
+        if self.encoder is None or not self.segments:
+            return [(np.empty(0, dtype=np.intp), np.empty(0)) for _ in queries]
+        query_matrix = self.encoder.transform(queries)
+        per_segment = [
+            segment.retriever.search_batch(query_matrix, k, min_score, deleted=segment.deleted)
+            for segment in self.segments
+        ]
+        results = []
+        for query in range(len(queries)):
+            ids = np.concatenate([hits[query][0] + base for hits, base in zip(per_segment, self.bases)])
+            scores = np.concatenate([hits[query][1] for hits in per_segment])
+            best = top_k(scores, k)
+            results.append((ids[best], scores[best]))
+        return results
+
+    def bm25_counts(self) -> Tuple[np.ndarray, sparse.csr_matrix]:
+        """(global ids, BM25 term counts) of all live chunks."""
+        ids, counts = [], []
+        width = len(self.vocabulary)
+        for segment, base in zip(self.segments, self.bases):
+            rows = np.flatnonzero(~segment.deleted)
+            ids.append(rows + base)
+            counts.append(_widen(segment.counts, width)[rows])
+        if not counts:
+            return np.empty(0, dtype=np.int64), sparse.csr_matrix((0, width), dtype=np.int32)
+        return np.concatenate(ids), sparse.vstack(counts, format='csr')
+
+    def stats(self) -> Dict:
+        rows = sum(segment.rows for segment in self.segments)
+        live = self.live_chunks
+        return {
+            'files': len(self.manifest),
+            'segments': len(self.segments),
+            'chunks': live,
+            'deleted_chunks': rows - live,
+            'added_since_fit': self.added_since_fit,
+            'tfidf_terms': self.encoder.n_features if self.encoder is not None else 0,
+            'bm25_terms': len(self.vocabulary),
+        }
@@ -0,0 +1,307 @@
+"""
+On-disk format of the local RAG index (rag_segments.SegmentedIndex).
+
+tfidf_index.pkl pickled every chunk, metadata dict, the fitted vectorizer and
+the matrix into one file, which each worker fully deserialized. The index is
+now a directory of flat arrays opened with np.load(mmap_mode='r'): loading
+reads index.json and maps the files, pages are read on demand, and uvicorn
+workers share them through the OS page cache.
+
+    index.json                       manifest, segments, current file names
+    tfidf-<generation>/              TF-IDF encoder: terms (sorted blob), ids.npy, idf.npy
+    bm25-vocabulary-<generation>/    BM25 vocabulary: terms (sorted blob), ids.npy
+    segment-<id>-<generation>/
+        chunks.npy, chunks_offsets.npy          chunk text blob
+        pages.npy, sources.json                 page per row; path/filename/rows per file
+        postings_{indptr,indices,data}.npy      TF-IDF, terms x rows
+        counts_{indptr,indices,data}.npy        BM25 term counts, rows x terms
+        deleted-<generation>.npy                tombstones
+
+A blob is strings concatenated as UTF-8 (uint8) plus int64 offsets: string i
+is bytes offsets[i]:offsets[i + 1]. Vocabularies are blobs in sorted order,
+looked up by binary search, with each term's id alongside.
+
+Only index.json changes in place; every other name carries the save
+generation that wrote it, so no file is ever overwritten. save_index() writes
+new files first (segments into a temporary directory that is then renamed), atomically
+replaces index.json, and then deletes files it no longer references. A worker
+with the previous index mapped keeps a consistent view (deleted files stay
+readable while mapped) and reloads when index.json's mtime changes. Windows
+refuses to delete a mapped file; such files are left in place and
+remove_stale() retries them on the next save.
+"""
+
+import json
+import os
+import shutil
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .rag_segments import FileEntry, Segment, SegmentedIndex, TfidfEncoder
+
+FORMAT = 1
+LOAD_ATTEMPTS = 3  # A concurrent save can delete files between reading index.json and mapping them
+
+
+class TextBlob:
+    """Read-only sequence of strings stored as a UTF-8 blob + offsets."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        # Plain views of the (memory-mapped) arrays: np.memmap indexing is several times slower
+        self.data, self.offsets = memoryview(np.asarray(data)), np.asarray(offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class SortedVocabulary:
+    """Read-only term -> id mapping over a sorted TextBlob (binary search)."""
+
+    def __init__(self, terms: TextBlob, ids: np.ndarray):
+        self.terms, self.ids = terms, np.asarray(ids)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, term: str, default=None):
+        i = bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return int(self.ids[i])
+        return default
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        return zip(self.terms, self.ids.tolist())
+
+
+class SegmentMetadata:
+    """Per-row {"filename", "page", "path"} from per-file sources + a page array."""
+
+    def __init__(self, sources: List[Dict], pages: np.ndarray):
+        self.sources = sorted(sources, key=lambda source: source['start'])
+        self.starts = [source['start'] for source in self.sources]
+        self.pages = pages
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        source = self.sources[bisect_right(self.starts, i) - 1]
+        return {"filename": source['filename'], "page": int(self.pages[i]), "path": source['path']}
+
+
+# -- Writing -------------------------------------------------------------------
+
+def _save(path: Path, array: np.ndarray) -> None:
+    np.save(path, np.ascontiguousarray(array))
+
+
+def _save_blob(directory: Path, name: str, strings: Iterable[str]) -> None:
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    _save(directory / f"{name}.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    _save(directory / f"{name}_offsets.npy", offsets)
+
+
+def _save_csr(directory: Path, name: str, matrix: sparse.csr_matrix) -> None:
+    for part in ('indptr', 'indices', 'data'):
+        _save(directory / f"{name}_{part}.npy", getattr(matrix, part))
+
+
+def _save_vocabulary(directory: Path, vocabulary) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    terms = sorted(vocabulary.items())
+    _save_blob(directory, 'terms', (term for term, _ in terms))
+    _save(directory / 'ids.npy', np.array([term_id for _, term_id in terms], dtype=np.int64))
+
+
+def _sources(segment: Segment) -> List[Dict]:
+    """Contiguous runs of rows from the same file."""
+    sources: List[Dict] = []
+    for row, meta in enumerate(segment.metadata):
+        if sources and sources[-1]['path'] == meta['path']:
+            sources[-1]['end'] = row + 1
+        else:
+            sources.append({'path': meta['path'], 'filename': meta['filename'], 'start': row, 'end': row + 1})
+    return sources
+
+
+def _write_segment(directory: Path, segment: Segment, deleted_name: str) -> None:
+    temporary = directory.with_name(directory.name + '.tmp')
+    shutil.rmtree(temporary, ignore_errors=True)
+    temporary.mkdir(parents=True)
+    _save_blob(temporary, 'chunks', segment.chunks)
+    _save(temporary / 'pages.npy', np.array([meta['page'] for meta in segment.metadata], dtype=np.int32))
+    (temporary / 'sources.json').write_text(json.dumps(_sources(segment)))
+    _save_csr(temporary, 'postings', segment.postings)
+    _save_csr(temporary, 'counts', segment.counts)
+    _save(temporary / deleted_name, segment.deleted)
+    os.replace(temporary, directory)
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def save_index(index: SegmentedIndex, directory: Path) -> None:
+    """Write index's new parts, switch index.json to them, drop unreferenced files."""
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = _read_json(directory / 'index.json') or {}
+    if previous.get('uid') != index.uid:  # Another index: reuse nothing
+        previous = {'generation': previous.get('generation', 0)}
+    generation = previous.get('generation', 0) + 1
+    previous_segments = {entry['id']: entry for entry in previous.get('segments', [])}
+
+    tfidf_name = previous.get('tfidf') if previous.get('fit') == index.fit else None
+    if index.encoder is not None and tfidf_name is None:
+        tfidf_name = f"tfidf-{generation}"
+        _save_vocabulary(directory / tfidf_name, index.encoder.vocabulary)
+        _save(directory / tfidf_name / 'idf.npy', index.encoder.idf)
+
+    bm25_name = previous.get('bm25_vocabulary')
+    if isinstance(index.vocabulary, dict) or bm25_name is None:
+        bm25_name = f"bm25-vocabulary-{generation}"
+        _save_vocabulary(directory / bm25_name, index.vocabulary)
+
+    segments = []
+    for segment in index.segments:
+        if segment.id not in previous_segments:
+            name, deleted_name = f"segment-{segment.id}-{generation}", f"deleted-{generation}.npy"
+            _write_segment(directory / name, segment, deleted_name)
+        else:
+            name, deleted_name = previous_segments[segment.id]['directory'], previous_segments[segment.id]['deleted']
+            if not isinstance(segment.deleted, np.memmap):
+                deleted_name = f"deleted-{generation}.npy"
+                _save(directory / name / deleted_name, segment.deleted)
+        segments.append({
+            'id': segment.id, 'directory': name, 'fit': segment.fit, 'rows': segment.rows, 'deleted': deleted_name,
+            'postings_shape': list(segment.postings.shape), 'counts_shape': list(segment.counts.shape),
+            'files': {path: list(rows) for path, rows in segment.files.items()},
+        })
+
+    state = {
+        'format': FORMAT,
+        'uid': index.uid,
+        'generation': generation,
+        'fit': index.fit,
+        'added_since_fit': index.added_since_fit,
+        'next_segment': index.next_segment,
+        'tfidf': tfidf_name,
+        'bm25_vocabulary': bm25_name,
+        'manifest': [vars(entry) for entry in index.manifest.values()],
+        'segments': segments,
+    }
+    temporary = directory / 'index.json.tmp'
+    temporary.write_text(json.dumps(state))
+    os.replace(temporary, directory / 'index.json')
+
+    _remove_stale(directory, state)
+
+
+def remove_stale(directory: Path) -> int:
+    """Delete files the saved index.json no longer references; returns how many could not be deleted yet."""
+    state = _read_json(directory / 'index.json')
+    return _remove_stale(directory, state) if state is not None else 0
+
+
+def _remove_stale(directory: Path, state: Dict) -> int:
+    keep = {'index.json', state['tfidf'], state['bm25_vocabulary']}
+    keep |= {entry['directory'] for entry in state['segments']}
+    stale = [path for path in directory.iterdir() if path.name not in keep]
+    for entry in state['segments']:
+        stale += [path for path in (directory / entry['directory']).glob('deleted-*.npy')
+                  if path.name != entry['deleted']]
+    failed = 0
+    for path in stale:
+        try:
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        except OSError:  # Still memory-mapped here or by another worker (Windows): retried on the next save
+            failed += 1
+    return failed
+
+
+# -- Reading -------------------------------------------------------------------
+
+def _load(path: Path) -> np.ndarray:
+    return np.load(path, mmap_mode='r')
+
+
+def _load_blob(directory: Path, name: str) -> TextBlob:
+    return TextBlob(_load(directory / f"{name}.npy"), _load(directory / f"{name}_offsets.npy"))
+
+
+def _load_csr(directory: Path, name: str, shape) -> sparse.csr_matrix:
+    data, indices, indptr = (_load(directory / f"{name}_{part}.npy") for part in ('data', 'indices', 'indptr'))
+    return sparse.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def _load_vocabulary(directory: Path) -> SortedVocabulary:
+    return SortedVocabulary(_load_blob(directory, 'terms'), _load(directory / 'ids.npy'))
+
+
+def index_version(directory: Path) -> Optional[int]:
+    """index.json's mtime (ns), or None when there is no saved index."""
+    try:
+        return (directory / 'index.json').stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_index(directory: Path) -> Optional[SegmentedIndex]:
+    """The saved index with every array memory-mapped, or None when there is none."""
+    for attempt in range(LOAD_ATTEMPTS):
+        try:
+            return _load_index(directory)
+        except FileNotFoundError:
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+    return None
+
+
+def _load_index(directory: Path) -> Optional[SegmentedIndex]:
+    state = _read_json(directory / 'index.json')
+    if state is None:
+        return None
+    if state.get('format') != FORMAT:
+        raise ValueError(f"Unsupported RAG index format {state.get('format')!r} in {directory}")
+    index = SegmentedIndex(state['uid'])
+    index.fit, index.added_since_fit = state['fit'], state['added_since_fit']
+    index.next_segment = state['next_segment']
+    if state['tfidf'] is not None:
+        tfidf = directory / state['tfidf']
+        index.encoder = TfidfEncoder(_load_vocabulary(tfidf), _load(tfidf / 'idf.npy'))
+    index.vocabulary = _load_vocabulary(directory / state['bm25_vocabulary'])
+    index.manifest = {entry['path']: FileEntry(**entry) for entry in state['manifest']}
+    for entry in state['segments']:
+        path = directory / entry['directory']
+        index.segments.append(Segment(
+            id=entry['id'],
+            chunks=_load_blob(path, 'chunks'),
+            metadata=SegmentMetadata(json.loads((path / 'sources.json').read_text()), _load(path / 'pages.npy')),
+            files={file: tuple(rows) for file, rows in entry['files'].items()},
+            postings=_load_csr(path, 'postings', entry['postings_shape']),
+            counts=_load_csr(path, 'counts', entry['counts_shape']),
+            deleted=_load(path / entry['deleted']),
+            fit=entry['fit'],
+        ))
+    index.refresh()
+    return index
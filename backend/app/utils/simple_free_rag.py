@@ -2,184 +2,276 @@
 100% FREE Local RAG - No PyTorch, No AWS, No Credits Needed!
 
 Uses:
-- TF-IDF vectorization (scikit-learn - already installed)
-- Simple cosine similarity for search
+- TF-IDF vectorization (scikit-learn - already installed), in segments that
+  update incrementally (rag_segments.py) and are memory-mapped from
+  data/rag_index/ (rag_store.py)
+- Sparse postings search with top-k selection (sparse_retrieval.py)
+- Files extracted and chunked on a process pool, streamed to the indexer
+  (rag_pipeline.py)
+- Or BM25 over an uncapped vocabulary with MaxScore top-k (bm25_index.py),
+  picked per query or by RAG_RETRIEVER ("tfidf" or "bm25")
 - Google Gemini API (you already have free key) for generation
 - Works completely offline for search, online only for LLM answer
 """
 
 import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import pickle
 
 # Only use libraries we already have
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-from pypdf import PdfReader
-from docx import Document
 import google.generativeai as genai
 
+from .bm25_index import BM25Index
+from . import rag_store
+from .rag_pipeline import ChunkRecord, PipelineStats, extract_chunks
+from .rag_segments import FileEntry, SegmentedIndex, sha256_file
+
 # Paths
 CONTRACTS_DIR = Path(__file__).parent.parent.parent.parent / "data" / "contracts"
-INDEX_PATH = Path(__file__).parent.parent.parent.parent / "data" / "tfidf_index.pkl"
+INDEX_DIR = Path(__file__).parent.parent.parent.parent / "data" / "rag_index"  # See rag_store.py
+LEGACY_INDEX_PATH = Path(__file__).parent.parent.parent.parent / "data" / "tfidf_index.pkl"
+MIN_SCORE = 0.003  # Lower threshold for more results
+RETRIEVERS = ("tfidf", "bm25")
+DEFAULT_RETRIEVER = os.getenv("RAG_RETRIEVER", "tfidf")
+INDEX_BATCH_CHUNKS = 10_000  # update_index() writes and saves a segment per batch
 
 # Initialize Gemini (free API)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+def list_documents() -> List[Path]:
+    """PDF and DOCX files in the contracts directory"""
+    if not CONTRACTS_DIR.exists():
+        return []
+    return sorted(CONTRACTS_DIR.glob("*.pdf")) + sorted(CONTRACTS_DIR.glob("*.docx"))
+
+
+def _chunk_metadata(record: ChunkRecord) -> Dict[str, Any]:
+    return {"filename": Path(record.path).name, "page": record.page, "path": record.path}
+
+
+def _migrate_pickle(data: Dict[str, Any]) -> SegmentedIndex:
+    """SegmentedIndex from a tfidf_index.pkl (one flat vectorizer + matrix)"""
+    return SegmentedIndex.from_legacy(data['chunks'], data['metadata'], data['vectorizer'], data['tfidf_matrix'])
+
+
 class SimpleFreeRAG:
     """100% free local RAG using TF-IDF + Gemini"""
     
-    def __init__(self):
-        self.chunks = []
+    def __init__(self, retriever: str = DEFAULT_RETRIEVER):
+        if retriever not in RETRIEVERS:
+            raise ValueError(f"Unknown retriever {retriever!r}; expected one of {RETRIEVERS}")
+        self.retriever = retriever
+        self.chunks = []  # Staging for build_index(), filled by load_documents()
         self.metadata = []
-        self.vectorizer = None
-        self.tfidf_matrix = None
+        self.index = SegmentedIndex()
+        self._index_version = None
+        self._bm25 = None
+        self._bm25_ids = None
+        self._bm25_lock = threading.Lock()
+        self._update_lock = threading.Lock()
         
-    def load_documents(self) -> None:
+    def load_documents(self, workers: Optional[int] = None) -> None:
         """Load and chunk documents (PDF and DOCX) from contracts directory"""
         print(f"Loading documents from {CONTRACTS_DIR}")
+        self.chunks, self.metadata = [], []
 
-        if not CONTRACTS_DIR.exists():
-            print(f"Creating contracts directory: {CONTRACTS_DIR}")
-            CONTRACTS_DIR.mkdir(parents=True, exist_ok=True)
-            return
-
-        # Get both PDF and DOCX files
-        pdf_files = list(CONTRACTS_DIR.glob("*.pdf"))
-        docx_files = list(CONTRACTS_DIR.glob("*.docx"))
-
-        all_files = pdf_files + docx_files
+        all_files = list_documents()
         if not all_files:
             print("No PDF or DOCX files found in contracts directory")
             return
 
-        for file_path in all_files:
-            try:
-                if file_path.suffix.lower() == '.pdf':
-                    self._load_pdf(file_path)
-                elif file_path.suffix.lower() == '.docx':
-                    self._load_docx(file_path)
-            except Exception as e:
-                print(f"[ERROR] Error loading {file_path.name}: {e}")
+        for item in extract_chunks(all_files, workers=workers):
+            if isinstance(item, ChunkRecord):
+                self.chunks.append(item.text)
+                self.metadata.append(_chunk_metadata(item))
+            elif item.error:
+                print(f"[ERROR] Error loading {Path(item.path).name}: {item.error}")
 
         print(f"\nTotal chunks created: {len(self.chunks)}")
 
-    def _load_pdf(self, pdf_path: Path) -> None:
-        """Load a PDF file"""
-        reader = PdfReader(str(pdf_path))
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            if text.strip():
-                # Split into chunks of ~1000 chars
-                words = text.split()
-                chunk_size = 200  # words per chunk
-                for i in range(0, len(words), chunk_size):
-                    chunk = " ".join(words[i:i+chunk_size])
-                    if len(chunk.strip()) > 50:  # Skip tiny chunks
-                        self.chunks.append(chunk)
-                        self.metadata.append({
-                            "filename": pdf_path.name,
-                            "page": page_num + 1,
-                            "path": str(pdf_path)
-                        })
-        print(f"[OK] Loaded PDF {pdf_path.name}: {len(reader.pages)} pages")
-
-    def _load_docx(self, docx_path: Path) -> None:
-        """Load a DOCX file"""
-        document = Document(str(docx_path))
-        text = ""
-        for para in document.paragraphs:
-            text += para.text + "\n"
-
-        if text.strip():
-            # Split into chunks of ~1000 chars
-            words = text.split()
-            chunk_size = 200  # words per chunk
-            page_num = 1  # DOCX doesn't have pages, so use 1
-            for i in range(0, len(words), chunk_size):
-                chunk = " ".join(words[i:i+chunk_size])
-                if len(chunk.strip()) > 50:  # Skip tiny chunks
-                    self.chunks.append(chunk)
-                    self.metadata.append({
-                        "filename": docx_path.name,
-                        "page": page_num,
-                        "path": str(docx_path)
-                    })
-            print(f"[OK] Loaded DOCX {docx_path.name}: {len(self.chunks)} chunks")
-    
     def build_index(self) -> None:
-        """Build TF-IDF index"""
+        """Build a fresh index from the loaded chunks"""
         if not self.chunks:
             print("No chunks to index!")
             return
-        
+
         print("Building TF-IDF index...")
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.chunks)
-        print(f"[OK] Index built: {self.tfidf_matrix.shape}")
+        documents: Dict[str, Tuple[FileEntry, List[str], List[Dict]]] = {}
+        for chunk, meta in zip(self.chunks, self.metadata):
+            path = meta['path']
+            if path not in documents:
+                entry = FileEntry.stat(Path(path))
+                entry.sha256 = sha256_file(Path(path))
+                documents[path] = (entry, [], [])
+            documents[path][1].append(chunk)
+            documents[path][2].append(meta)
+        self.index = SegmentedIndex()
+        self.index.update(list(documents.values()))
+        self._refresh()
+        print(f"[OK] Index built: {self.index.live_chunks} chunks, {self.index.encoder.n_features} terms")
+
+    def update_index(self, compact: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Bring the index in line with the contracts directory: extract only new
+        and changed files (in parallel, see rag_pipeline.py), tombstone deleted
+        ones, compact when due (or always with compact=True), then save.
+        Extracted chunks are indexed and saved every INDEX_BATCH_CHUNKS chunks,
+        so the text of a large ingest is never all in memory. Returns what
+        changed, with per-stage pipeline throughput.
+        """
+        with self._update_lock:
+            start = time.perf_counter()
+            CONTRACTS_DIR.mkdir(parents=True, exist_ok=True)
+            scan = self.index.scan(list_documents())
+            entries = {entry.path: entry for entry in scan.changed}
+            removed = scan.removed
+            pipeline = PipelineStats()
+            documents, batch_chunks, indexed, added, failed = [], 0, 0, 0, []
+            chunks, metadata = [], []
+            for item in extract_chunks(list(entries), workers=workers, stats=pipeline):
+                if isinstance(item, ChunkRecord):
+                    chunks.append(item.text)
+                    metadata.append(_chunk_metadata(item))
+                    continue
+                if item.error:
+                    print(f"[ERROR] Error loading {Path(item.path).name}: {item.error}")
+                    failed.append(item.path)
+                    continue
+                print(f"[OK] Extracted {Path(item.path).name}: {item.chunks} chunks")
+                documents.append((entries[item.path], chunks, metadata))
+                batch_chunks += len(chunks)
+                chunks, metadata = [], []
+                if batch_chunks >= INDEX_BATCH_CHUNKS:
+                    added += self.index.update(documents, removed=removed)
+                    self.save_index()  # The batch's text is memory-mapped from here on
+                    indexed += len(documents)
+                    documents, batch_chunks, removed = [], 0, []
+            added += self.index.update(documents, removed=removed)
+            indexed += len(documents)
+            if compact and self.index.segments:
+                self.index.compact(refit=True)
+                compaction = "refit"
+            else:
+                compaction = self.index.maybe_compact()
+            if documents or removed or compaction or scan.touched:
+                self.save_index()
+            if pipeline.files:
+                print(f"[OK] Pipeline: {pipeline.summary()}")
+            return {
+                'indexed_files': indexed,
+                'removed_files': len(scan.removed),
+                'unchanged_files': scan.unchanged + scan.touched,
+                'failed_files': failed,
+                'chunks_added': added,
+                'compaction': compaction,
+                'seconds': round(time.perf_counter() - start, 3),
+                'pipeline': pipeline.report(),
+                **self.index.stats(),
+            }
+
+    def _refresh(self) -> None:
+        """Drop search state derived from the previous index (BM25 is rebuilt lazily)"""
+        self._bm25 = None
+        self._bm25_ids = None
 
     def save_index(self) -> None:
-        """Save index to disk"""
-        INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(INDEX_PATH, 'wb') as f:
-            pickle.dump({
-                'chunks': self.chunks,
-                'metadata': self.metadata,
-                'vectorizer': self.vectorizer,
-                'tfidf_matrix': self.tfidf_matrix
-            }, f)
-        print(f"[OK] Index saved to {INDEX_PATH}")
+        """Save index to disk, then serve it memory-mapped from there"""
+        self._refresh()  # BM25 maps the previous vocabulary, which the save may replace
+        rag_store.save_index(self.index, INDEX_DIR)
+        print(f"[OK] Index saved to {INDEX_DIR}")
+        self._load_saved()
+        rag_store.remove_stale(INDEX_DIR)  # Files that were still mapped by the previous index
 
-    def load_index(self) -> bool:
-        """Load index from disk"""
-        if not INDEX_PATH.exists():
+    def _load_saved(self) -> bool:
+        version = rag_store.index_version(INDEX_DIR)
+        index = rag_store.load_index(INDEX_DIR)
+        if index is None:
             return False
+        self.index, self._index_version = index, version
+        self._refresh()
+        return True
 
+    def load_index(self) -> bool:
+        """Load index from disk (a tfidf_index.pkl from before the segment format is migrated)"""
         try:
-            with open(INDEX_PATH, 'rb') as f:
-                data = pickle.load(f)
-            self.chunks = data['chunks']
-            self.metadata = data['metadata']
-            self.vectorizer = data['vectorizer']
-            self.tfidf_matrix = data['tfidf_matrix']
-            print(f"[OK] Loaded index: {len(self.chunks)} chunks")
+            if not self._load_saved():
+                if not LEGACY_INDEX_PATH.exists():
+                    return False
+                print(f"Migrating {LEGACY_INDEX_PATH} to {INDEX_DIR} (the .pkl can be deleted afterwards)")
+                with open(LEGACY_INDEX_PATH, 'rb') as f:
+                    self.index = _migrate_pickle(pickle.load(f))
+                self.save_index()
+            print(f"[OK] Loaded index: {self.index.live_chunks} chunks")
             return True
         except Exception as e:
             print(f"[ERROR] Error loading index: {e}")
             return False
-    
-    def search(self, query: str, top_k: int = 8) -> List[Dict[str, Any]]:
+
+    def _maybe_reload(self) -> None:
+        """Pick up an index saved by another worker process (index.json changed)"""
+        if self._update_lock.locked():
+            return
+        version = rag_store.index_version(INDEX_DIR)
+        if version is not None and version != self._index_version:
+            with self._update_lock:
+                if rag_store.index_version(INDEX_DIR) != self._index_version:
+                    self._load_saved()
+
+    @property
+    def bm25(self) -> Optional[BM25Index]:
+        """BM25 index over the live chunks, built on first use"""
+        if self._bm25 is None and self.index.live_chunks:
+            with self._bm25_lock:
+                if self._bm25 is None:
+                    ids, counts = self.index.bm25_counts()
+                    self._bm25_ids, self._bm25 = ids, BM25Index(self.index.vocabulary, counts)
+                    print(f"[OK] BM25 index built: {self._bm25.n_docs} chunks, {self._bm25.n_terms} terms")
+        return self._bm25
+
+    def search(self, query: str, top_k: int = 8, retriever: Optional[str] = None) -> List[Dict[str, Any]]:
         """Search for relevant chunks"""
-        if self.vectorizer is None:
-            return []
-        
-        # Vectorize query
-        query_vec = self.vectorizer.transform([query])
-        
-        # Calculate cosine similarity
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix)[0]
-        
-        # Get top K results
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        results = []
-        for idx in top_indices:
-            if similarities[idx] > 0.003:  # Lower threshold for more results
-                results.append({
-                    'text': self.chunks[idx],
-                    'score': float(similarities[idx]),
-                    'metadata': self.metadata[idx]
-                })
-        
-        return results
+        return self.search_batch([query], top_k=top_k, retriever=retriever)[0]
+
+    def search_batch(
+        self, queries: List[str], top_k: int = 8, retriever: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once; one result list per query.
+
+        TF-IDF rows and query vectors are L2-normalized, so the dot product over
+        the postings of each query's terms is the cosine similarity. BM25 scores
+        are unbounded; every chunk sharing a term with the query can be returned.
+        """
+        retriever = retriever or self.retriever
+        if retriever not in RETRIEVERS:
+            raise ValueError(f"Unknown retriever {retriever!r}; expected one of {RETRIEVERS}")
+        self._maybe_reload()
+        index = self.index
+
+        if retriever == "bm25":
+            bm25, bm25_ids = self.bm25, self._bm25_ids
+            if bm25 is None:
+                return [[] for _ in queries]
+            hits = [(bm25_ids[ids], scores) for ids, scores in bm25.search_batch(queries, top_k)]
+        else:
+            hits = index.search_tfidf(queries, top_k, min_score=MIN_SCORE)
+
+        return [
+            [
+                {
+                    'text': index.chunk(idx),
+                    'score': float(score),
+                    'metadata': index.chunk_metadata(idx)
+                }
+                for idx, score in zip(ids.tolist(), scores.tolist())
+            ]
+            for ids, scores in hits
+        ]
     
     def generate_answer(self, query: str, results: List[Dict]) -> str:
         """Generate answer using Gemini"""
@@ -229,16 +321,18 @@ Answer:"""
                 return f"[Extractive answer from {results[0]['metadata']['filename']} p.{results[0]['metadata']['page']}]\n\n{results[0]['text'][:500]}..."
             return f"Error generating answer: {e}"
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(self, question: str, retriever: Optional[str] = None) -> Dict[str, Any]:
         """Main query function"""
+        retriever = retriever or self.retriever
         # Search for relevant chunks
-        results = self.search(question, top_k=5)
+        results = self.search(question, top_k=5, retriever=retriever)
         
         if not results:
             return {
                 'answer': "No relevant information found in the uploaded contracts.",
                 'citations': [],
-                'reasoning': "No matching documents"
+                'reasoning': "No matching documents",
+                'retriever': retriever
             }
         
         # Generate answer
@@ -258,7 +352,9 @@ Answer:"""
         return {
             'answer': answer,
             'citations': citations,
-            'reasoning': f"Found {len(results)} relevant passages using TF-IDF similarity"
+            'reasoning': f"Found {len(results)} relevant passages using "
+                         + ("BM25 ranking" if retriever == "bm25" else "TF-IDF similarity"),
+            'retriever': retriever
         }
 
 
@@ -266,7 +362,7 @@ Answer:"""
 _rag_instance = None
 
 def get_simple_rag() -> SimpleFreeRAG:
-    """Get or create RAG instance"""
+    """Get or create RAG instance (default retriever from RAG_RETRIEVER)"""
     global _rag_instance
     if _rag_instance is None:
         _rag_instance = SimpleFreeRAG()
@@ -275,10 +371,7 @@ def get_simple_rag() -> SimpleFreeRAG:
         if not _rag_instance.load_index():
             # Build new index
             print("No existing index found, building new one...")
-            _rag_instance.load_documents()
-            if _rag_instance.chunks:
-                _rag_instance.build_index()
-                _rag_instance.save_index()
+            _rag_instance.update_index()
     
     return _rag_instance
 
@@ -289,12 +382,10 @@ if __name__ == "__main__":
     print("=" * 60)
 
     rag = SimpleFreeRAG()
-    rag.load_documents()
-
-    if rag.chunks:
-        rag.build_index()
-        rag.save_index()
+    rag.load_index()
+    print(f"Update: {rag.update_index()}")
 
+    if rag.index.live_chunks:
         # Test query
         print("\n" + "=" * 60)
         print("Testing with sample query...")
@@ -0,0 +1,121 @@
+"""
+Bulk SMS parsing for many users at once.
+
+Each user's SMS block is split into work units of ``chunk_lines`` lines. The
+units are parsed with ``sms_parser.parse_sms_block`` on a process pool and
+reassembled per user in the original line order, so the result for a user is
+the same as calling ``parse_sms_block`` on their whole block.
+
+CLI (from backend/):
+    python -m app.utils.sms_batch <sms_dir> <out.jsonl> [--workers N] [--chunk-lines N]
+
+Every ``*.txt`` file in ``sms_dir`` is one user (the file stem is the user id).
+Results are written as one JSON object per line:
+    {"user_id": "...", "transactions": [...], "unparsed": [...]}
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .sms_parser import parse_sms_block
+
+DEFAULT_CHUNK_LINES = 2000  # Lines per work unit sent to a worker
+USERS_PER_BATCH = 256  # CLI: users read into memory at a time
+
+WorkUnit = Tuple[str, str]
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Reuse one pool per worker count so repeated API calls skip process startup."""
+    if workers not in _executors:
+        # spawn: called from the API's threadpool, where a forked child could inherit a held lock
+        _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _executors[workers]
+
+
+def _work_units(blocks: Mapping[str, str], chunk_lines: int) -> Iterator[WorkUnit]:
+    """Split every user's block into (user_id, text) units of at most chunk_lines lines."""
+    for user_id, sms_text in blocks.items():
+        lines = sms_text.splitlines()
+        for start in range(0, len(lines), chunk_lines):
+            yield user_id, "\n".join(lines[start:start + chunk_lines])
+
+
+def _parse_unit(unit: WorkUnit) -> Tuple[str, List[Dict], List[str]]:
+    user_id, sms_text = unit
+    transactions, unparsed = parse_sms_block(sms_text)
+    return user_id, transactions, unparsed
+
+
+def parse_sms_blocks(
+    blocks: Mapping[str, str],
+    workers: Optional[int] = None,
+    chunk_lines: int = DEFAULT_CHUNK_LINES,
+) -> Dict[str, Dict[str, List]]:
+    """
+    Parse many users' SMS blocks in parallel.
+
+    Args:
+        blocks: Mapping of user id -> SMS text (same input as parse_sms_block)
+        workers: Worker processes (default: CPU count). 1 parses in-process.
+        chunk_lines: Lines per work unit
+
+    Returns:
+        {user_id: {"transactions": [...], "unparsed": [...]}} for every user
+    """
+    results = {user_id: {"transactions": [], "unparsed": []} for user_id in blocks}
+    units = list(_work_units(blocks, chunk_lines))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(units) <= 1:
+        parsed = map(_parse_unit, units)
+    else:
+        # Batch several units per IPC round trip; map() keeps submission order
+        batch = max(1, len(units) // (workers * 4))
+        parsed = _get_executor(workers).map(_parse_unit, units, chunksize=batch)
+
+    for user_id, transactions, unparsed in parsed:
+        results[user_id]["transactions"].extend(transactions)
+        results[user_id]["unparsed"].extend(unparsed)
+    return results
+
+
+def parse_sms_directory(
+    sms_dir: Path,
+    out_path: Path,
+    workers: Optional[int] = None,
+    chunk_lines: int = DEFAULT_CHUNK_LINES,
+) -> int:
+    """Parse every *.txt file in sms_dir and write per-user results as JSONL. Returns user count."""
+    files = sorted(sms_dir.glob("*.txt"))
+    with out_path.open("w", encoding="utf-8") as out:
+        for start in range(0, len(files), USERS_PER_BATCH):
+            batch = {path.stem: path.read_text(encoding="utf-8") for path in files[start:start + USERS_PER_BATCH]}
+            results = parse_sms_blocks(batch, workers=workers, chunk_lines=chunk_lines)
+            for user_id, result in results.items():
+                out.write(json.dumps({"user_id": user_id, **result}, ensure_ascii=False) + "\n")
+            print(f"[OK] Parsed {min(start + USERS_PER_BATCH, len(files))}/{len(files)} users")
+    return len(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a directory of per-user SMS dumps into JSONL.")
+    parser.add_argument("sms_dir", type=Path, help="Directory of <user_id>.txt SMS files")
+    parser.add_argument("out", type=Path, help="Output JSONL path")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES, help="Lines per work unit")
+    args = parser.parse_args()
+
+    count = parse_sms_directory(args.sms_dir, args.out, workers=args.workers, chunk_lines=args.chunk_lines)
+    print(f"Wrote results for {count} users to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
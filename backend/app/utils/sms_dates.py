@@ -0,0 +1,108 @@
+"""
+Fast normalization of SMS date strings to ISO dates.
+
+SMSPatterns.DATE_1 captures numeric dates ("05-02-19", "8/5/2025") and DATE_2
+captures compact month-name dates ("17Nov25", "5Dec2025"). normalize_sms_date
+parses both shapes with plain digit arithmetic instead of datetime.strptime and
+memoizes results, since real SMS dumps repeat the same few hundred dates.
+
+Results match the strptime formats the parser used before: "%d-%m-%y",
+"%d/%m/%y", "%d-%m-%Y", "%d/%m/%Y" for numeric dates and "%d%b%y" / "%d%b%Y"
+(chosen by length > 7) for compact ones, with strptime's two-digit year pivot
+and English month abbreviations. The shape is detected from the string itself,
+so no per-sender format state is needed. Non-ASCII input goes through strptime.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+CACHE_SIZE = 4096
+
+MONTH_ABBREVIATIONS = {
+    name: number
+    for number, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+
+
+def _pivot_year(two_digits: int) -> int:
+    """strptime's %y rule: 69-99 -> 1900s, 00-68 -> 2000s."""
+    return two_digits + (1900 if two_digits >= 69 else 2000)
+
+
+def _iso(year: int, month: int, day: int) -> Optional[str]:
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:  # e.g. 31-02 or year 0000
+        return None
+
+
+def _parse_numeric(date_str: str) -> Optional[str]:
+    """dd-mm-yy / dd/mm/yyyy with one separator used twice."""
+    separator = "-" if "-" in date_str else "/"
+    parts = date_str.split(separator)
+    if len(parts) != 3:
+        return None  # Mixed separators match none of the formats
+    day, month, year = parts
+    if not (day.isdigit() and month.isdigit() and year.isdigit()):
+        return None
+    if not (1 <= len(day) <= 2 and 1 <= len(month) <= 2):
+        return None
+    if len(year) == 2:
+        year_value = _pivot_year(int(year))
+    elif len(year) == 4:
+        year_value = int(year)
+    else:
+        return None
+    return _iso(year_value, int(month), int(day))
+
+
+def _parse_compact(date_str: str) -> Optional[str]:
+    """17Nov25 / 5Dec2025: 1-2 day digits, month abbreviation, 2 or 4 year digits."""
+    start = 0
+    while start < len(date_str) and date_str[start].isdigit():
+        start += 1
+    day, month, year = date_str[:start], date_str[start:start + 3], date_str[start + 3:]
+    if not (1 <= len(day) <= 2 and year.isdigit()):
+        return None
+    month_value = MONTH_ABBREVIATIONS.get(month.lower())
+    if month_value is None:
+        return None
+    # Same length rule as before: longer strings are read with a 4-digit year
+    if len(date_str) > 7:
+        if len(year) != 4:
+            return None
+        year_value = int(year)
+    else:
+        if len(year) != 2:
+            return None
+        year_value = _pivot_year(int(year))
+    return _iso(year_value, month_value, int(day))
+
+
+def _parse_strptime(date_str: str) -> Optional[str]:
+    """Reference strptime path, used for non-ASCII input."""
+    if "-" in date_str or "/" in date_str:
+        formats = ["%d-%m-%y", "%d/%m/%y", "%d-%m-%Y", "%d/%m/%Y"]
+    else:
+        formats = ["%d%b%Y" if len(date_str) > 7 else "%d%b%y"]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_sms_date(date_str: str) -> Optional[str]:
+    """ISO date (YYYY-MM-DD) for a DATE_1/DATE_2 capture, or None if it is not a valid date."""
+    if not date_str.isascii():
+        return _parse_strptime(date_str)
+    if "-" in date_str or "/" in date_str:
+        return _parse_numeric(date_str)
+    return _parse_compact(date_str)
@@ -1,8 +1,13 @@
 import re
-from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 from enum import Enum
 
+from .feature_builder import DEFAULT_WINDOW_MONTHS, record_flows
+from .merchant_index import resolve_merchant
+from .sms_dates import normalize_sms_date
+from .sms_templates import SMSTemplate, get_template_registry
+
+
 class AccountType(str, Enum):
     CARD = "CARD"
     WALLET = "WALLET"
@@ -42,11 +47,92 @@ class SMSPatterns:
     WALLET = re.compile(r"(Paytm|Amazon Pay|PhonePe|Google Pay|GPay|Lazypay|Simpl|Mobikwik)", re.IGNORECASE)
 
 
+# Single-pass prefilter. Every keyword listed for a pattern is a substring that
+# any match of that pattern must contain, so a pattern whose keywords are all
+# absent from the case-folded message cannot match and its search is skipped.
+_TRIGGERS = {
+    SMSPatterns.AMOUNT: ("rs", "inr", "₹"),
+    SMSPatterns.DEBIT: ("debited", "spent", "withdrawn", "purchase", "paid"),
+    SMSPatterns.CREDIT: ("credited", "received", "deposited"),
+    SMSPatterns.ACCOUNT_NUMBER: ("a/c", "account", "xx"),
+    SMSPatterns.CARD_NUMBER: ("card", "xx"),
+    SMSPatterns.AVAILABLE_BALANCE: ("bal",),
+    SMSPatterns.OUTSTANDING: ("outstanding", "o/s", "total due"),
+    SMSPatterns.REFERENCE: ("ref", "upi", "utr"),
+    SMSPatterns.MERCHANT_AT: ("at", "@"),
+    SMSPatterns.MERCHANT_TO: ("to",),
+    SMSPatterns.MERCHANT_VIA: ("upi", "using"),
+    SMSPatterns.DATE_1: ("on", "dt", "date"),
+    SMSPatterns.DATE_2: ("on", "dt"),
+    SMSPatterns.BANK_CODE: ("-",),
+    SMSPatterns.WALLET: ("paytm", "amazon pay", "phonepe", "google pay", "gpay", "lazypay", "simpl", "mobikwik"),
+}
+
+MERCHANT_PATTERNS = (SMSPatterns.MERCHANT_AT, SMSPatterns.MERCHANT_TO, SMSPatterns.MERCHANT_VIA)
+WHITESPACE = re.compile(r"\s+")
+
+# Non-ASCII characters that re.IGNORECASE treats as equal to an ASCII letter
+# but that str.lower() does not fold onto it.
+_FOLD_EXTRA = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
+
+def _fold(sms_text: str) -> str:
+    """Case-fold a message for keyword prefiltering."""
+    if sms_text.isascii():
+        return sms_text.lower()
+    return sms_text.translate(_FOLD_EXTRA).lower()
+
+
+def _search(pattern: re.Pattern, sms_text: str, folded: str) -> Optional[re.Match]:
+    """Run ``pattern`` only if one of its trigger keywords is present."""
+    for keyword in _TRIGGERS[pattern]:
+        if keyword in folded:
+            return pattern.search(sms_text)
+    return None
+
+
 def extract_transaction_info(sms_text: str) -> Dict:
     """
     Extract comprehensive transaction information from SMS.
     Returns dict with account, balance, transaction, merchant, date, bank info.
     """
+    return _extract(sms_text, require_core=False)
+
+
+def _extract(sms_text: str, require_core: bool, use_templates: bool = True) -> Optional[Dict]:
+    """
+    Extraction engine behind ``extract_transaction_info``.
+
+    The message is case-folded once. Known bank formats are extracted by their
+    sender template (see sms_templates); everything else takes the generic
+    path, where each pattern is gated on its trigger keywords. With
+    ``require_core`` the remaining fields are skipped (and None is returned) as
+    soon as the amount or transaction type is known to be missing, which is all
+    ``parse_sms_block`` needs for unparsed lines.
+    """
+    folded = _fold(sms_text)
+
+    if use_templates:
+        matched = get_template_registry().match(sms_text, folded)
+        if matched:
+            return _from_template(*matched)
+
+    # Extract amount
+    amount = None
+    amount_match = _search(SMSPatterns.AMOUNT, sms_text, folded)
+    if amount_match:
+        amount = amount_match.group(1).replace(",", "")
+
+    # Extract transaction type
+    txn_type = None
+    if _search(SMSPatterns.DEBIT, sms_text, folded):
+        txn_type = "debit"
+    elif _search(SMSPatterns.CREDIT, sms_text, folded):
+        txn_type = "credit"
+
+    if require_core and not (amount and txn_type):
+        return None
+
     result = {
         "account": {
             "type": None,
@@ -57,8 +143,8 @@ def extract_transaction_info(sms_text: str) -> Dict:
             "outstanding": None,
         },
         "transaction": {
-            "type": None,
-            "amount": None,
+            "type": txn_type,
+            "amount": amount,
             "referenceNo": None,
             "merchant": None,
         },
@@ -66,136 +152,158 @@ def extract_transaction_info(sms_text: str) -> Dict:
         "bank": None,
     }
     
-    # Extract amount
-    amount_match = SMSPatterns.AMOUNT.search(sms_text)
-    if amount_match:
-        result["transaction"]["amount"] = amount_match.group(1).replace(",", "")
-    
-    # Extract transaction type
-    if SMSPatterns.DEBIT.search(sms_text):
-        result["transaction"]["type"] = "debit"
-    elif SMSPatterns.CREDIT.search(sms_text):
-        result["transaction"]["type"] = "credit"
-    
     # Extract account info
-    card_match = SMSPatterns.CARD_NUMBER.search(sms_text)
-    account_match = SMSPatterns.ACCOUNT_NUMBER.search(sms_text)
-    wallet_match = SMSPatterns.WALLET.search(sms_text)
-    
+    wallet_match = _search(SMSPatterns.WALLET, sms_text, folded)
     if wallet_match:
         result["account"]["type"] = AccountType.WALLET
         result["account"]["number"] = None
         result["bank"] = wallet_match.group(1)
-    elif card_match:
-        result["account"]["type"] = AccountType.CARD
-        result["account"]["number"] = card_match.group(1).replace("*", "").replace("XX", "")
-    elif account_match:
-        result["account"]["type"] = AccountType.ACCOUNT
-        result["account"]["number"] = account_match.group(1).replace("*", "").replace("XX", "")
+    else:
+        card_match = _search(SMSPatterns.CARD_NUMBER, sms_text, folded)
+        if card_match:
+            result["account"]["type"] = AccountType.CARD
+            result["account"]["number"] = card_match.group(1).replace("*", "").replace("XX", "")
+        else:
+            account_match = _search(SMSPatterns.ACCOUNT_NUMBER, sms_text, folded)
+            if account_match:
+                result["account"]["type"] = AccountType.ACCOUNT
+                result["account"]["number"] = account_match.group(1).replace("*", "").replace("XX", "")
     
     # Extract balance
-    balance_match = SMSPatterns.AVAILABLE_BALANCE.search(sms_text)
+    balance_match = _search(SMSPatterns.AVAILABLE_BALANCE, sms_text, folded)
     if balance_match:
         result["balance"]["available"] = balance_match.group(1).replace(",", "")
     
-    outstanding_match = SMSPatterns.OUTSTANDING.search(sms_text)
+    outstanding_match = _search(SMSPatterns.OUTSTANDING, sms_text, folded)
     if outstanding_match:
         result["balance"]["outstanding"] = outstanding_match.group(1).replace(",", "")
     
     # Extract reference number
-    ref_match = SMSPatterns.REFERENCE.search(sms_text)
+    ref_match = _search(SMSPatterns.REFERENCE, sms_text, folded)
     if ref_match:
         result["transaction"]["referenceNo"] = ref_match.group(1)
     
     # Extract merchant (try multiple patterns)
-    merchant = None
-    for pattern in [SMSPatterns.MERCHANT_AT, SMSPatterns.MERCHANT_TO, SMSPatterns.MERCHANT_VIA]:
-        merchant_match = pattern.search(sms_text)
+    for pattern in MERCHANT_PATTERNS:
+        merchant_match = _search(pattern, sms_text, folded)
         if merchant_match:
-            merchant = merchant_match.group(1).strip()
-            # Clean up merchant name
-            merchant = re.sub(r'\s+', ' ', merchant)  # Normalize whitespace
-            merchant = merchant.rstrip('.-,')  # Remove trailing punctuation
+            # Clean up merchant name: normalize whitespace, drop trailing punctuation
+            merchant = WHITESPACE.sub(" ", merchant_match.group(1).strip()).rstrip(".-,")
             
             # Validate merchant name (must be at least 3 chars and not a phone number)
-            if len(merchant) > 2 and not merchant.isdigit() and not re.match(r'^\d+$', merchant):
+            if len(merchant) > 2 and not merchant.isdigit():
                 result["transaction"]["merchant"] = merchant
                 break
     
     # Extract date
-    date_match = SMSPatterns.DATE_2.search(sms_text) or SMSPatterns.DATE_1.search(sms_text)
+    date_match = _search(SMSPatterns.DATE_2, sms_text, folded) or _search(SMSPatterns.DATE_1, sms_text, folded)
     if date_match:
-        date_str = date_match.group(1)
-        try:
-            if "-" in date_str or "/" in date_str:
-                # Format: 05-02-19 or 05/02/19
-                for fmt in ["%d-%m-%y", "%d/%m/%y", "%d-%m-%Y", "%d/%m/%Y"]:
-                    try:
-                        parsed = datetime.strptime(date_str, fmt)
-                        result["date"] = parsed.date().isoformat()
-                        break
-                    except:
-                        continue
-            else:
-                # Format: 17Nov25
-                if len(date_str) > 7:
-                    parsed = datetime.strptime(date_str, "%d%b%Y")
-                else:
-                    parsed = datetime.strptime(date_str, "%d%b%y")
-                result["date"] = parsed.date().isoformat()
-        except:
-            pass
+        result["date"] = normalize_sms_date(date_match.group(1))
     
     # Extract bank code
     if not result["bank"]:
-        bank_match = SMSPatterns.BANK_CODE.search(sms_text)
+        bank_match = _search(SMSPatterns.BANK_CODE, sms_text, folded)
         if bank_match:
             result["bank"] = bank_match.group(1)
     
     return result
 
 
-def parse_sms_block(sms_text: str) -> Tuple[List[Dict], List[str]]:
+def _from_template(template: SMSTemplate, fields: Dict[str, Optional[str]]) -> Dict:
+    """Result dict (same shape as the generic path) from a template's named groups."""
+    merchant = fields.get("merchant")
+    if merchant:
+        merchant = WHITESPACE.sub(" ", merchant.strip()).rstrip(".-,") or None
+    balance = fields.get("balance")
+    date = fields.get("date")
+    if date and any(c.isalpha() for c in date):
+        date = date.replace("-", "")  # 05-Feb-19 -> 05Feb19
+    return {
+        "account": {
+            "type": AccountType.ACCOUNT,
+            "number": fields.get("account"),
+        },
+        "balance": {
+            "available": balance.replace(",", "") if balance else None,
+            "outstanding": None,
+        },
+        "transaction": {
+            "type": "debit" if fields["type"].lower() == "debited" else "credit",
+            "amount": fields["amount"].replace(",", ""),
+            "referenceNo": fields.get("ref"),
+            "merchant": merchant,
+        },
+        "date": normalize_sms_date(date) if date else None,
+        "bank": template.bank,
+    }
+
+
+def iter_sms_lines(lines: Iterable[str]) -> Iterator[Tuple[Optional[Dict], str]]:
     """
-    Parse SMS block into structured transactions.
-    Now includes: amount, type, date, ref, merchant, account, balance, bank.
+    Parse SMS lines one at a time.
+
+    Yields (transaction, line) for every line long enough to be considered;
+    transaction is None when the line is unparsed. Very short lines are skipped.
     """
-    transactions: List[Dict] = []
-    unparsed: List[str] = []
-    
-    for line in sms_text.splitlines():
+    for line in lines:
         line = line.strip()
         if not line or len(line) < 20:  # Skip very short lines
             continue
         
-        # Extract comprehensive info
-        info = extract_transaction_info(line)
+        # Extract comprehensive info; None when amount or type is missing
+        info = _extract(line, require_core=True)
         
-        # Check if we got minimum required fields
-        if info["transaction"]["amount"] and info["transaction"]["type"]:
-            transactions.append({
-                "date": info["date"] or "Unknown",
-                "amount": float(info["transaction"]["amount"]),
-                "direction": info["transaction"]["type"],
-                "ref": info["transaction"]["referenceNo"] or "N/A",
-                "merchant": info["transaction"]["merchant"] or "N/A",
-                "account_type": info["account"]["type"] or "UNKNOWN",
-                "account_number": info["account"]["number"] or "N/A",
-                "balance": info["balance"]["available"] or "N/A",
-                "bank": info["bank"] or "UNKNOWN",
-                "raw": line,
-            })
-        else:
+        if info is None:
+            yield None, line
+            continue
+        
+        merchant = info["transaction"]["merchant"] or "N/A"
+        match = resolve_merchant(merchant)
+        yield {
+            "date": info["date"] or "Unknown",
+            "amount": float(info["transaction"]["amount"]),
+            "direction": info["transaction"]["type"],
+            "ref": info["transaction"]["referenceNo"] or "N/A",
+            "merchant": merchant,
+            "merchant_id": match.merchant_id,
+            "category": match.category,
+            "account_type": info["account"]["type"] or "UNKNOWN",
+            "account_number": info["account"]["number"] or "N/A",
+            "balance": info["balance"]["available"] or "N/A",
+            "bank": info["bank"] or "UNKNOWN",
+            "raw": line,
+        }, line
+
+
+def parse_sms_block(sms_text: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse SMS block into structured transactions.
+    Now includes: amount, type, date, ref, merchant (with canonical merchant_id
+    and category), account, balance, bank.
+    """
+    transactions: List[Dict] = []
+    unparsed: List[str] = []
+    
+    for transaction, line in iter_sms_lines(sms_text.splitlines()):
+        if transaction is None:
             unparsed.append(line)
+        else:
+            transactions.append(transaction)
     
     return transactions, unparsed
 
 
-def compute_financial_metrics(transactions: List[Dict]) -> Dict:
+def compute_financial_metrics(transactions: List[Dict], window_months: int = DEFAULT_WINDOW_MONTHS) -> Dict:
     inflow = sum(t["amount"] for t in transactions if t["direction"] == "credit")
     outflow = sum(t["amount"] for t in transactions if t["direction"] == "debit")
+    return metrics_from_totals(inflow, outflow, record_flows(transactions).volatility(window_months))
+
+
+def metrics_from_totals(inflow: float, outflow: float, volatility: Optional[float] = None) -> Dict:
+    """Financial metrics from credit/debit totals and (if known) monthly volatility."""
     savings_rate = (inflow - outflow) / inflow if inflow else 0
-    volatility = 0.3  # placeholder heuristics
+    if volatility is None:
+        volatility = 0.3  # placeholder until two months of dated history exist
     health_score = max(0, min(100, int(70 + (savings_rate - volatility) * 30)))
     return {
         "monthly_summary": {"inflow": round(inflow, 2), "outflow": round(outflow, 2), "volatility": round(volatility, 2)},
@@ -205,4 +313,3 @@ def compute_financial_metrics(transactions: List[Dict]) -> Dict:
             "Automate savings to improve stability.",
         ],
     }
-
@@ -0,0 +1,138 @@
+"""
+Streaming SMS ingestion for Finance360.
+
+StreamingSMSAggregator accepts an SMS export in arbitrary byte chunks (plain
+text, one SMS per line, or NDJSON records), parses every complete line as soon
+as it arrives and folds it into running inflow/outflow totals and per-month
+sums. Memory grows with the number of calendar months, not the number of SMS,
+unless the caller asks to keep the parsed transactions.
+"""
+
+import codecs
+import json
+from typing import Dict, List, Union
+
+from .sms_parser import iter_sms_lines, metrics_from_totals
+from .feature_builder import DEFAULT_WINDOW_MONTHS, MonthlyFlows, features_from_flows
+from .merchant_index import get_merchant_index, spend_summary
+
+MAX_UNPARSED_SAMPLES = 100  # Unparsed lines echoed back in the final response
+
+MAX_LINE_CHARS = 1 << 20  # Longest line (or NDJSON record) buffered while waiting for its line break
+
+# Characters str.splitlines() treats as line boundaries in plain-text mode; NDJSON records end at "\n" only
+LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+class StreamingSMSAggregator:
+    """Incremental parser + running aggregates for one user's SMS stream."""
+
+    def __init__(self, ndjson: bool = False, keep_transactions: bool = False,
+                 max_unparsed: int = MAX_UNPARSED_SAMPLES, window_months: int = DEFAULT_WINDOW_MONTHS):
+        self.ndjson = ndjson
+        self.keep_transactions = keep_transactions
+        self.max_unparsed = max_unparsed
+        self.window_months = window_months
+
+        self.inflow = 0.0
+        self.outflow = 0.0
+        self.transaction_count = 0
+        self.month_sums: Dict[int, List[float]] = {}  # Months since 1970-01 -> [inflow, outflow]
+        self.category_spend: Dict[str, float] = {}
+        self.merchant_spend: Dict[int, List] = {}  # merchant_id -> [name, category, spend, count]
+        self.unparsed_count = 0
+        self.transactions: List[Dict] = []
+        self.unparsed: List[str] = []
+
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""  # Trailing partial line carried over to the next chunk
+
+    def feed(self, data: Union[bytes, str]) -> None:
+        """
+        Consume the next chunk of the upload; only complete lines are parsed.
+
+        Raises ValueError for an invalid NDJSON record or a line longer than
+        MAX_LINE_CHARS.
+        """
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        if self.ndjson:
+            # JSON strings may contain raw U+2028/U+2029, which splitlines() would break on
+            lines = (self._pending + text).split("\n")
+            self._pending = lines.pop()
+        else:
+            lines = (self._pending + text).splitlines(keepends=True)
+            self._pending = ""
+            if lines and lines[-1][-1] not in LINE_BREAKS:
+                self._pending = lines.pop()
+        if len(self._pending) > MAX_LINE_CHARS:
+            raise ValueError(f"Line longer than {MAX_LINE_CHARS} characters without a line break")
+        self._consume(lines)
+
+    def close(self) -> None:
+        """Flush the decoder and any final line without a trailing newline."""
+        tail = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if tail:
+            self._consume([tail])
+
+    def _consume(self, records: List[str]) -> None:
+        if self.ndjson:
+            records = [sms for record in records if record.strip() for sms in self._ndjson_lines(record)]
+        for transaction, line in iter_sms_lines(records):
+            if transaction is None:
+                self.unparsed_count += 1
+                if len(self.unparsed) < self.max_unparsed:
+                    self.unparsed.append(line)
+                continue
+            self.transaction_count += 1
+            column = 0 if transaction["direction"] == "credit" else 1
+            if column == 0:
+                self.inflow += transaction["amount"]
+            else:
+                self.outflow += transaction["amount"]
+                self._add_spend(transaction)
+            date = transaction["date"]
+            if date != "Unknown":
+                month = (int(date[:4]) - 1970) * 12 + int(date[5:7]) - 1
+                self.month_sums.setdefault(month, [0.0, 0.0])[column] += transaction["amount"]
+            if self.keep_transactions:
+                self.transactions.append(transaction)
+
+    def _add_spend(self, transaction: Dict) -> None:
+        category = transaction["category"]
+        self.category_spend[category] = self.category_spend.get(category, 0.0) + transaction["amount"]
+        row = self.merchant_spend.get(transaction["merchant_id"])
+        if row is None:
+            match = get_merchant_index().merchants.get(transaction["merchant_id"])
+            name = match.name if match else transaction["merchant"]
+            row = self.merchant_spend[transaction["merchant_id"]] = [name, category, 0.0, 0]
+        row[2] += transaction["amount"]
+        row[3] += 1
+
+    @staticmethod
+    def _ndjson_lines(record: str) -> List[str]:
+        """An NDJSON record is a JSON string or an object with an "sms"/"sms_text" field."""
+        try:
+            value = json.loads(record)
+        except ValueError as e:
+            raise ValueError(f"Invalid NDJSON record: {e}") from e
+        if isinstance(value, dict):
+            value = value.get("sms") or value.get("sms_text") or ""
+        return str(value).splitlines()
+
+    def result(self) -> Dict:
+        """Finance360Response fields for everything consumed so far."""
+        flows = MonthlyFlows.from_month_sums(self.month_sums)
+        metrics = metrics_from_totals(self.inflow, self.outflow, flows.volatility(self.window_months))
+        return {
+            "transactions": self.transactions,
+            "monthly_summary": metrics["monthly_summary"],
+            "financial_health_score": metrics["financial_health_score"],
+            "nudges": metrics["nudges"],
+            "unparsed_transactions": self.unparsed,
+            "derived_features": features_from_flows(self.inflow, self.outflow, flows, self.window_months),
+            "spend_summary": spend_summary(
+                self.category_spend,
+                [(merchant_id, *row) for merchant_id, row in self.merchant_spend.items()],
+            ),
+        }
@@ -0,0 +1,210 @@
+"""
+Bank-specific SMS templates.
+
+The generic SMSPatterns path runs a dozen searches per line and still misses
+fields on well-known bank formats (e.g. "05-Feb-19" dates, SBI's amount
+without "Rs"). Each SMSTemplate is one anchored regex with named groups for a
+single sender's format, so a matching line is extracted in one pass.
+
+TemplateRegistry picks at most one template per line with a cheap classifier:
+
+1. Sender code: the trailing "-SBI"/"-HDFCBK" signature (what BANK_CODE detects)
+   narrows the candidates to that bank's templates
+2. Markers: case-folded substrings that must all be present in the message
+
+If no template is picked, or the picked template's regex does not match, the
+caller falls back to the generic path. Hits and misses are counted per template.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+AMOUNT = r"(?:Rs\.?|INR|₹)\s?(?P<amount>[0-9,]+(?:\.\d{1,2})?)"
+BALANCE = r"(?:Rs\.?|INR|₹)\s?(?P<balance>[0-9,]+(?:\.\d{1,2})?)"
+TYPE = r"(?P<type>debited|credited)"
+
+SENDER_CODE = re.compile(r"-\s?([A-Za-z][A-Za-z ]{1,19})\s*$")
+NON_LETTERS = re.compile(r"[^A-Z]+")
+
+
+@dataclass(frozen=True)
+class SMSTemplate:
+    """
+    One sender format. ``pattern`` may define the groups amount, type, account,
+    date, merchant, balance and ref; type is "debited"/"credited".
+    """
+
+    name: str
+    bank: str
+    senders: Tuple[str, ...]  # Normalized sender codes (uppercase letters only)
+    markers: Tuple[str, ...]  # Case-folded substrings that must all be present
+    pattern: re.Pattern
+
+
+TEMPLATES: List[SMSTemplate] = [
+    # Rs.150.00 debited from A/c **1234 on 05-Feb-19 at 07:27:11. Avl Bal- Rs.2343.23. Not you? ...
+    SMSTemplate(
+        name="axis_account",
+        bank="AXIS",
+        senders=("AXISBK", "AXISBANK", "AXIS"),
+        markers=("from a/c **", "avl bal-"),
+        pattern=re.compile(
+            rf"{AMOUNT} {TYPE} (?:from|to) A/c \*\*(?P<account>\d{{4}}) "
+            r"on (?P<date>\d{1,2}-[A-Za-z]{3}-\d{2,4}) at \d{1,2}:\d{2}(?::\d{2})?\. "
+            rf"Avl Bal- {BALANCE}",
+            re.IGNORECASE,
+        ),
+    ),
+    # INR 500.00 debited from A/c **4770 on 08-05-19 at Swiggy. Avl bal: INR 12345.50. Not you? ...
+    SMSTemplate(
+        name="hdfc_account",
+        bank="HDFC",
+        senders=("HDFCBK", "HDFCBANK", "HDFC"),
+        markers=("from a/c **", "avl bal:"),
+        pattern=re.compile(
+            rf"{AMOUNT} {TYPE} (?:from|to) A/c \*\*(?P<account>\d{{4}}) "
+            r"on (?P<date>\d{1,2}-\d{1,2}-\d{2,4}) at (?P<merchant>[A-Za-z][^.]*?)\. "
+            rf"Avl bal: {BALANCE}",
+            re.IGNORECASE,
+        ),
+    ),
+    # Rs.2000.00 debited from A/c no. XX3423 on 05-02-19 07:27:11 IST at ECS PAY. Avl Bal- INR 2343.23.
+    SMSTemplate(
+        name="icici_account",
+        bank="ICICI",
+        senders=("ICICIB", "ICICIBANK", "ICICI"),
+        markers=("a/c no. xx", " ist at "),
+        pattern=re.compile(
+            rf"{AMOUNT} {TYPE} (?:from|to) A/c no\. XX(?P<account>\d{{4}}) "
+            r"on (?P<date>\d{1,2}-\d{1,2}-\d{2,4}) \d{1,2}:\d{2}:\d{2} IST at (?P<merchant>[A-Za-z][^.]*?)\. "
+            rf"Avl Bal- {BALANCE}",
+            re.IGNORECASE,
+        ),
+    ),
+    # ICICI Bank Acct XX123 debited for Rs 500.00 on 05-Jun-24; SWIGGY credited. UPI:412345678901. ...
+    SMSTemplate(
+        name="icici_upi",
+        bank="ICICI",
+        senders=("ICICIB", "ICICIBANK", "ICICI"),
+        markers=("icici bank acct xx", "upi:"),
+        pattern=re.compile(
+            rf"ICICI Bank Acct XX(?P<account>\d{{3,4}}) {TYPE} for {AMOUNT} "
+            r"on (?P<date>\d{1,2}-[A-Za-z]{3}-\d{2,4}); (?P<merchant>[A-Za-z][^;]*?) (?:credited|debited)\. "
+            r"UPI:(?P<ref>\d+)",
+            re.IGNORECASE,
+        ),
+    ),
+    # Your A/c XX6789 is debited with Rs.5000.00 on 15-Nov-19. Info: NEFT-N123456789. Avl Bal: Rs.45678.90
+    SMSTemplate(
+        name="sbi_account",
+        bank="SBI",
+        senders=("SBI", "SBIINB", "SBIPSG", "SBIBNK"),
+        markers=("your a/c xx", " with "),
+        pattern=re.compile(
+            rf"Your A/c XX(?P<account>\d{{4}}) is {TYPE} with {AMOUNT} "
+            r"on (?P<date>\d{1,2}-[A-Za-z]{3}-\d{2,4})\."
+            r"(?: Info: (?P<ref>[A-Za-z0-9-]+)\.)?"
+            rf"(?: Avl Bal: {BALANCE})?",
+            re.IGNORECASE,
+        ),
+    ),
+    # Dear UPI user A/C X1234 debited by 20.0 on date 10Jan24 trf to Mr ABC Refno 401012345678. ... -SBI
+    SMSTemplate(
+        name="sbi_upi",
+        bank="SBI",
+        senders=("SBI", "SBIUPI", "SBIINB", "SBIPSG"),
+        markers=("dear upi user", "refno"),
+        pattern=re.compile(
+            rf"Dear UPI user A/C X+(?P<account>\d{{4}}) {TYPE} by (?:(?:Rs\.?|INR|₹)\s?)?(?P<amount>[0-9,]+(?:\.\d{{1,2}})?) "
+            r"on date (?P<date>\d{1,2}[A-Za-z]{3}\d{2,4}) trf (?:to|from) (?P<merchant>[A-Za-z][A-Za-z0-9 .]*?) "
+            r"Refno (?P<ref>\d+)",
+            re.IGNORECASE,
+        ),
+    ),
+]
+
+
+def sender_code(sms_text: str) -> Optional[str]:
+    """Normalized trailing sender signature ("... -SBI" -> "SBI", "-Canara Bank" -> "CANARABANK")."""
+    if "-" not in sms_text[-24:]:
+        return None
+    match = SENDER_CODE.search(sms_text)
+    return NON_LETTERS.sub("", match.group(1).upper()) if match else None
+
+
+@dataclass
+class TemplateRegistry:
+    """Templates indexed by sender code, with per-template hit/miss counters."""
+
+    templates: List[SMSTemplate] = field(default_factory=lambda: list(TEMPLATES))
+    hits: Counter = field(default_factory=Counter)
+    misses: Counter = field(default_factory=Counter)  # Classified, but the template regex did not match
+    unclassified: int = 0
+
+    def __post_init__(self):
+        self._by_sender: Dict[str, List[SMSTemplate]] = {}
+        for template in self.templates:
+            for sender in template.senders:
+                self._by_sender.setdefault(sender, []).append(template)
+
+    def classify(self, sms_text: str, folded: str) -> Optional[SMSTemplate]:
+        """First candidate template whose markers all occur in the case-folded message."""
+        sender = sender_code(sms_text)
+        candidates = self._by_sender.get(sender, self.templates) if sender else self.templates
+        for template in candidates:
+            for marker in template.markers:
+                if marker not in folded:
+                    break
+            else:
+                return template
+        return None
+
+    def match(self, sms_text: str, folded: str) -> Optional[Tuple[SMSTemplate, Dict[str, Optional[str]]]]:
+        """(template, named groups) if a template extracts the message, else None."""
+        template = self.classify(sms_text, folded)
+        if template is None:
+            self.unclassified += 1
+            return None
+        match = template.pattern.match(sms_text)
+        if match is None:
+            self.misses[template.name] += 1
+            return None
+        self.hits[template.name] += 1
+        return template, match.groupdict()
+
+    def stats(self) -> Dict:
+        """Per-template hits, misses and hit rate, plus the number of lines left to the generic path."""
+        templates = {}
+        for template in self.templates:
+            hits, misses = self.hits[template.name], self.misses[template.name]
+            templates[template.name] = {
+                "bank": template.bank,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        total_hits = sum(self.hits.values())
+        seen = total_hits + sum(self.misses.values()) + self.unclassified
+        return {
+            "templates": templates,
+            "generic_fallbacks": seen - total_hits,
+            "coverage": round(total_hits / seen, 4) if seen else None,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits.clear()
+        self.misses.clear()
+        self.unclassified = 0
+
+
+_registry: Optional[TemplateRegistry] = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Get or create the process-wide registry."""
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry()
+    return _registry
@@ -0,0 +1,74 @@
+"""
+Sparse top-k retrieval over L2-normalized TF-IDF rows.
+
+cosine_similarity(query, matrix) re-normalizes every chunk row, scores every
+chunk, and the caller then argsorts all N scores to keep 5. TfidfVectorizer
+rows and queries are already unit length, so cosine is the plain dot product,
+and only chunks sharing a term with the query can score above zero.
+
+SparseRetriever keeps the matrix term-major: postings row t lists the chunks
+containing term t with their weights. The sparse product query @ postings
+(scipy's CSR x CSR kernel) walks only the postings of the query's own terms
+and yields scores for the chunks they touch; top-k is then an argpartition
+over those scores with only the k winners sorted. search_batch() does the same
+for a Q x V query matrix in one product. from_postings() wraps an existing
+term-major matrix (e.g. memory-mapped arrays) without copying it.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores, best first."""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class SparseRetriever:
+    """Top-k dot-product search over the rows of a sparse (chunks x terms) matrix."""
+
+    def __init__(self, matrix, dtype=np.float64):
+        matrix = sparse.csr_matrix(matrix, dtype=dtype)
+        self.n_docs, self.n_terms = matrix.shape
+        self.postings = matrix.T.tocsr()  # terms x chunks; each row sorted by chunk id
+        self.postings.sort_indices()
+
+    @classmethod
+    def from_postings(cls, postings) -> "SparseRetriever":
+        """Retriever over a terms x chunks CSR matrix with sorted indices, used as is."""
+        retriever = cls.__new__(cls)
+        retriever.n_terms, retriever.n_docs = postings.shape
+        retriever.postings = postings
+        return retriever
+
+    def search(self, query, k: int, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, scores) of the k best chunks scoring above min_score, best first."""
+        return self.search_batch(query, k, min_score)[0]
+
+    def search_batch(
+        self, queries, k: int, min_score: float = 0.0, deleted: Optional[np.ndarray] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        search() for every row of a Q x V query matrix, using one sparse matrix
+        product. Chunks flagged in the deleted mask are never returned.
+        """
+        product = sparse.csr_matrix(queries) @ self.postings
+        results = []
+        for row in range(product.shape[0]):
+            start, end = product.indptr[row], product.indptr[row + 1]
+            ids, scores = product.indices[start:end], product.data[start:end]
+            keep = scores > min_score
+            if deleted is not None:
+                keep &= ~deleted[ids]
+            ids, scores = ids[keep], scores[keep]
+            best = top_k(scores, k)
+            results.append((ids[best].astype(np.intp), scores[best]))
+        return results
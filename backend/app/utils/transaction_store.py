@@ -0,0 +1,171 @@
+"""
+Columnar transaction store for the Finance360 pipeline.
+
+parse_sms_block returns one dict per transaction; for long histories that is
+several hundred bytes of Python objects per row, and every metric re-walks the
+dicts. TransactionColumns keeps the same data as NumPy arrays (amount, date,
+direction code) plus interned categorical codes for merchant/bank/account
+columns, so aggregates are vectorized. Convert back to the JSON shape with
+to_records() only at the API boundary.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .feature_builder import MonthlyFlows
+from .merchant_index import get_merchant_index, spend_summary
+from .sms_parser import iter_sms_lines
+
+DEBIT = 0
+CREDIT = 1
+DIRECTIONS = ("debit", "credit")  # Indexed by direction code
+
+CATEGORICAL_COLUMNS = ("merchant", "category", "bank", "account_type", "account_number")
+UNKNOWN_DATE = "Unknown"
+
+
+class _Interner:
+    """Maps repeated values to dense int32 codes."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+@dataclass
+class TransactionColumns:
+    """Column-oriented transactions; row i of every column is one transaction."""
+
+    amount: np.ndarray  # float64
+    date: np.ndarray  # datetime64[D], NaT where the SMS date was not parsed
+    direction: np.ndarray  # int8, DEBIT / CREDIT
+    merchant_id: np.ndarray  # int64 canonical merchant ids (see merchant_index)
+    codes: Dict[str, np.ndarray]  # int32 codes per CATEGORICAL_COLUMNS entry
+    categories: Dict[str, List[Any]]  # code -> value per CATEGORICAL_COLUMNS entry
+    ref: List[str] = field(default_factory=list)
+    balance: List[str] = field(default_factory=list)
+    raw: Optional[List[str]] = None  # Dropped when built with keep_raw=False
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    @classmethod
+    def from_records(cls, transactions: Iterable[Dict], keep_raw: bool = True) -> "TransactionColumns":
+        """Build columns from parse_sms_block-style dicts (consumed one at a time)."""
+        amounts: List[float] = []
+        dates: List[str] = []
+        directions: List[int] = []
+        merchant_ids: List[int] = []
+        refs: List[str] = []
+        balances: List[str] = []
+        raws: List[str] = []
+        interners = {name: _Interner() for name in CATEGORICAL_COLUMNS}
+        codes: Dict[str, List[int]] = {name: [] for name in CATEGORICAL_COLUMNS}
+
+        for t in transactions:
+            amounts.append(t["amount"])
+            dates.append("NaT" if t["date"] == UNKNOWN_DATE else t["date"])
+            directions.append(CREDIT if t["direction"] == "credit" else DEBIT)
+            merchant_ids.append(t["merchant_id"])
+            refs.append(t["ref"])
+            balances.append(t["balance"])
+            for name in CATEGORICAL_COLUMNS:
+                codes[name].append(interners[name].code(t[name]))
+            if keep_raw:
+                raws.append(t["raw"])
+
+        return cls(
+            amount=np.array(amounts, dtype=np.float64),
+            date=np.array(dates, dtype="datetime64[D]"),
+            direction=np.array(directions, dtype=np.int8),
+            merchant_id=np.array(merchant_ids, dtype=np.int64),
+            codes={name: np.array(values, dtype=np.int32) for name, values in codes.items()},
+            categories={name: interner.values for name, interner in interners.items()},
+            ref=refs,
+            balance=balances,
+            raw=raws if keep_raw else None,
+        )
+
+    def totals(self) -> Tuple[float, float]:
+        """(inflow, outflow) summed over credit and debit rows."""
+        credit = self.direction == CREDIT
+        return float(self.amount[credit].sum()), float(self.amount[~credit].sum())
+
+    def monthly_flows(self) -> MonthlyFlows:
+        """Per-calendar-month inflow/outflow buckets."""
+        return MonthlyFlows.from_arrays(self.date, self.amount, self.direction == CREDIT)
+
+    def spend_summary(self, top_n: int = 5) -> Dict:
+        """Debit spend per category and top merchants, grouped on integer codes."""
+        debit = self.direction == DEBIT
+        amounts = self.amount[debit]
+        category_codes = self.codes["category"][debit]
+        by_category = np.bincount(category_codes, weights=amounts, minlength=len(self.categories["category"]))
+        merchant_ids, first, inverse, counts = np.unique(
+            self.merchant_id[debit], return_index=True, return_inverse=True, return_counts=True
+        )
+        spend = np.bincount(inverse, weights=amounts, minlength=len(merchant_ids))
+        known = get_merchant_index().merchants
+        merchant_codes = self.codes["merchant"][debit]
+        rows = []
+        for merchant_id, row, total, count in zip(merchant_ids.tolist(), first.tolist(), spend.tolist(), counts.tolist()):
+            match = known.get(merchant_id)
+            name = match.name if match else self.categories["merchant"][merchant_codes[row]]
+            rows.append((merchant_id, name, self.categories["category"][category_codes[row]], total, count))
+        categories = {
+            category: total
+            for category, total in zip(self.categories["category"], by_category.tolist())
+            if total
+        }
+        return spend_summary(categories, rows, top_n)
+
+    def to_records(self) -> List[Dict]:
+        """Transactions in the parse_sms_block JSON shape."""
+        dates = [UNKNOWN_DATE if d == "NaT" else d for d in np.datetime_as_string(self.date, unit="D")]
+        columns = {
+            name: [self.categories[name][code] for code in self.codes[name].tolist()]
+            for name in CATEGORICAL_COLUMNS
+        }
+        raws = self.raw if self.raw is not None else [None] * len(self)
+        return [
+            {
+                "date": dates[i],
+                "amount": amount,
+                "direction": DIRECTIONS[direction],
+                "ref": self.ref[i],
+                "merchant": columns["merchant"][i],
+                "merchant_id": merchant_id,
+                "category": columns["category"][i],
+                "account_type": columns["account_type"][i],
+                "account_number": columns["account_number"][i],
+                "balance": self.balance[i],
+                "bank": columns["bank"][i],
+                "raw": raws[i],
+            }
+            for i, (amount, direction, merchant_id) in enumerate(
+                zip(self.amount.tolist(), self.direction.tolist(), self.merchant_id.tolist())
+            )
+        ]
+
+
+def parse_sms_columns(sms_text: str, keep_raw: bool = True) -> Tuple[TransactionColumns, List[str]]:
+    """Columnar counterpart of parse_sms_block: (columns, unparsed lines)."""
+    unparsed: List[str] = []
+
+    def parsed():
+        for transaction, line in iter_sms_lines(sms_text.splitlines()):
+            if transaction is None:
+                unparsed.append(line)
+            else:
+                yield transaction
+
+    return TransactionColumns.from_records(parsed(), keep_raw=keep_raw), unparsed
@@ -0,0 +1,180 @@
+"""
+Benchmark FairScore inference: xgboost vs. the NumPy tree engine.
+
+Usage (from backend/):
+    python benchmarks/bench_fairscore.py [--users 2000]
+
+Uses the LATEST model artifact (or legacy pickles) if present, otherwise fits
+a model in memory with the train_fairscore settings (nothing is written to
+disk); the tree engine is exported from that model.
+
+1. Checks the engine against xgboost: predictions match to 1e-5, TreeSHAP
+   contributions to 1e-4, and contributions + bias equal the prediction
+2. Reports microseconds per explained score for the original leave-one-out
+   explainer (N+2 booster calls per user), xgboost TreeSHAP and the engine
+3. Single-request and batch scoring: sklearn scaler + xgboost predict vs. engine
+4. Score cache: explained single requests on a cold cache (miss) and repeated
+   (hit); the sections above run with the cache disabled
+"""
+
+import argparse
+import pickle
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models import artifacts, fairscore_model
+from app.models.fairscore_model import FEATURE_ORDER, FairScoreModel, feature_matrix
+from app.models.score_cache import ScoreCache
+
+NO_CACHE = dict(cache=ScoreCache(max_entries=0))
+
+
+def load_model() -> FairScoreModel:
+    if artifacts.latest_version() is not None:
+        return FairScoreModel(*artifacts.load_xgboost(), **NO_CACHE)
+    if fairscore_model.MODEL_PATH.exists() and fairscore_model.SCALER_PATH.exists():
+        with open(fairscore_model.MODEL_PATH, "rb") as f:
+            model = pickle.load(f)
+        with open(fairscore_model.SCALER_PATH, "rb") as f:
+            scaler = pickle.load(f)
+        return FairScoreModel(model=model, scaler=scaler, **NO_CACHE)
+
+    import pandas as pd
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+    from app.models import train_fairscore
+
+    df = pd.read_csv(train_fairscore.DATASET_PATH)
+    scaler = StandardScaler().fit(df[train_fairscore.FEATURE_COLS].to_numpy())
+    model = xgb.XGBRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42)
+    model.fit(scaler.transform(df[train_fairscore.FEATURE_COLS].to_numpy()), df[train_fairscore.TARGET_COL])
+    return FairScoreModel(model=model, scaler=scaler, **NO_CACHE)
+
+
+def random_users(n: int, seed: int = 7) -> List[Dict[str, float]]:
+    rng = random.Random(seed)
+    users = []
+    for _ in range(n):
+        inflow = rng.uniform(8000, 100000)
+        users.append({
+            "avg_monthly_inflow": inflow,
+            "avg_monthly_outflow": inflow * rng.uniform(0.5, 1.1),
+            "savings_rate": rng.uniform(0.05, 0.35),
+            "volatility": rng.uniform(0.1, 0.6),
+            "academic_score": round(rng.uniform(6.0, 9.8), 1),
+            "part_time_income": rng.choice([0, 0, rng.randint(2000, 15000)]),
+            "emi_count": rng.randint(0, 4),
+        })
+    return users
+
+
+def reference_leave_one_out(fs: FairScoreModel, features: Dict[str, float]) -> List[Dict]:
+    """Previous explainer: one predict for the score, one baseline, one per non-zero feature."""
+    vec = np.array([[features.get(f, 0) for f in FEATURE_ORDER]])
+    scaled = fs.scaler.transform(vec)
+    score = max(0, min(100, int(fs.model.predict(scaled)[0])))
+    fs.model.predict(fs.scaler.transform(np.zeros((1, len(FEATURE_ORDER)))))
+    contributions = []
+    for i, name in enumerate(FEATURE_ORDER):
+        if features.get(name, 0) != 0:
+            without = scaled.copy()
+            without[0, i] = 0
+            contributions.append({"feature": name, "contribution": round(score - fs.model.predict(without)[0], 2)})
+    contributions.sort(key=lambda c: abs(c["contribution"]), reverse=True)
+    return contributions[:3]
+
+
+def xgboost_score(fs: FairScoreModel, features: Dict[str, float]) -> int:
+    """Per-request scoring through sklearn's scaler and the xgboost wrapper."""
+    vec = np.array([[features.get(f, 0) for f in FEATURE_ORDER]])
+    return max(0, min(100, int(fs.model.predict(fs.scaler.transform(vec))[0])))
+
+
+def xgboost_contributions(fs: FairScoreModel, matrix: np.ndarray) -> np.ndarray:
+    from xgboost import DMatrix
+
+    return fs.model.get_booster().predict(DMatrix(fs.scaler.transform(matrix)), pred_contribs=True)
+
+
+def us_per_call(fn, repeat: int = 2000) -> float:
+    fn()  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def us_per_user(fn, n_users: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n_users * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=UserWarning)  # sklearn feature-name warnings
+    warnings.filterwarnings("ignore", category=FutureWarning)  # xgboost/pandas deprecations
+
+    fs = load_model()
+    users = random_users(args.users)
+    normalized = [fairscore_model.normalize_features(u) for u in users]
+
+    matrix = feature_matrix(users)
+    engine = fs.engine
+    predict_error = np.abs(engine.predict(matrix) - fs.model.predict(fs.scaler.transform(matrix))).max()
+    shap_error = np.abs(fs.shap_values(matrix) - xgboost_contributions(fs, matrix)).max()
+    additivity_error = np.abs(fs.shap_values(matrix).sum(axis=1) - engine.predict(matrix)).max()
+    if predict_error > 1e-5 or shap_error > 1e-4 or additivity_error > 1e-3:
+        raise SystemExit(f"Tree engine mismatch: predict {predict_error:.2e}, TreeSHAP {shap_error:.2e}, "
+                         f"additivity {additivity_error:.2e}")
+    print(f"[OK] Engine vs xgboost: predict {predict_error:.1e}, TreeSHAP {shap_error:.1e}, "
+          f"additivity {additivity_error:.1e}")
+
+    single_users = normalized[: min(200, len(users))]
+    loo = us_per_user(lambda: [reference_leave_one_out(fs, u) for u in single_users], len(single_users))
+    xgb_single = us_per_user(lambda: [xgboost_contributions(fs, matrix[i:i + 1]) for i in range(len(single_users))],
+                             len(single_users))
+    xgb_batch = us_per_user(lambda: xgboost_contributions(fs, matrix), len(users))
+    engine_single = us_per_user(lambda: [fs.predict(u) for u in single_users], len(single_users))
+    engine_batch = us_per_user(lambda: fs.predict_batch(users), len(users))
+    print("Explained scores (us per user):")
+    print(f"  leave-one-out, single:        {loo:10,.1f}")
+    print(f"  xgboost TreeSHAP, single:     {xgb_single:10,.1f}  (contributions only)")
+    print(f"  xgboost TreeSHAP, batch:      {xgb_batch:10,.1f}  (contributions only)")
+    print(f"  engine predict, single:       {engine_single:10,.1f}")
+    print(f"  engine predict_batch:         {engine_batch:10,.1f}  ({args.users:,} users)")
+
+    user, row = normalized[0], matrix[:1]
+    if [xgboost_score(fs, u) for u in normalized] != [r.score for r in fs.predict_batch(users, explain=False)]:
+        raise SystemExit("Tree engine changed scores")
+    print("Scores only (us per user):")
+    print(f"  xgboost request path, single: {us_per_call(lambda: xgboost_score(fs, user)):10,.1f}")
+    print(f"  engine predict, single:       {us_per_call(lambda: engine.predict(row)):10,.1f}")
+    print(f"  predict_batch, single:        {us_per_call(lambda: fs.predict_batch(users[:1], explain=False)):10,.1f}")
+    print(f"  xgboost predict, batch:       "
+          f"{us_per_user(lambda: fs.model.predict(fs.scaler.transform(matrix)), len(users)):10,.1f}")
+    print(f"  engine predict, batch:        {us_per_user(lambda: engine.predict(matrix), len(users)):10,.1f}")
+
+    cached = FairScoreModel(model=fs.model, scaler=fs.scaler, cache=ScoreCache(max_entries=len(users)))
+    miss = us_per_user(lambda: [cached.predict(u) for u in normalized], len(users))  # Cold cache
+    hit = us_per_user(lambda: [cached.predict(u) for u in normalized], len(users))
+    changed = sum(a.score != b.score for a, b in zip(fs.predict_batch(users), [cached.predict(u) for u in normalized]))
+    print("Score cache, explained single (us per user):")
+    print(f"  miss (key + score):           {miss:10,.1f}")
+    print(f"  hit:                          {hit:10,.1f}")
+    print(f"  scores changed by the cache:  {changed:10,d} of {len(users):,}")
+    print(f"  {cached.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the local RAG extraction pipeline (rag_pipeline.extract_chunks).
+
+Usage (from backend/):
+    python benchmarks/bench_rag_ingest.py [--copies 5] [--workers 1 2 4 8]
+
+The corpus is every PDF/DOCX in data/contracts linked --copies times into a
+temporary directory. Each --workers value extracts and chunks the whole
+corpus once (workers=1: in a thread, no process pool) into a consumer that
+only counts records, and reports per-stage figures from PipelineStats:
+pages/sec, worker utilization, queue full/empty seconds. Every run must
+produce the same chunks as the first.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.rag_pipeline import ChunkRecord, PipelineStats, extract_chunks
+
+CONTRACTS_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "contracts"
+
+
+def corpus(directory: Path, copies: int):
+    sources = sorted(CONTRACTS_DIR.glob("*.pdf")) + sorted(CONTRACTS_DIR.glob("*.docx"))
+    paths = []
+    for copy in range(copies):
+        for source in sources:
+            path = directory / f"{copy}_{source.name}"
+            os.symlink(source, path)
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--copies", type=int, default=5, help="Times each contract appears in the corpus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = corpus(Path(tmp), args.copies)
+        print(f"{len(paths)} files, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'pages':>7} {'chunks':>7} {'wall s':>8} {'pages/s':>9} {'busy':>6} "
+              f"{'queue full s':>13} {'queue empty s':>14}")
+        expected = None
+        for workers in dict.fromkeys(args.workers):
+            stats = PipelineStats()
+            chunks = sorted((record.path, record.page, record.chunk, len(record.text))
+                            for record in extract_chunks(paths, workers=workers, stats=stats)
+                            if isinstance(record, ChunkRecord))
+            if expected is None:
+                expected = chunks
+            elif chunks != expected:
+                raise SystemExit(f"workers={workers} produced different chunks")
+            report = stats.report()
+            print(f"{stats.workers:>8} {stats.pages:>7,} {stats.chunks:>7,} {stats.wall_seconds:>8.2f} "
+                  f"{report['extract']['pages_per_second']:>9.1f} {report['extract']['worker_utilization']:>6.0%} "
+                  f"{report['queue']['full_seconds']:>13.3f} {report['queue']['empty_seconds']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
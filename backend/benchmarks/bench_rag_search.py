@@ -0,0 +1,153 @@
+"""
+Benchmark local RAG top-k search: cosine_similarity + argsort vs. SparseRetriever and BM25.
+
+Usage (from backend/):
+    python benchmarks/bench_rag_search.py [--chunks 10000 100000 1000000] [--queries 200]
+
+Corpora are synthetic TF-IDF matrices shaped like SimpleFreeRAG's index:
+5000-term vocabulary (the vectorizer's max_features cap), Zipf-distributed term
+frequencies, ~--terms distinct terms per chunk, rows L2-normalized by
+TfidfTransformer. Queries are 2-6 terms drawn from the vocabulary's common
+half. Reports milliseconds per query for:
+
+1. Baseline: cosine_similarity(query, matrix) + np.argsort of all scores
+2. SparseRetriever.search: postings product + argpartition
+3. SparseRetriever.search_batch: one sparse product for all queries
+4. BM25Index MaxScore search on the same term counts
+
+and checks that 2 and 3 return the baseline's top-k scores and 4 the top-k of
+an exhaustive BM25 scoring.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.utils.bm25_index import BM25Index
+from app.utils.sparse_retrieval import SparseRetriever
+
+VOCABULARY = 5000
+TOP_K = 5
+
+
+def synthetic_corpus(n_chunks: int, terms_per_chunk: int, seed: int = 0):
+    """(chunks x VOCABULARY term counts, TF-IDF csr, fitted transformer) with Zipf term draws."""
+    rng = np.random.default_rng(seed)
+    probabilities = 1.0 / np.arange(1, VOCABULARY + 1)
+    probabilities /= probabilities.sum()
+    draws = int(terms_per_chunk * 1.6)  # Repeated draws merge, leaving ~terms_per_chunk distinct terms
+    blocks = []
+    for start in range(0, n_chunks, 100_000):
+        rows = min(100_000, n_chunks - start)
+        terms = rng.choice(VOCABULARY, size=(rows, draws), p=probabilities)
+        counts = sparse.csr_matrix(
+            (np.ones(terms.size, dtype=np.float64), terms.ravel(), np.arange(0, terms.size + 1, draws)),
+            shape=(rows, VOCABULARY),
+        )
+        counts.sum_duplicates()
+        blocks.append(counts)
+    counts = sparse.vstack(blocks, format="csr")
+    transformer = TfidfTransformer().fit(counts)
+    return counts, transformer.transform(counts).tocsr(), transformer
+
+
+def synthetic_queries(n_queries: int, seed: int = 1):
+    """Term id arrays, 2-6 distinct terms each."""
+    rng = np.random.default_rng(seed)
+    return [rng.choice(VOCABULARY // 2, size=rng.integers(2, 7), replace=False) for _ in range(n_queries)]
+
+
+def tfidf_queries(transformer, term_lists):
+    rows = [
+        sparse.csr_matrix((np.ones(len(terms)), (np.zeros(len(terms), dtype=int), terms)), shape=(1, VOCABULARY))
+        for terms in term_lists
+    ]
+    return transformer.transform(sparse.vstack(rows, format="csr")).tocsr()
+
+
+def bm25_exhaustive(index: BM25Index, terms, k: int):
+    """Score every chunk (no MaxScore) for the correctness check."""
+    weights = sparse.csr_matrix((index.weights.astype(np.float64), index.docs, index.indptr),
+                                shape=(index.n_terms, index.n_docs))
+    scores = np.asarray(weights[terms].sum(axis=0)).ravel()
+    top = np.argsort(-scores, kind="stable")[:k]
+    return scores[top[scores[top] > 0]]
+
+
+def baseline_search(matrix, query, k: int):
+    """The original SimpleFreeRAG.search ranking."""
+    similarities = cosine_similarity(query, matrix)[0]
+    top = np.argsort(similarities)[-k:][::-1]
+    return top, similarities[top]
+
+
+def ms_per_query(fn, n_queries: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n_queries * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--terms", type=int, default=60, help="Distinct terms per chunk")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--baseline-queries", type=int, default=20, help="The baseline is slow on large corpora")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>10} {'nnz':>12} {'build s':>8} {'baseline ms':>12} {'search ms':>10} {'batch ms':>9} "
+          f"{'speedup':>8} {'bm25 build s':>13} {'bm25 ms':>8}")
+    for n_chunks in args.chunks:
+        counts, matrix, transformer = synthetic_corpus(n_chunks, args.terms)
+        term_lists = synthetic_queries(args.queries)
+        queries = tfidf_queries(transformer, term_lists)
+
+        start = time.perf_counter()
+        retriever = SparseRetriever(matrix)
+        build = time.perf_counter() - start
+
+        n_baseline = min(args.baseline_queries, args.queries)
+        expected = []
+        baseline = ms_per_query(
+            lambda: expected.extend(baseline_search(matrix, queries[i], TOP_K)[1] for i in range(n_baseline)),
+            n_baseline,
+        )
+        single, batch = [], []
+        search = ms_per_query(
+            lambda: single.extend(retriever.search(queries[i], TOP_K)[1] for i in range(args.queries)),
+            args.queries,
+        )
+        batched = ms_per_query(lambda: batch.extend(s for _, s in retriever.search_batch(queries, TOP_K)), args.queries)
+
+        for want, got_single, got_batch in zip(expected, single, batch):
+            if not (np.allclose(want, got_single) and np.allclose(want, got_batch)):
+                raise SystemExit(f"Top-{TOP_K} scores differ from the baseline at {n_chunks:,} chunks")
+        del matrix, retriever
+
+        start = time.perf_counter()
+        bm25 = BM25Index({}, counts)
+        bm25_build = time.perf_counter() - start
+        del counts
+        found = []
+        bm25_ms = ms_per_query(
+            lambda: found.extend(bm25.search_terms(terms, None, TOP_K)[1] for terms in term_lists), args.queries
+        )
+        for terms, got in list(zip(term_lists, found))[:n_baseline]:
+            if not np.allclose(bm25_exhaustive(bm25, terms, TOP_K), got, rtol=1e-4):
+                raise SystemExit(f"BM25 MaxScore top-{TOP_K} differs from exhaustive scoring at {n_chunks:,} chunks")
+        print(f"{n_chunks:>10,} {len(bm25.docs):>12,} {build:>8.2f} {baseline:>12.2f} {search:>10.3f} {batched:>9.3f} "
+              f"{baseline / search:>7.0f}x {bm25_build:>13.2f} {bm25_ms:>8.3f}")
+        del bm25
+
+
+if __name__ == "__main__":
+    main()
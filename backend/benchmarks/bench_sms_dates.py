@@ -0,0 +1,112 @@
+"""
+Microbenchmark: SMS date normalization vs. the old strptime loop.
+
+Usage (from backend/):
+    python benchmarks/bench_sms_dates.py [--repeat 20]
+
+1. Checks normalize_sms_date against the strptime reference on every
+   DATE_1/DATE_2 shape over a grid of day/month/year values
+2. Times the reference, the uncached parser and the memoized parser on a
+   dump-like workload (a few hundred distinct dates, many repeats)
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import sms_dates
+from app.utils.sms_dates import normalize_sms_date
+
+MONTHS = ["Jan", "feb", "MAR", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec", "Foo"]
+
+
+def reference_normalize(date_str: str) -> Optional[str]:
+    """The date block extract_transaction_info used before sms_dates."""
+    result = None
+    try:
+        if "-" in date_str or "/" in date_str:
+            for fmt in ["%d-%m-%y", "%d/%m/%y", "%d-%m-%Y", "%d/%m/%Y"]:
+                try:
+                    parsed = datetime.strptime(date_str, fmt)
+                    result = parsed.date().isoformat()
+                    break
+                except:
+                    continue
+        else:
+            if len(date_str) > 7:
+                parsed = datetime.strptime(date_str, "%d%b%Y")
+            else:
+                parsed = datetime.strptime(date_str, "%d%b%y")
+            result = parsed.date().isoformat()
+    except:
+        pass
+    return result
+
+
+def shape_grid() -> List[str]:
+    days = ["0", "00", "1", "01", "9", "10", "28", "29", "30", "31", "32", "40", "99"]
+    months = ["0", "00", "1", "01", "2", "02", "9", "11", "12", "13"]
+    years = ["00", "19", "68", "69", "99", "000", "0000", "2019", "2024", "2100"]
+    grid = []
+    for day in days:
+        for year in years:
+            for month in months:
+                for first, second in [("-", "-"), ("/", "/"), ("-", "/"), ("/", "-")]:
+                    grid.append(f"{day}{first}{month}{second}{year}")
+            for name in MONTHS:
+                grid.append(f"{day}{name}{year}")
+    return grid
+
+
+def check_equivalence() -> None:
+    grid = shape_grid()
+    for date_str in grid:
+        expected = reference_normalize(date_str)
+        actual = sms_dates._parse_numeric(date_str) if ("-" in date_str or "/" in date_str) else sms_dates._parse_compact(date_str)
+        if expected != actual:
+            raise SystemExit(f"Mismatch for {date_str!r}: expected {expected}, got {actual}")
+    print(f"[OK] {len(grid)} date shapes identical to strptime reference")
+
+
+def timed(fn, workload: List[str]) -> float:
+    start = time.perf_counter()
+    for date_str in workload:
+        fn(date_str)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20, help="Repeats of each distinct date in the workload")
+    args = parser.parse_args()
+
+    check_equivalence()
+
+    rng = random.Random(42)
+    distinct = [f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.choice(['23', '24', '25'])}" for _ in range(150)]
+    distinct += [f"{rng.randint(1, 28)}{rng.choice(MONTHS[:12])}{rng.choice(['24', '2025'])}" for _ in range(150)]
+    workload = distinct * args.repeat
+    rng.shuffle(workload)
+
+    def uncached(date_str):
+        return sms_dates._parse_numeric(date_str) if ("-" in date_str or "/" in date_str) else sms_dates._parse_compact(date_str)
+
+    normalize_sms_date.cache_clear()
+    reference = timed(reference_normalize, workload)
+    plain = timed(uncached, workload)
+    memoized = timed(normalize_sms_date, workload)
+    n = len(workload)
+    print(f"strptime reference : {reference / n * 1e6:7.2f} us/date")
+    print(f"digit parser       : {plain / n * 1e6:7.2f} us/date ({reference / plain:.1f}x)")
+    print(f"digit parser + LRU : {memoized / n * 1e6:7.2f} us/date ({reference / memoized:.1f}x)")
+    print(f"LRU cache: {normalize_sms_date.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Benchmark the SMS extraction engine against the pre-prefilter implementation.
+
+Usage (from backend/):
+    python benchmarks/bench_sms_parser.py [--repeat 200]
+
+1. Checks that the generic extraction path and parse_sms_block give identical
+   output to the reference implementation on data/real_sms_examples.txt and
+   data/synthetic_sms_examples.txt (lines handled by a bank template excluded)
+2. Reports lines/sec for the reference and current parse_sms_block
+3. On bank-format lines, compares the generic path with the sender templates:
+   fields filled and lines/sec, plus per-template hit rates
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import sms_parser
+from app.utils.sms_parser import AccountType, SMSPatterns
+from app.utils.sms_templates import get_template_registry
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+SAMPLE_FILES = [
+    DATA_DIR / "real_sms_examples.txt",
+    DATA_DIR / "synthetic_sms_examples.txt",
+]
+
+# Common bank formats not in the sample files
+EXTRA_BANK_LINES = [
+    "ICICI Bank Acct XX123 debited for Rs 500.00 on 05-Jun-24; SWIGGY credited. UPI:412345678901. "
+    "Call 18002662 for dispute. SMS BLOCK 123 to 9215676766.",
+    "Dear UPI user A/C X1234 debited by 20.0 on date 10Jan24 trf to Mr ABC Refno 401012345678. "
+    "If not u? call 1800111109. -SBI",
+]
+
+
+def reference_extract_transaction_info(sms_text: str) -> Dict:
+    """Original extractor: every pattern searched on every line."""
+    result = {
+        "account": {"type": None, "number": None},
+        "balance": {"available": None, "outstanding": None},
+        "transaction": {"type": None, "amount": None, "referenceNo": None, "merchant": None},
+        "date": None,
+        "bank": None,
+    }
+
+    amount_match = SMSPatterns.AMOUNT.search(sms_text)
+    if amount_match:
+        result["transaction"]["amount"] = amount_match.group(1).replace(",", "")
+
+    if SMSPatterns.DEBIT.search(sms_text):
+        result["transaction"]["type"] = "debit"
+    elif SMSPatterns.CREDIT.search(sms_text):
+        result["transaction"]["type"] = "credit"
+
+    card_match = SMSPatterns.CARD_NUMBER.search(sms_text)
+    account_match = SMSPatterns.ACCOUNT_NUMBER.search(sms_text)
+    wallet_match = SMSPatterns.WALLET.search(sms_text)
+
+    if wallet_match:
+        result["account"]["type"] = AccountType.WALLET
+        result["account"]["number"] = None
+        result["bank"] = wallet_match.group(1)
+    elif card_match:
+        result["account"]["type"] = AccountType.CARD
+        result["account"]["number"] = card_match.group(1).replace("*", "").replace("XX", "")
+    elif account_match:
+        result["account"]["type"] = AccountType.ACCOUNT
+        result["account"]["number"] = account_match.group(1).replace("*", "").replace("XX", "")
+
+    balance_match = SMSPatterns.AVAILABLE_BALANCE.search(sms_text)
+    if balance_match:
+        result["balance"]["available"] = balance_match.group(1).replace(",", "")
+
+    outstanding_match = SMSPatterns.OUTSTANDING.search(sms_text)
+    if outstanding_match:
+        result["balance"]["outstanding"] = outstanding_match.group(1).replace(",", "")
+
+    ref_match = SMSPatterns.REFERENCE.search(sms_text)
+    if ref_match:
+        result["transaction"]["referenceNo"] = ref_match.group(1)
+
+    for pattern in [SMSPatterns.MERCHANT_AT, SMSPatterns.MERCHANT_TO, SMSPatterns.MERCHANT_VIA]:
+        merchant_match = pattern.search(sms_text)
+        if merchant_match:
+            merchant = merchant_match.group(1).strip()
+            merchant = re.sub(r'\s+', ' ', merchant)
+            merchant = merchant.rstrip('.-,')
+            if len(merchant) > 2 and not merchant.isdigit() and not re.match(r'^\d+$', merchant):
+                result["transaction"]["merchant"] = merchant
+                break
+
+    date_match = SMSPatterns.DATE_2.search(sms_text) or SMSPatterns.DATE_1.search(sms_text)
+    if date_match:
+        date_str = date_match.group(1)
+        try:
+            if "-" in date_str or "/" in date_str:
+                for fmt in ["%d-%m-%y", "%d/%m/%y", "%d-%m-%Y", "%d/%m/%Y"]:
+                    try:
+                        parsed = datetime.strptime(date_str, fmt)
+                        result["date"] = parsed.date().isoformat()
+                        break
+                    except:
+                        continue
+            else:
+                if len(date_str) > 7:
+                    parsed = datetime.strptime(date_str, "%d%b%Y")
+                else:
+                    parsed = datetime.strptime(date_str, "%d%b%y")
+                result["date"] = parsed.date().isoformat()
+        except:
+            pass
+
+    if not result["bank"]:
+        bank_match = SMSPatterns.BANK_CODE.search(sms_text)
+        if bank_match:
+            result["bank"] = bank_match.group(1)
+
+    return result
+
+
+def reference_parse_sms_block(sms_text: str) -> Tuple[List[Dict], List[str]]:
+    """Original block parser built on the reference extractor."""
+    transactions: List[Dict] = []
+    unparsed: List[str] = []
+    for line in sms_text.splitlines():
+        line = line.strip()
+        if not line or len(line) < 20:
+            continue
+        info = reference_extract_transaction_info(line)
+        if info["transaction"]["amount"] and info["transaction"]["type"]:
+            transactions.append({
+                "date": info["date"] or "Unknown",
+                "amount": float(info["transaction"]["amount"]),
+                "direction": info["transaction"]["type"],
+                "ref": info["transaction"]["referenceNo"] or "N/A",
+                "merchant": info["transaction"]["merchant"] or "N/A",
+                "account_type": info["account"]["type"] or "UNKNOWN",
+                "account_number": info["account"]["number"] or "N/A",
+                "balance": info["balance"]["available"] or "N/A",
+                "bank": info["bank"] or "UNKNOWN",
+                "raw": line,
+            })
+        else:
+            unparsed.append(line)
+    return transactions, unparsed
+
+
+def is_templated(line: str) -> bool:
+    line = line.strip()
+    return get_template_registry().match(line, sms_parser._fold(line)) is not None
+
+
+def check_equivalence(texts: List[str]) -> None:
+    for text in texts:
+        for line in text.splitlines():
+            expected = reference_extract_transaction_info(line)
+            actual = sms_parser._extract(line, require_core=False, use_templates=False)
+            if expected != actual:
+                raise SystemExit(f"generic extraction mismatch on line: {line!r}\n  expected {expected}\n  actual   {actual}")
+        generic_text = "\n".join(line for line in text.splitlines() if not is_templated(line))
+        transactions, unparsed = sms_parser.parse_sms_block(generic_text)
+        # merchant_id/category are added by the merchant index, not the extractor
+        transactions = [
+            {key: value for key, value in t.items() if key not in ("merchant_id", "category")}
+            for t in transactions
+        ]
+        if reference_parse_sms_block(generic_text) != (transactions, unparsed):
+            raise SystemExit("parse_sms_block output differs from reference")
+    print("[OK] Output identical to reference implementation")
+
+
+def filled_fields(info: Dict) -> int:
+    values = [info["date"], info["bank"], info["account"]["number"], info["balance"]["available"],
+              info["transaction"]["referenceNo"], info["transaction"]["merchant"]]
+    return sum(value is not None for value in values)
+
+
+def compare_templates(lines: List[str], repeat: int) -> None:
+    registry = get_template_registry()
+    generic = [sms_parser._extract(line, require_core=True, use_templates=False) for line in lines]
+    templated = [sms_parser._extract(line, require_core=True) for line in lines]
+    print(f"Bank-format lines: {len(lines)}")
+    print(f"  parsed   generic {sum(info is not None for info in generic)}, templates {sum(info is not None for info in templated)}")
+    print(f"  fields   generic {sum(filled_fields(info) for info in generic if info)}, "
+          f"templates {sum(filled_fields(info) for info in templated)}")
+
+    for label, use_templates in (("generic  ", False), ("templates", True)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for line in lines:
+                sms_parser._extract(line, require_core=True, use_templates=use_templates)
+        elapsed = time.perf_counter() - start
+        print(f"  {label} {len(lines) * repeat / elapsed:,.0f} lines/sec")
+
+    registry.reset_stats()
+    for line in lines:
+        sms_parser._extract(line, require_core=True)
+    for name, stats in registry.stats()["templates"].items():
+        print(f"  {name:<14} hits {stats['hits']:>3}  misses {stats['misses']:>3}  hit rate {stats['hit_rate']}")
+
+
+def lines_per_sec(parse, text: str, repeat: int) -> float:
+    n_lines = len(text.splitlines())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(text)
+    elapsed = time.perf_counter() - start
+    return n_lines * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the sample corpus")
+    args = parser.parse_args()
+
+    texts = [path.read_text(encoding="utf-8") for path in SAMPLE_FILES]
+    check_equivalence(texts)
+
+    corpus = "\n".join(texts)
+    before = lines_per_sec(reference_parse_sms_block, corpus, args.repeat)
+    after = lines_per_sec(sms_parser.parse_sms_block, corpus, args.repeat)
+    print(f"Reference parse_sms_block: {before:,.0f} lines/sec")
+    print(f"Current   parse_sms_block: {after:,.0f} lines/sec")
+    print(f"Speedup: {after / before:.2f}x")
+
+    bank_lines = [line.strip() for line in corpus.splitlines() if is_templated(line)] + EXTRA_BANK_LINES
+    compare_templates(bank_lines, args.repeat * 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Load-test the Finance360 pipeline stage by stage against stored baselines.
+
+Usage (from backend/):
+    python benchmarks/bench_sms_pipeline.py [--rows 200000] [--seed 42] [--corpus FILE]
+    python benchmarks/bench_sms_pipeline.py --save-baseline   # record new baselines
+    python benchmarks/bench_sms_pipeline.py --check           # exit 1 on regression
+
+The corpus comes from data/generate_sms_corpus.py (seeded, so runs are
+comparable). Each stage runs in a fresh process so peak RSS is its own:
+
+- parse:    iter_sms_lines, timed per SMS line
+- metrics:  columnar store + totals + monthly flows + metrics_from_totals
+- features: derived features + spend summary from the columnar store
+
+metrics and features run on user-sized batches (--batch-lines); their per-line
+latency is batch time / lines in the batch. Each stage reports lines/sec and
+p99 per-line latency from the fastest of --repeat passes, plus peak RSS, and is
+compared with benchmarks/baselines/sms_pipeline.json.
+Baselines are machine-specific: re-record them when the benchmark host changes.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+GENERATOR = DATA_DIR / "generate_sms_corpus.py"
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines" / "sms_pipeline.json"
+
+STAGES = ("parse", "metrics", "features")
+# metric -> True if higher is better
+METRICS = {"lines_per_sec": True, "p99_us": False, "peak_rss_mb": False}
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS mark (Linux); False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_stage(stage: str, corpus: str, batch_lines: int, repeat: int) -> Dict:
+    """Runs in a child process: prepare the stage's input, then time the fastest of ``repeat`` passes."""
+    from app.utils import feature_builder, sms_parser, transaction_store
+
+    lines = Path(corpus).read_text(encoding="utf-8").splitlines()
+    if stage != "parse":
+        transactions = [t for t, _ in sms_parser.iter_sms_lines(lines) if t is not None]
+        batches = [transactions[i:i + batch_lines] for i in range(0, len(transactions), batch_lines)]
+        if stage == "features":
+            batches = [transaction_store.TransactionColumns.from_records(batch) for batch in batches]
+
+    def one_pass():
+        latencies: List[float] = []  # Seconds per line
+        start = time.perf_counter()
+        if stage == "parse":
+            for line in lines:
+                t0 = time.perf_counter()
+                next(sms_parser.iter_sms_lines((line,)), None)
+                latencies.append(time.perf_counter() - t0)
+        elif stage == "metrics":
+            for batch in batches:
+                t0 = time.perf_counter()
+                columns = transaction_store.TransactionColumns.from_records(batch)
+                inflow, outflow = columns.totals()
+                sms_parser.metrics_from_totals(inflow, outflow, columns.monthly_flows().volatility())
+                latencies.append((time.perf_counter() - t0) / len(batch))
+        else:
+            for columns in batches:
+                t0 = time.perf_counter()
+                feature_builder.columns_to_features(columns)
+                columns.spend_summary()
+                latencies.append((time.perf_counter() - t0) / len(columns))
+        return time.perf_counter() - start, latencies
+
+    n_lines = len(lines) if stage == "parse" else len(transactions)
+    reset_peak_rss()
+    elapsed, latencies = min((one_pass() for _ in range(repeat)), key=lambda run: run[0])
+
+    return {
+        "lines": n_lines,
+        "lines_per_sec": round(n_lines / elapsed, 1),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def generate_corpus(path: Path, rows: int, seed: int) -> None:
+    subprocess.run(
+        [sys.executable, str(GENERATOR), "--rows", str(rows), "--seed", str(seed), "--out", str(path)],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions beyond ``tolerance`` (relative)."""
+    regressions = []
+    for stage, metrics in results.items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base[metric], metrics[metric]
+            change = (new - old) / old if old else 0.0
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{stage}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000, help="SMS lines to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", type=Path, help="Existing corpus file (skips generation)")
+    parser.add_argument("--batch-lines", type=int, default=1000, help="Transactions per user batch")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per stage (fastest is reported)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE_FILE.name}")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = Path(tmp) / "corpus.txt"
+            generate_corpus(corpus, args.rows, args.seed)
+
+        # spawn: each stage starts from a clean interpreter, so peak RSS is not inherited
+        context = multiprocessing.get_context("spawn")
+        results = {}
+        for stage in args.stages:
+            with context.Pool(1) as pool:
+                results[stage] = pool.apply(run_stage, (stage, str(corpus), args.batch_lines, args.repeat))
+
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    print(f"{'stage':<10}{'lines':>10}{'lines/sec':>14}{'p99 us':>10}{'peak RSS MB':>13}")
+    for stage, r in results.items():
+        print(f"{stage:<10}{r['lines']:>10,}{r['lines_per_sec']:>14,.0f}{r['p99_us']:>10.2f}{r['peak_rss_mb']:>13.1f}")
+
+    if args.save_baseline:
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        corpus_info = {"rows": args.rows, "seed": args.seed} if args.corpus is None else {"file": str(args.corpus)}
+        BASELINE_FILE.write_text(json.dumps({"corpus": corpus_info, "batch_lines": args.batch_lines,
+                                             "stages": {**baseline.get("stages", {}), **results}}, indent=2) + "\n")
+        print(f"[OK] Baseline saved to {BASELINE_FILE}")
+        return
+
+    if not baseline:
+        print("No baseline recorded yet (run with --save-baseline)")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"[REGRESSION] beyond {args.tolerance:.0%} of baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print(f"[OK] Within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare list-of-dicts transactions with the columnar TransactionColumns store.
+
+Usage (from backend/):
+    python benchmarks/bench_transaction_store.py [--rows 100000]
+
+Reports retained memory per transaction (tracemalloc) and the time to compute
+Finance360 metrics + derived features for both representations.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import feature_builder, sms_parser, transaction_store
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+
+
+def build_history(rows: int) -> str:
+    lines = [
+        line for line in (DATA_DIR / "real_sms_examples.txt").read_text(encoding="utf-8").splitlines()
+        + (DATA_DIR / "synthetic_sms_examples.txt").read_text(encoding="utf-8").splitlines()
+        if sms_parser.extract_transaction_info(line)["transaction"]["amount"]
+    ]
+    return "\n".join(lines[i % len(lines)] for i in range(rows))
+
+
+def retained_bytes(build) -> tuple:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000, help="SMS lines in the synthetic history")
+    args = parser.parse_args()
+
+    history = build_history(args.rows)
+
+    (records, _), dict_bytes = retained_bytes(lambda: sms_parser.parse_sms_block(history))
+    (columns, _), col_bytes = retained_bytes(lambda: transaction_store.parse_sms_columns(history))
+    (lean, _), lean_bytes = retained_bytes(lambda: transaction_store.parse_sms_columns(history, keep_raw=False))
+    n = len(records)
+    print(f"Transactions: {n:,}")
+    print(f"list[dict]                  : {dict_bytes / n:8.1f} bytes/txn")
+    print(f"TransactionColumns          : {col_bytes / n:8.1f} bytes/txn")
+    print(f"TransactionColumns (no raw) : {lean_bytes / n:8.1f} bytes/txn")
+
+    def dict_metrics():
+        sms_parser.compute_financial_metrics(records)
+        feature_builder.transactions_to_features(records)
+
+    def column_metrics():
+        inflow, outflow = columns.totals()
+        flows = columns.monthly_flows()
+        sms_parser.metrics_from_totals(inflow, outflow, flows.volatility())
+        feature_builder.features_from_flows(inflow, outflow, flows)
+
+    dict_time = best_of(dict_metrics)
+    col_time = best_of(column_metrics)
+    print(f"Metrics + features, list[dict]         : {dict_time * 1000:8.2f} ms")
+    print(f"Metrics + features, TransactionColumns : {col_time * 1000:8.2f} ms ({dict_time / col_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
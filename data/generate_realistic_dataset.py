@@ -1,12 +1,34 @@
 """
 Generate realistic synthetic data for FairScore training.
 Uses realistic ranges and patterns observed from real financial data.
+
+generate_row() is the reference definition; generate_columns() draws the same
+distributions with NumPy, one array per column, for large datasets. Rows are
+produced in fixed-size partitions, each seeded from --seed by partition index
+(so the output does not depend on --workers), generated in parallel worker
+processes and streamed to the output in order with a bounded number of
+partitions in flight.
+
+Usage:
+    python data/generate_realistic_dataset.py                          # 1,000 rows (training default)
+    python data/generate_realistic_dataset.py --rows 10000000 --workers 4 --out data/fairscore_10m.csv
+    python data/generate_realistic_dataset.py --rows 10000000 --out data/fairscore_10m.parquet  # needs pyarrow
 """
-import csv
+import argparse
+import io
+import multiprocessing
 import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict
+
+import numpy as np
 
 ROWS = 1000
+SEED = 42
+PARTITION_ROWS = 500_000
 OUT_FILE = Path(__file__).with_name("realistic_fairscore_dataset.csv")
 FIELDNAMES = [
     "avg_inflow",
@@ -99,13 +121,118 @@ def generate_row() -> dict:
     }
 
 
+def generate_columns(rng: np.random.Generator, n: int) -> Dict[str, np.ndarray]:
+    """generate_row() for n rows at once: the same distributions, as arrays."""
+    # Income segment: first segment whose cumulative probability >= draw
+    cumulative = np.cumsum([probability for _, _, probability in INCOME_SEGMENTS])
+    segment = np.minimum(np.searchsorted(cumulative, rng.random(n)), len(INCOME_SEGMENTS) - 1)
+    low = np.array([segment_min for segment_min, _, _ in INCOME_SEGMENTS])[segment]
+    high = np.array([segment_max for _, segment_max, _ in INCOME_SEGMENTS])[segment]
+    avg_inflow = rng.integers(low, high + 1)  # randint is inclusive
+
+    base_savings = np.select([avg_inflow < 20000, avg_inflow < 40000], [0.10, 0.15], 0.20)
+    savings_rate = np.clip(np.round(base_savings + rng.uniform(-0.05, 0.15, n), 2), 0.05, 0.35)
+
+    base_volatility = np.select([avg_inflow < 20000, avg_inflow < 40000], [0.40, 0.30], 0.20)
+    volatility = np.clip(np.round(base_volatility + rng.uniform(-0.10, 0.10, n), 2), 0.10, 0.60)
+
+    avg_outflow = np.trunc(avg_inflow * (1 - savings_rate) + rng.integers(-1000, 1001, n)).astype(np.int64)
+    avg_outflow = np.maximum(0, avg_outflow)
+
+    academic_score = np.round(rng.uniform(6.0, 9.8, n), 1)
+
+    # choice([0, 0, x]) below 20k inflow, choice([0, 0, 0, x]) above
+    low_income = avg_inflow < 20000
+    has_part_time = np.where(low_income, rng.random(n) < 1 / 3, rng.random(n) < 1 / 4)
+    part_time_amount = np.where(low_income, rng.integers(2000, 8001, n), rng.integers(3000, 15001, n))
+    part_time_income = np.where(has_part_time, part_time_amount, 0)
+
+    # choice([0, 0, 0, 1]) / choice([0, 1, 1, 2]) / randint(0, 4)
+    pick = rng.integers(0, 4, n)
+    emi_count = np.select(
+        [avg_inflow < 15000, avg_inflow < 30000],
+        [(pick == 3).astype(np.int64), np.array([0, 1, 1, 2])[pick]],
+        rng.integers(0, 5, n),
+    )
+
+    label_score = (
+        50
+        + (savings_rate * 100)
+        - (volatility * 50)
+        + ((avg_inflow - avg_outflow) / 800)
+        + (academic_score * 2.5)
+        + (part_time_income / 2000)
+        - (emi_count * 4)
+    )
+    label_score = np.clip(np.trunc(label_score).astype(np.int64), 30, 95)
+
+    return {
+        "avg_inflow": avg_inflow,
+        "avg_outflow": avg_outflow,
+        "savings_rate": savings_rate,
+        "volatility": volatility,
+        "academic_score": academic_score,
+        "part_time_income": part_time_income,
+        "emi_count": emi_count,
+        "label_score": label_score,
+    }
+
+
+def generate_partition(seed: int, index: int, rows: int, as_csv: bool):
+    """One partition: CSV text (no header) or the column arrays."""
+    rng = np.random.default_rng(np.random.SeedSequence([seed, index]))
+    columns = generate_columns(rng, rows)
+    if not as_csv:
+        return columns
+    import pandas as pd
+
+    buffer = io.StringIO()
+    pd.DataFrame(columns, columns=FIELDNAMES).to_csv(buffer, index=False, header=False, lineterminator="\n")
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_dataset(out: Path, rows: int, seed: int, workers: int, partition_rows: int = PARTITION_ROWS) -> None:
+    """Generate partitions in parallel and stream them to out (.csv or .parquet) in order."""
+    as_csv = out.suffix.lower() != ".parquet"
+    if not as_csv:
+        import pyarrow as pa  # Parquet output needs pyarrow; CSV does not
+        import pyarrow.parquet as pq
+
+    sizes = [min(partition_rows, rows - start) for start in range(0, rows, partition_rows)]
+    writer = None
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max(1, workers), mp_context=context) as pool, out.open("wb") as f:
+        if as_csv:
+            f.write((",".join(FIELDNAMES) + "\n").encode("utf-8"))
+        pending = deque()
+        for index, size in enumerate(sizes):
+            pending.append(pool.submit(generate_partition, seed, index, size, as_csv))
+            # At most 2 partitions per worker in flight: memory stays bounded for any --rows
+            while len(pending) >= 2 * max(1, workers) or (pending and index == len(sizes) - 1):
+                part = pending.popleft().result()
+                if as_csv:
+                    f.write(part)
+                else:
+                    table = pa.table({name: part[name] for name in FIELDNAMES})
+                    writer = writer or pq.ParquetWriter(f, table.schema)
+                    writer.write_table(table)
+        if writer is not None:
+            writer.close()
+
+
 def main():
-    with OUT_FILE.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        for _ in range(ROWS):
-            writer.writerow(generate_row())
-    print(f"✓ Generated realistic dataset at {OUT_FILE} with {ROWS} rows.")
+    parser = argparse.ArgumentParser(description="Generate the realistic FairScore training dataset")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--seed", type=int, default=SEED, help="Same seed and --rows -> same dataset")
+    parser.add_argument("--workers", type=int, default=1, help="Partition generator processes")
+    parser.add_argument("--partition-rows", type=int, default=PARTITION_ROWS)
+    parser.add_argument("--out", type=Path, default=OUT_FILE, help=".csv, or .parquet (needs pyarrow)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_dataset(args.out, args.rows, args.seed, args.workers, args.partition_rows)
+    print(f"✓ Generated realistic dataset at {args.out} with {args.rows:,} rows "
+          f"in {time.perf_counter() - start:.1f}s.")
     print(f"  Income distribution: 30% low, 40% middle, 20% upper-middle, 10% high")
     print(f"  Scores range: 30-95 (based on savings, volatility, income, academics)")
 
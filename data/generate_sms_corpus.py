@@ -0,0 +1,182 @@
+"""
+Generate a seeded synthetic SMS corpus for load testing the Finance360 parser.
+
+Covers the formats SMSPatterns targets (bank debit/credit, UPI, NEFT/IMPS,
+cards with limits/outstanding, wallets, salary/EMI) plus the bank-specific
+Axis/HDFC/ICICI/SBI templates and non-transaction noise (OTPs, promos).
+Optionally fuzzes a fraction of lines (case, spacing, currency symbols,
+truncation) to exercise the fallback paths.
+
+Usage:
+    python data/generate_sms_corpus.py --rows 1000000 --seed 42 --out data/synthetic_sms_corpus.txt
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+ROWS = 1_000_000
+SEED = 42
+OUT_FILE = Path(__file__).with_name("synthetic_sms_corpus.txt")
+START_DATE = date(2023, 1, 1)
+HISTORY_DAYS = 730
+WRITE_BATCH = 10_000
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+BANK_CODES = ["BOI", "SBI", "HDFCBK", "ICICIB", "AXISBK", "KOTAKB", "PNBSMS", "CANBNK", "IDFCFB", "FEDBNK"]
+WALLETS = ["Paytm", "Amazon Pay", "PhonePe", "Google Pay", "GPay", "Lazypay", "Simpl", "Mobikwik"]
+CURRENCIES = ["Rs.", "Rs", "INR ", "Rs. ", "₹"]
+PAYEES = ["Vedamurthy M S", "Ramesh Kumar", "Priya Sharma", "Anil Traders", "Sri Sai Stores", "Mr ABC"]
+
+# (merchant as it appears in SMS, min amount, max amount)
+MERCHANTS = [
+    ("Swiggy", 120, 900), ("SWIGGY BANGALORE", 120, 900), ("Zomato", 150, 1200), ("Dominos", 200, 800),
+    ("AMAZON", 200, 8000), ("AMAZON SELLER S", 200, 5000), ("Flipkart", 300, 12000), ("MYNTRA", 500, 4000),
+    ("BigBasket", 400, 3500), ("Blinkit", 100, 1500), ("DMart", 500, 4000), ("Uber", 80, 700),
+    ("Ola Cabs", 80, 650), ("IRCTC", 300, 4500), ("BookMyShow", 200, 1500), ("Netflix", 149, 649),
+    ("Airtel", 199, 999), ("Jio", 149, 799), ("BESCOM", 400, 3000), ("Indian Oil", 500, 3000),
+    ("Apollo Pharmacy", 100, 2000), ("Decathlon", 500, 6000), ("Apple Store", 2000, 90000),
+]
+
+NOISE = [
+    "{otp} is your OTP for txn of Rs.{amount} at {merchant}. Valid for 10 mins. Do not share it with anyone.",
+    "Get a pre-approved personal loan up to Rs.5,00,000 at 10.5% p.a. Apply now: bit.ly/{ref}",
+    "Dear Customer, your KYC is due. Please visit the nearest branch to update. -{bank}",
+    "Your bill of Rs.{amount} for {merchant} is due on {numeric_date}. Ignore if already paid.",
+    "Congratulations! You have won cashback points. T&C apply.",
+    "Hi",
+]
+
+
+def fmt_amount(rng: random.Random, low: int, high: int) -> str:
+    value = rng.uniform(low, high)
+    text = f"{value:.2f}" if rng.random() < 0.8 else str(int(value))
+    if value >= 1000 and rng.random() < 0.3:
+        whole, _, cents = text.partition(".")
+        text = f"{int(whole):,}" + (f".{cents}" if cents else "")
+    return text
+
+
+def numeric_date(rng: random.Random, day: date) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return day.strftime("%d-%m-%y")
+    if style == 1:
+        return day.strftime("%d/%m/%Y")
+    if style == 2:
+        return f"{day.day}-{day.month}-{day.strftime('%y')}"
+    return day.strftime("%d/%m/%y")
+
+
+def compact_date(day: date) -> str:
+    return f"{day.day:02d}{MONTHS[day.month - 1]}{day.strftime('%y')}"
+
+
+def dashed_date(day: date) -> str:
+    return f"{day.day:02d}-{MONTHS[day.month - 1]}-{day.strftime('%y')}"
+
+
+def generate_line(rng: random.Random) -> str:
+    day = START_DATE + timedelta(days=rng.randrange(HISTORY_DAYS))
+    merchant, low, high = rng.choice(MERCHANTS)
+    amount = fmt_amount(rng, low, high)
+    balance = fmt_amount(rng, 500, 150000)
+    cur = rng.choice(CURRENCIES)
+    acct = f"{rng.randrange(10000):04d}"
+    ref = str(rng.randrange(10**11, 10**12))
+    bank = rng.choice(BANK_CODES)
+    kind = rng.random()
+
+    if kind < 0.18:  # Generic bank debit
+        return (f"{cur}{amount} debited from A/c XX{acct} on {numeric_date(rng, day)} at {merchant}. "
+                f"Avl Bal: {rng.choice(CURRENCIES)}{balance} -{bank}")
+    if kind < 0.30:  # UPI debit to a person/merchant
+        payee = rng.choice(PAYEES + [merchant])
+        return (f"{cur}{amount} debited A/cXX{acct} and credited to {payee} via UPI Ref No {ref} on "
+                f"{compact_date(day)}. Call 18001031906, if not done by you. -{bank}")
+    if kind < 0.38:  # NEFT/IMPS credit
+        channel = rng.choice(["NEFT", "IMPS", "UPI"])
+        return (f"{cur}{fmt_amount(rng, 500, 50000)} credited to A/c XX{acct} via {channel} Ref {ref} "
+                f"on {compact_date(day)}. -{bank}")
+    if kind < 0.42:  # Salary / EMI
+        if rng.random() < 0.5:
+            return (f"Rs.{fmt_amount(rng, 12000, 90000)} credited via salary in A/cXX{acct} on "
+                    f"{compact_date(day)} Ref SAL{day.month:02d}{day.strftime('%y')}. -{bank}")
+        return f"Rs.{fmt_amount(rng, 1500, 25000)} debited from A/cXX{acct} towards EMI on {compact_date(day)} Ref {ref} -{bank}"
+    if kind < 0.52:  # Credit card spend
+        issuer = rng.choice(["Kotak Bank Credit", "Citi", "HDFC Bank Credit", "SBI", "Uni"])
+        tail = rng.choice([f"Avl limit: Rs.{balance}", f"Outstanding: Rs.{balance}", f"Total Due: Rs.{balance}"])
+        return f"{cur}{amount} spent on {issuer} Card XX{acct} at {merchant} on {numeric_date(rng, day)}. {tail}"
+    if kind < 0.64:  # Wallets
+        wallet = rng.choice(WALLETS)
+        style = rng.randrange(3)
+        if style == 0:
+            return f"Rs.{amount} paid via {wallet} to {merchant}. UPI Ref: {ref}. Balance: Rs.{balance}"
+        if style == 1:
+            return f"You paid Rs.{amount} to {merchant} via {wallet}. Ref: {ref}"
+        return f"Rs.{amount} credited to {wallet} balance. Ref: {wallet[:4].upper()}{ref[:8]}. Current Balance: Rs.{balance}"
+    if kind < 0.70:  # Axis
+        return (f"Rs.{amount} debited from A/c **{acct} on {dashed_date(day)} at "
+                f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}. Avl Bal- Rs.{balance}. "
+                f"Not you? Call 1800111111 or SMS BLOCK {acct} to 5676766")
+    if kind < 0.76:  # HDFC
+        return (f"INR {amount} debited from A/c **{acct} on {day.strftime('%d-%m-%y')} at {merchant}. "
+                f"Avl bal: INR {balance}. Not you? Call 18002586161")
+    if kind < 0.82:  # ICICI (account / UPI)
+        if rng.random() < 0.5:
+            return (f"Rs.{amount} debited from A/c no. XX{acct} on {day.strftime('%d-%m-%y')} "
+                    f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:00 IST at {merchant.upper()}. Avl Bal- INR {balance}.")
+        return (f"ICICI Bank Acct XX{acct[1:]} debited for Rs {amount} on {dashed_date(day)}; {merchant.upper()} credited. "
+                f"UPI:{ref}. Call 18002662 for dispute. SMS BLOCK {acct[1:]} to 9215676766.")
+    if kind < 0.88:  # SBI (account / UPI)
+        if rng.random() < 0.5:
+            return (f"Your A/c XX{acct} is debited with Rs.{amount} on {dashed_date(day)}. "
+                    f"Info: NEFT-N{ref[:9]}. Avl Bal: Rs.{balance}")
+        return (f"Dear UPI user A/C X{acct} debited by {amount.replace(',', '')} on date {compact_date(day)} trf to "
+                f"{rng.choice(PAYEES)} Refno {ref}. If not u? call 1800111109. -SBI")
+
+    template = rng.choice(NOISE)
+    return template.format(otp=rng.randrange(100000, 999999), amount=amount, merchant=merchant, ref=ref[:6],
+                           bank=bank, numeric_date=numeric_date(rng, day))
+
+
+def fuzz_line(rng: random.Random, line: str) -> str:
+    """Apply one random mutation that real SMS exports exhibit."""
+    mutation = rng.randrange(6)
+    if mutation == 0:
+        return line.upper()
+    if mutation == 1:
+        return line.replace(" ", "  ", rng.randrange(1, 4))
+    if mutation == 2:
+        return line.replace("Rs.", rng.choice(["₹", "INR ", "Rs "]), 1)
+    if mutation == 3:
+        return line[: rng.randrange(10, max(11, len(line)))]
+    if mutation == 4:
+        position = rng.randrange(len(line))
+        return line[:position] + rng.choice(["\u00a0", "\u200b", "é", "₹", "\t"]) + line[position:]
+    return line.replace(".", "", rng.randrange(1, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic SMS corpus")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--fuzz", type=float, default=0.05, help="Fraction of lines to mutate")
+    parser.add_argument("--out", type=Path, default=OUT_FILE)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with args.out.open("w", encoding="utf-8") as f:
+        for start in range(0, args.rows, WRITE_BATCH):
+            batch = []
+            for _ in range(min(WRITE_BATCH, args.rows - start)):
+                line = generate_line(rng)
+                if rng.random() < args.fuzz:
+                    line = fuzz_line(rng, line)
+                batch.append(line + "\n")
+            f.writelines(batch)
+    print(f"✓ Generated {args.rows:,} SMS lines at {args.out} (seed {args.seed}, fuzz {args.fuzz:.0%})")
+
+
+if __name__ == "__main__":
+    main()